@@ -1,6 +1,11 @@
 from flask import Flask
 from routes.main_routes import main_bp
 from routes.api_routes import api_bp
+from routes.session_routes import session_bp
+from routes.device_routes import devices_bp
+from routes.metrics_routes import metrics_bp
+from routes.calibration_routes import calibration_bp
+from services.app_state import app_state
 import os
 
 def create_app():
@@ -10,16 +15,51 @@ def create_app():
     # Configurações
     app.config['DEBUG'] = True
     app.config['CSV_FOLDER'] = 'data'
+    app.config['CHART_MAX_POINTS'] = 100  # Pode chegar a milhões de pontos (buffer colunar)
+    app.config['CSV_FLUSH_ROWS'] = 1000       # Flush a cada N linhas...
+    app.config['CSV_FLUSH_INTERVAL'] = 0.5    # ...ou a cada N segundos
+    app.config['CSV_MAX_QUEUE_ROWS'] = 100_000  # Limite da fila antes de descartar linhas
+    app.config['STORAGE_BACKENDS'] = ['csv', 'npy']  # Também disponível: 'arrow' (requer pyarrow)
+    app.config['STREAM_FRAME_RATE'] = 20  # Frames/s do stream SSE (/api/stream)
+    app.config['STREAM_HISTORY'] = 100    # Pontos enviados no snapshot inicial do stream
+    app.config['IMPACT_THRESHOLD_ON'] = 400   # Excesso (ADC) sobre a linha de base que inicia um impacto
+    app.config['IMPACT_THRESHOLD_OFF'] = 200  # ...e abaixo do qual o impacto termina (histerese)
+    app.config['IMPACT_MIN_SAMPLES'] = 1      # Duração mínima (amostras) de um impacto
+    app.config['BLE_CONTINUOUS_SCAN'] = True  # Scanner BLE contínuo desde o início (registro de dispositivos)
+    app.config['BLE_SCAN_TTL'] = 30           # Segundos sem anúncio até o dispositivo sair do registro
+    app.config['MAX_DEVICES'] = 8             # Sessões simultâneas em /api/devices/<address>/...
+    app.config['PIPELINE_QUEUE_RECORDS'] = 100_000  # Fila máxima de cada estágio do pipeline antes de descartar
+    app.config['PIPELINE_WORKERS'] = 4        # Threads compartilhadas por todas as sessões (estágios do pipeline e gravação)
+    app.config['BLE_SOURCE'] = os.environ.get('BLE_SOURCE', 'ble')  # 'ble', 'replay' (sessão gravada) ou 'simulator'
+    app.config['BLE_REPLAY_FILE'] = os.environ.get('BLE_REPLAY_FILE')  # Sessão (.csv/.npy/.arrow) para a fonte 'replay'
+    app.config['BLE_REPLAY_SPEED'] = float(os.environ.get('BLE_REPLAY_SPEED', 1.0))  # 1x a 1000x o ritmo do firmware (0 = sem limite)
+    app.config['BLE_SIM_SEED'] = None         # Semente do simulador (None = aleatória)
+    app.config['BLE_SIM_DROP_RATE'] = float(os.environ.get('BLE_SIM_DROP_RATE', 0.0))  # Fração de notificações perdidas no simulador
+    app.config['BLE_WIRE_FORMAT'] = os.environ.get('BLE_WIRE_FORMAT', 'auto')  # Formato do stream: 'auto', '1' (PL cru) ou '2' (frames compactos)
+    app.config['BLE_SIM_WIRE_VERSION'] = int(os.environ.get('BLE_SIM_WIRE_VERSION', 1))  # Formato enviado pelo simulador (1 ou 2)
+    app.config['SESSION_INDEX_SYNC'] = True   # Indexa na inicialização as sessões gravadas fora do índice (data/sessions.db)
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = 256     # Respostas JSON em cache (data_summary, chart_data, export_data, range)
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = 32 << 20  # ...e o total de bytes guardados (LRU)
+    app.config['ANALYTICS_WORKERS'] = None    # Processos da análise em lote (/api/sessions/analytics); None = nº de CPUs
     
     # Criar diretório de dados se não existir
     os.makedirs(app.config['CSV_FOLDER'], exist_ok=True)
     
+    # Aplica configurações ao estado global
+    app_state.configure(app.config)
+    
     # Registrar blueprints
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
+    app.register_blueprint(session_bp, url_prefix='/api/sessions')
+    app.register_blueprint(devices_bp, url_prefix='/api/devices')
+    app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
+    app.register_blueprint(calibration_bp, url_prefix='/api/calibration')
+    # As mesmas rotas da API, por dispositivo: /api/devices/<address>/status, /chart_data, /stream...
+    app.register_blueprint(api_bp, url_prefix='/api/devices/<address>', name='device_api')
     
     return app
 
 if __name__ == "__main__":
     app = create_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,109 @@
+"""Micro-benchmark do decodificador BLE (_notification_handler).
+
+Reproduz um dump gravado (arquivo binário bruto no formato "<B4iI" ou o CSV
+de uma sessão, replicado até o tamanho pedido) em chunks do tamanho do MTU e
+compara o handler antigo (fatia o bytearray a cada registro) com o
+decodificador em lote.
+
+Uso (a partir de appFlask/):
+    python benchmarks/bench_decoder.py --size-mb 4 --chunk 180
+    python benchmarks/bench_decoder.py --dump dump.bin --chunk 65536
+"""
+import argparse
+import contextlib
+import csv
+import io
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ble_manager import BLEManager, SensorData
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dados_ble.csv")
+
+def build_dump(csv_path: str, size_mb: float, struct_format: str = "<B4iI") -> bytes:
+    """Empacota as linhas do CSV e replica até atingir size_mb, com timestamps contínuos"""
+    packer = struct.Struct(struct_format)
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        rows = [
+            (int(r["sLed"]), int(r["rSensor1"]), int(r["rSensor2"]),
+             int(r["rSensor3"]), int(r["rSensor4"]), int(r["timeStamp"]))
+            for r in csv.DictReader(f)
+        ]
+    
+    target = int(size_mb * 1024 * 1024)
+    out = bytearray()
+    offset = 0
+    while len(out) < target:
+        for sLed, r1, r2, r3, r4, ts in rows:
+            out += packer.pack(sLed, r1, r2, r3, r4, ts + offset)
+        offset += rows[-1][5] + 1
+    
+    return bytes(out[:target - target % packer.size])
+
+def legacy_handler(manager: BLEManager):
+    """Handler original: um memmove e um SensorData por registro"""
+    def handler(sender, data):
+        manager.buffer.extend(data)
+        while len(manager.buffer) >= manager.struct_size:
+            chunk = manager.buffer[:manager.struct_size]
+            manager.buffer[:] = manager.buffer[manager.struct_size:]
+            sLed, r1, r2, r3, r4, ts = struct.unpack(manager.struct_format, chunk)
+            manager.interval_detector.detect_interval_change(sLed, ts)
+            sensor_data = SensorData(sLed, r1, r2, r3, r4, ts,
+                                     manager.interval_detector.get_current_interval())
+            for callback in manager.data_callbacks:
+                callback(sensor_data)
+    return handler
+
+def replay(dump: bytes, chunk: int, legacy: bool) -> dict:
+    """Envia o dump em chunks ao handler e mede o tempo total"""
+    manager = BLEManager()
+    received = [0]
+    if legacy:
+        manager.add_data_callback(lambda d: received.__setitem__(0, received[0] + 1))
+        handler = legacy_handler(manager)
+    else:
+        manager.add_batch_callback(lambda batch: received.__setitem__(0, received[0] + len(batch)))
+        handler = manager._notification_handler
+    
+    chunks = [dump[i:i + chunk] for i in range(0, len(dump), chunk)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for data in chunks:
+            handler(None, bytearray(data))
+        elapsed = time.perf_counter() - start
+    
+    return {
+        "handler": "legacy" if legacy else "batch",
+        "records": received[0],
+        "seconds": elapsed,
+        "records_per_s": received[0] / elapsed if elapsed else float("inf"),
+        "mb_per_s": len(dump) / elapsed / 1e6 if elapsed else float("inf"),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dump", help="arquivo binário bruto <B4iI> gravado")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="CSV usado para gerar o dump")
+    parser.add_argument("--size-mb", type=float, default=4.0)
+    parser.add_argument("--chunk", type=int, default=180, help="bytes por notificação")
+    args = parser.parse_args()
+    
+    if args.dump:
+        with open(args.dump, "rb") as f:
+            dump = f.read()
+    else:
+        dump = build_dump(args.csv, args.size_mb)
+    
+    print(f"Dump: {len(dump) / 1e6:.2f} MB, chunks de {args.chunk} bytes")
+    for legacy in (True, False):
+        r = replay(dump, args.chunk, legacy)
+        print(f"{r['handler']:>7}: {r['records']} registros em {r['seconds']:.3f}s "
+              f"({r['records_per_s']:,.0f} reg/s, {r['mb_per_s']:.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Benchmark do detector de impactos (ImpactDetector) em replay de sessões gravadas.
+
+Carrega uma sessão (.csv, .npy ou .arrow), replica até o número de amostras
+pedido e mede quantas vezes mais rápido que o tempo real o detector processa,
+tanto em blocos grandes (reprocessamento offline) quanto em lotes do tamanho
+de uma notificação BLE (streaming).
+
+Uso (a partir de appFlask/):
+    python benchmarks/bench_impact.py --samples 2000000
+    python benchmarks/bench_impact.py --session data/sessao.npy --batch 8
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.impact_detector import ImpactDetector
+from services.storage import load_session
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dados_ble.csv")
+
+def tile_session(records: np.ndarray, samples: int) -> np.ndarray:
+    """Replica a sessão até `samples` registros, com timestamps contínuos"""
+    reps = -(-samples // len(records))
+    out = np.tile(records, reps)[:samples].copy()
+    span = int(records['timeStamp'][-1]) + 1
+    out['timeStamp'] += (np.arange(len(out)) // len(records) * span).astype(out['timeStamp'].dtype)
+    return out
+
+def replay(records: np.ndarray, batch: int, sample_ms: int) -> dict:
+    """Passa a sessão pelo detector em lotes de `batch` amostras"""
+    detector = ImpactDetector(sample_ms=sample_ms)
+    start = time.perf_counter()
+    events = detector.process_session(records, chunk=batch)
+    elapsed = time.perf_counter() - start
+    
+    realtime = len(records) * sample_ms / 1000
+    return {
+        "batch": batch,
+        "samples": len(records),
+        "events": len(events),
+        "seconds": elapsed,
+        "samples_per_s": len(records) / elapsed if elapsed else float("inf"),
+        "x_realtime": realtime / elapsed if elapsed else float("inf"),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--session", default=DEFAULT_CSV, help="sessão gravada (.csv/.npy/.arrow)")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[65_536, 8],
+                        help="amostras por lote (8 ≈ uma notificação de 180 bytes)")
+    parser.add_argument("--sample-ms", type=int, default=50, help="período de amostragem do firmware")
+    args = parser.parse_args()
+    
+    records = tile_session(load_session(args.session, mmap=False), args.samples)
+    print(f"Sessão: {args.session} ({len(records)} amostras, "
+          f"{len(records) * args.sample_ms / 1000:,.0f} s de gravação)")
+    for batch in args.batch:
+        r = replay(records, batch, args.sample_ms)
+        print(f"lote {r['batch']:>6}: {r['events']} eventos em {r['seconds']:.3f}s "
+              f"({r['samples_per_s']:,.0f} amostras/s, {r['x_realtime']:,.0f}x tempo real)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""Suíte de benchmarks do pipeline de aquisição, com resultado em JSON.
+
+Os dados vêm do simulador do firmware (determinístico com --seed) ou de uma
+sessão gravada (--session, via ReplaySource). Casos medidos:
+
+- decode: vazão do _notification_handler em notificações de 180 bytes
+- data_manager: custo por amostra de add_sensor_data / add_sensor_batch,
+  sem gravação e gravando (CSV e backends padrão)
+- pipeline: BLEManager -> Pipeline -> DataManager/StreamHub/ImpactDetector
+- api_json: tempo e tamanho do JSON de /api/chart_data e /api/export_data (sem e com o cache de respostas)
+  (Flask test client) para vários tamanhos de buffer
+- memory: bytes por amostra no buffer do gráfico e no lote decodificado
+- wire_format: bytes e notificações por amostra no formato v1 e nos frames
+  v2 (vazão efetiva do BLE) e vazão de decodificação do v2
+
+O JSON (--output) guarda commit, versões e métricas; --compare mostra a
+variação em relação a um resultado anterior e termina com código 1 se algum
+caso piorar além de --tolerance.
+
+Uso (a partir de appFlask/):
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --session data/dados_ble.csv --compare bench.json
+    python benchmarks/suite.py --only decode api_json
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from routes.api_routes import api_bp
+from services.app_state import app_state
+from services.ble_manager import BLEManager, SensorData
+from services.data_manager import DataManager
+from services.device_session import DeviceSession
+from services.simulator import MTU_BYTES, FirmwareModel, ReplaySource
+from services.wire_format import encode_frames
+
+def load_stream(session: str, samples: int, seed: int) -> np.ndarray:
+    """Registros no formato do firmware: sessão gravada (em laço) ou simulador"""
+    source = ReplaySource(session) if session else FirmwareModel(seed=seed)
+    return source.generate(samples)
+
+def best_of(repeat: int, fn: Callable[[], float]) -> float:
+    """Menor tempo entre `repeat` execuções (menos sensível a ruído do sistema)"""
+    return min(fn() for _ in range(repeat))
+
+def decode_records(stream: np.ndarray) -> List[tuple]:
+    """Decodifica o stream inteiro pelo BLEManager (lista de SensorRecord)"""
+    manager = BLEManager()
+    manager.buffer.extend(stream.tobytes())
+    return manager.decode_buffer()
+
+def bench_decode(stream: np.ndarray, repeat: int) -> Dict:
+    payload = stream.tobytes()
+    chunks = [bytearray(payload[i:i + MTU_BYTES]) for i in range(0, len(payload), MTU_BYTES)]
+    
+    def run() -> float:
+        manager = BLEManager()
+        manager.add_batch_callback(lambda batch: None)
+        start = time.perf_counter()
+        for chunk in chunks:
+            manager._notification_handler(None, chunk)
+        return time.perf_counter() - start
+    
+    elapsed = best_of(repeat, run)
+    return {
+        'records': len(stream),
+        'notifications': len(chunks),
+        'records_per_s': len(stream) / elapsed,
+        'mb_per_s': len(payload) / elapsed / 1e6,
+        'ns_per_record': elapsed / len(stream) * 1e9,
+    }
+
+def bench_data_manager(stream: np.ndarray, repeat: int) -> Dict:
+    records = decode_records(stream)
+    samples = [SensorData(*r) for r in records]
+    batches = [records[i:i + 8] for i in range(0, len(records), 8)]
+    folder = tempfile.mkdtemp(prefix="bench_suite_")
+    
+    def run(per_sample: bool, backends: List[str]) -> float:
+        manager = DataManager(folder, max_chart_points=10_000)
+        manager.storage_backends = backends
+        with contextlib.redirect_stdout(io.StringIO()):
+            if backends:
+                manager.start_csv_recording("bench.csv")
+            start = time.perf_counter()
+            if per_sample:
+                for sample in samples:
+                    manager.add_sensor_data(sample)
+            else:
+                for batch in batches:
+                    manager.add_sensor_batch(batch)
+            # Inclui a drenagem da fila de gravação
+            manager.stop_csv_recording()
+            return time.perf_counter() - start
+    
+    results = {}
+    for name, per_sample, backends in (('add_sensor_data', True, []),
+                                       ('add_sensor_data_csv', True, ['csv']),
+                                       ('add_sensor_batch', False, []),
+                                       ('add_sensor_batch_csv', False, ['csv']),
+                                       ('add_sensor_batch_csv_npy', False, ['csv', 'npy'])):
+        elapsed = best_of(repeat, lambda: run(per_sample, backends))
+        results[f'{name}_ns_per_sample'] = elapsed / len(records) * 1e9
+    return results
+
+def bench_pipeline(stream: np.ndarray, repeat: int) -> Dict:
+    payload = stream.tobytes()
+    chunks = [bytearray(payload[i:i + MTU_BYTES]) for i in range(0, len(payload), MTU_BYTES)]
+    folder = tempfile.mkdtemp(prefix="bench_suite_")
+    
+    def run() -> float:
+        session = DeviceSession(csv_folder=folder)
+        session.configure({'CHART_MAX_POINTS': 10_000})
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for chunk in chunks:
+                session.ble_manager._notification_handler(None, chunk)
+            session.pipeline.flush()
+            elapsed = time.perf_counter() - start
+        session.pipeline.stop()
+        return elapsed
+    
+    elapsed = best_of(repeat, run)
+    return {
+        'records_per_s': len(stream) / elapsed,
+        'ns_per_record': elapsed / len(stream) * 1e9,
+    }
+
+def bench_api_json(stream: np.ndarray, repeat: int, sizes: List[int]) -> Dict:
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    client = app.test_client()
+    data_manager = app_state.default_session.data_manager
+    records = decode_records(stream)
+    
+    results = {}
+    for size in sizes:
+        data_manager.set_chart_capacity(size)
+        data_manager.clear_chart_data()
+        for i in range(0, size, len(records)):
+            data_manager.add_sensor_batch(records[:size - i])
+        for name, url in (('chart_data', '/api/chart_data'),
+                          ('chart_data_lttb1000', '/api/chart_data?max_points=1000'),
+                          ('export_data', '/api/export_data')):
+            body = client.get(url).get_data()
+            
+            def run(cold: bool = True) -> float:
+                if cold:
+                    app_state.response_cache.clear()  # mede a serialização, não o cache
+                start = time.perf_counter()
+                client.get(url).get_data()
+                return time.perf_counter() - start
+            
+            elapsed = best_of(repeat, run)
+            results[f'{name}_{size}_ms'] = elapsed * 1000
+            results[f'{name}_{size}_cached_ms'] = best_of(repeat, lambda: run(cold=False)) * 1000
+            results[f'{name}_{size}_bytes'] = len(body)
+    return results
+
+def bench_memory(stream: np.ndarray, capacity: int) -> Dict:
+    records = decode_records(stream)
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    manager = DataManager(tempfile.gettempdir(), max_chart_points=capacity)
+    chart_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    decoded = decode_records(stream)
+    decoded_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    
+    manager.add_sensor_batch(records)
+    return {
+        'chart_capacity': capacity,
+        'chart_buffer_bytes_per_sample': manager.chart_data.nbytes / capacity,
+        'data_manager_bytes_per_sample': chart_bytes / capacity,
+        'decoded_record_bytes_per_sample': decoded_bytes / len(decoded),
+        'wire_bytes_per_sample': stream.dtype.itemsize,
+    }
+
+def bench_wire_format(stream: np.ndarray, repeat: int) -> Dict:
+    frames = encode_frames(stream, MTU_BYTES)
+    v1_notifications = -(-stream.nbytes // MTU_BYTES)
+    v2_bytes = sum(len(f) for f in frames)
+    
+    def run() -> float:
+        manager = BLEManager()
+        manager.add_batch_callback(lambda batch: None)
+        start = time.perf_counter()
+        for frame in frames:
+            manager._notification_handler(None, frame)
+        return time.perf_counter() - start
+    
+    elapsed = best_of(repeat, run)
+    return {
+        'v1_bytes_per_sample': stream.dtype.itemsize,
+        'v2_bytes_per_sample': v2_bytes / len(stream),
+        'v1_samples_per_notification': len(stream) / v1_notifications,
+        'v2_samples_per_notification': len(stream) / len(frames),
+        # Ganho de vazão com o mesmo ritmo de notify() do firmware
+        'v2_throughput_gain': v1_notifications / len(frames),
+        'v2_decode_records_per_s': len(stream) / elapsed,
+    }
+
+CASES = {
+    'decode': lambda stream, args: bench_decode(stream, args.repeat),
+    'data_manager': lambda stream, args: bench_data_manager(stream[:args.data_manager_samples], args.repeat),
+    'pipeline': lambda stream, args: bench_pipeline(stream, args.repeat),
+    'api_json': lambda stream, args: bench_api_json(stream, args.repeat, args.chart_sizes),
+    'memory': lambda stream, args: bench_memory(stream, max(args.chart_sizes)),
+    'wire_format': lambda stream, args: bench_wire_format(stream, args.repeat),
+}
+
+def git_revision() -> Dict:
+    """Commit atual e se a árvore tem alterações (para comparar resultados)"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+def lower_is_better(metric: str) -> bool:
+    """Tempos, custos e bytes: menor é melhor; vazões e ganhos: maior é melhor"""
+    return not metric.endswith(('_per_s', '_per_notification', '_gain'))
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Imprime a variação de cada métrica e retorna as que pioraram além da tolerância"""
+    regressions = []
+    print(f"\nComparação com {baseline['meta'].get('commit') or '?'}:")
+    for case, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            old = baseline['results'].get(case, {}).get(metric)
+            if not old or not isinstance(value, (int, float)) or metric.endswith(('records', 'notifications', 'capacity')):
+                continue
+            change = value / old - 1
+            worse = change > tolerance if lower_is_better(metric) else change < -tolerance
+            flag = "  <-- regressão" if worse else ""
+            print(f"  {case}.{metric}: {old:,.3f} -> {value:,.3f} ({change:+.1%}){flag}")
+            if worse:
+                regressions.append(f"{case}.{metric}")
+    return regressions
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--session", help="sessão gravada (.csv/.npy/.arrow); padrão: simulador do firmware")
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--data-manager-samples", type=int, default=20_000,
+                        help="amostras do caso data_manager (o custo por chamada é alto)")
+    parser.add_argument("--seed", type=int, default=0, help="semente do simulador")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por medida (vale a melhor)")
+    parser.add_argument("--chart-sizes", type=int, nargs="+", default=[100, 10_000, 100_000])
+    parser.add_argument("--only", nargs="+", choices=list(CASES), help="casos a executar")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="piora relativa aceita no --compare")
+    args = parser.parse_args()
+    
+    stream = load_stream(args.session, args.samples, args.seed)
+    result = {
+        'meta': {
+            **git_revision(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'source': args.session or f'simulator(seed={args.seed})',
+            'samples': len(stream),
+            'repeat': args.repeat,
+        },
+        'results': {},
+    }
+    for name in args.only or CASES:
+        start = time.perf_counter()
+        result['results'][name] = CASES[name](stream, args)
+        print(f"{name}: {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        with contextlib.redirect_stdout(sys.stderr):
+            regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,171 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request
 from services.app_state import app_state
-import threading
+from services.device_session import DeviceSession
+from services.exporter import iter_blocks, window_records
+from routes.caching import cached_json
+from routes.export import export_range, export_requested, export_response
+from routes.params import downsampling_args, int_arg
 
 api_bp = Blueprint('api', __name__)
 
+# Rotas que podem criar a sessão de um dispositivo em /api/devices/<address>/...
+OPENING_ENDPOINTS = ('start', 'connect')
+
+@api_bp.url_value_preprocessor
+def pull_device_address(endpoint, values):
+    """O mesmo blueprint atende /api (sessão padrão) e /api/devices/<address> (um MOBO)"""
+    g.device_address = values.pop('address', None) if values else None
+
+@api_bp.before_request
+def resolve_session():
+    """Resolve a sessão do dispositivo da URL (404 se não existir e a rota não a criar)"""
+    address = g.device_address
+    if address is None:
+        g.session = app_state.default_session
+        return None
+    
+    if request.endpoint.rsplit('.', 1)[-1] in OPENING_ENDPOINTS:
+        try:
+            g.session = app_state.devices.open(address)
+        except RuntimeError as e:
+            return jsonify({"message": str(e)}), 409
+        return None
+    
+    g.session = app_state.devices.get(address)
+    if g.session is None:
+        return jsonify({"message": f"Dispositivo {address} sem sessão ativa"}), 404
+    return None
+
+def current_session() -> DeviceSession:
+    """Sessão da requisição atual"""
+    return g.session
+
 @api_bp.route("/scan")
 def scan():
-    """Escaneia dispositivos BLE disponíveis"""
-    thread = app_state.ble_manager.start_scan_async()
-    thread.join(timeout=8)  # Timeout de 8 segundos
-    
-    devices = app_state.ble_manager.get_available_devices()
-    device_list = [{'name': d.name, 'address': d.address} for d in devices]
+    """Retorna os dispositivos BLE do registro do scanner contínuo (sem bloquear)"""
+    scanner = app_state.device_scanner
+    scanner.start()
     
+    devices = scanner.get_devices()
+    if current_session().source != 'ble':
+        # Fonte simulada: o dispositivo virtual aparece primeiro na lista
+        devices = current_session().ble_manager.get_available_devices() + devices
+    status = scanner.get_status()
     return jsonify({
-        "message": f"Escaneamento concluído. {len(devices)} dispositivos encontrados.",
-        "devices": device_list
+        "message": f"{len(devices)} dispositivos encontrados.",
+        "devices": [d.to_dict() for d in devices],
+        "scanning": status['running'],
+        "error": status['error']
     })
 
 @api_bp.route("/start")
 def start():
-    """Inicia conexão automática com ESP32"""
-    if app_state.ble_manager.get_status() != "Desconectado":
+    """Inicia conexão automática com ESP32 (ou com o dispositivo da URL)"""
+    session = current_session()
+    if session.ble_manager.get_status() != "Desconectado":
         return jsonify({"message": "BLE já está ativo"})
     
-    # Inicia gravação CSV
-    app_state.data_manager.start_csv_recording()
-    
-    # Inicia conexão
-    app_state.ble_manager.start_esp32_connection_async()
+    # Inicia gravação CSV e conexão
+    session.connect()
     
     return jsonify({"message": "Iniciando conexão BLE..."})
 
 @api_bp.route("/connect", methods=["POST"])
 def connect():
     """Conecta a um dispositivo específico"""
-    data = request.get_json()
-    device_address = data.get('address')
+    data = request.get_json(silent=True) or {}
+    device_address = g.device_address or data.get('address')
     
     if not device_address:
         return jsonify({"message": "Endereço do dispositivo não fornecido."}), 400
     
-    # Inicia gravação CSV
-    app_state.data_manager.start_csv_recording()
-    
-    # Inicia conexão
-    app_state.ble_manager.start_connection_async(device_address)
+    # Inicia gravação CSV e conexão
+    current_session().connect(device_address)
     
     return jsonify({"message": f"Conectando ao dispositivo {device_address}..."})
 
 @api_bp.route("/disconnect")
 def disconnect():
     """Desconecta do dispositivo atual"""
-    app_state.ble_manager.disconnect()
-    app_state.data_manager.stop_csv_recording()
+    current_session().disconnect()
     
     return jsonify({"message": "Desconectando..."})
 
 @api_bp.route("/status")
 def get_status():
     """Retorna status atual da conexão"""
-    status = app_state.ble_manager.get_status()
-    new_data = app_state.data_manager.has_new_data()
+    status = current_session().ble_manager.get_status()
+    new_data = current_session().data_manager.has_new_data()
     
     return jsonify({
         "status": status,
         "new_data": new_data
     })
 
+@api_bp.route("/csv_status")
+def get_csv_status():
+    """Retorna profundidade da fila e contadores da gravação CSV"""
+    return jsonify(current_session().data_manager.get_csv_stats())
+
+@api_bp.route("/pipeline")
+def get_pipeline_status():
+    """Profundidade das filas, descartes e atraso de cada estágio do pipeline"""
+    return jsonify(current_session().pipeline.get_stats())
+
+@api_bp.route("/integrity")
+def get_integrity():
+    """Relatório de perdas da conexão: formato, lacunas, duplicatas, ressincronizações e erros de CRC"""
+    return jsonify(current_session().ble_manager.get_integrity_report())
+
 @api_bp.route("/chart_data")
 def get_chart_data():
-    """Retorna dados para o gráfico"""
-    chart_data = app_state.data_manager.get_chart_data()
-    return jsonify({"data": chart_data})
+    """Retorna dados para o gráfico (com ?since=<cursor>, apenas as amostras novas).
+    
+    ?max_points=N&method=lttb|minmax reduz o resultado no servidor.
+    """
+    try:
+        since = int_arg('since')
+        max_points, method = downsampling_args()
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (since inteiro, max_points inteiro >= 3, method lttb|minmax)"}), 400
+    
+    data_manager = current_session().data_manager
+    if since is not None:
+        # Cada consulta tem um cursor novo: no cache só ocuparia espaço (e expulsaria as outras)
+        return jsonify(data_manager.get_chart_delta(since, max_points, method))
+    
+    return cached_json(lambda: data_manager.data_version, lambda: data_manager.get_chart_payload(max_points, method))
+
+@api_bp.route("/stream")
+def stream():
+    """Stream SSE: snapshot inicial e depois apenas as novas amostras, em frames"""
+    return Response(
+        current_session().stream_hub.stream(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@api_bp.route("/events")
+def get_events():
+    """Eventos de impacto detectados (?since_id=&sensor=&limit=)"""
+    try:
+        since_id = int_arg('since_id', 0)
+        sensor = int_arg('sensor')
+        limit = int_arg('limit', 1000)
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (since_id/sensor/limit inteiros)"}), 400
+    
+    events = current_session().impact_detector.get_events(since_id, sensor, max(0, limit))
+    return jsonify({
+        "events": events,
+        "last_id": events[-1]['id'] if events else since_id,
+        "summary": current_session().impact_detector.get_summary(),
+    })
 
 @api_bp.route("/interval_info")
 def get_interval_info():
     """Retorna informações sobre intervalos detectados"""
-    interval_info = app_state.ble_manager.get_interval_info()
+    interval_info = current_session().ble_manager.get_interval_info()
     return jsonify({
         "current_interval": interval_info['current_interval'],
         "zones": interval_info['zones'][-10:]  # Últimas 10 mudanças
@@ -85,18 +173,32 @@ def get_interval_info():
 
 @api_bp.route("/data_summary")
 def get_data_summary():
-    """Retorna resumo dos dados coletados"""
-    summary = app_state.data_manager.get_data_summary()
-    return jsonify(summary)
+    """Retorna resumo dos dados coletados (?session=1 inclui totais da sessão)"""
+    include_session = request.args.get('session', '0') in ('1', 'true')
+    data_manager = current_session().data_manager
+    return cached_json(lambda: data_manager.data_version,
+                       lambda: data_manager.get_data_summary(include_session=include_session))
 
 @api_bp.route("/clear_data", methods=["POST"])
 def clear_data():
     """Limpa dados do gráfico (não afeta CSV)"""
-    app_state.data_manager.clear_chart_data()
+    current_session().clear()
     return jsonify({"message": "Dados do gráfico limpos com sucesso"})
 
 @api_bp.route("/export_data")
 def export_data():
-    """Exporta todos os dados em formato JSON"""
-    exported_data = app_state.data_manager.export_data_to_dict()
-    return jsonify(exported_data)
\ No newline at end of file
+    """Exporta todos os dados em formato JSON.
+    
+    Com format/compress/start/end/sensors, exporta o buffer do gráfico em
+    streaming (csv, ndjson ou npy, opcionalmente comprimido).
+    """
+    if export_requested():
+        try:
+            start, end, chunk_rows = export_range()
+        except ValueError:
+            return jsonify({"message": "Parâmetros inválidos (start/end/chunk_rows inteiros)"}), 400
+        records = window_records(current_session().data_manager.get_chart_window())
+        return export_response(lambda: iter_blocks(records, start, end, chunk_rows), records.dtype, "chart_data")
+    
+    data_manager = current_session().data_manager
+    return cached_json(lambda: data_manager.data_version, data_manager.export_data_to_dict)
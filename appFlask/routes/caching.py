@@ -0,0 +1,41 @@
+from typing import Callable
+from flask import Response, current_app, request
+from services.app_state import app_state
+from services.metrics import RESPONSE_CACHE_REQUESTS
+
+def cached_json(version: Callable[[], object], build) -> Response:
+    """Resposta JSON da consulta atual (rota + parâmetros) pelo cache de respostas.
+    
+    ``version()`` identifica o estado dos dados; ``build()`` só roda quando a
+    consulta não está no cache nessa versão. Com If-None-Match igual à ETag
+    atual, responde 304 sem corpo. A versão é lida antes e depois de
+    ``build()``: se os dados mudaram no meio (ingestão concorrente), o corpo
+    é entregue sem ETag e não entra no cache, para nunca ficar guardado sob
+    uma versão que não é a dele.
+    """
+    cache = app_state.response_cache
+    key = (request.path, tuple(sorted(request.args.items(multi=True))))
+    current = version()
+    etag = cache.etag(key, current)
+    endpoint = request.endpoint or 'unknown'
+    
+    if etag in request.if_none_match:
+        RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result='not_modified').inc()
+        response = Response(status=304)
+    else:
+        body = cache.get(key, current)
+        if body is None:
+            RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result='miss').inc()
+            body = current_app.json.dumps(build()).encode('utf-8')
+            if version() != current:
+                response = Response(body, mimetype='application/json')
+                response.headers['Cache-Control'] = 'no-store'
+                return response
+            cache.put(key, current, body)
+        else:
+            RESPONSE_CACHE_REQUESTS.labels(endpoint=endpoint, result='hit').inc()
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # O cliente pode guardar a resposta, mas revalida a cada consulta
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,80 @@
+import numpy as np
+from flask import Blueprint, jsonify, request
+from services.app_state import app_state
+from services.calibration import ModuleCalibration, SensorCurve, fit_curve
+
+calibration_bp = Blueprint('calibration', __name__)
+
+def reload_sessions() -> None:
+    """Reaplica as tabelas em todas as sessões (vale para os próximos lotes)"""
+    for session in app_state.all_sessions():
+        session.load_calibration()
+
+@calibration_bp.route("")
+def list_calibrations():
+    """Tabelas de calibração gravadas e a tabela em uso por sessão"""
+    return jsonify({
+        "modules": app_state.calibration_store.list(),
+        "active": {session.metrics_label: session.data_manager.calibration.module
+                   for session in app_state.all_sessions()}
+    })
+
+@calibration_bp.route("/<module>")
+def get_calibration(module):
+    """Tabela que vale para o módulo (a própria, a 'default' ou a escala linear)"""
+    calibration = app_state.calibration_store.get(module)
+    return jsonify({**calibration.to_dict(), "inherited": calibration.module != module})
+
+@calibration_bp.route("/<module>", methods=["PUT"])
+def put_calibration(module):
+    """Grava a tabela do módulo ({"sensors": [uma curva 'poly' ou 'piecewise' por sensor]})"""
+    try:
+        calibration = ModuleCalibration.from_dict(request.get_json(force=True) or {}, module)
+    except (TypeError, ValueError, AttributeError) as e:
+        return jsonify({"message": f"Tabela de calibração inválida: {e}"}), 400
+    app_state.calibration_store.set(calibration)
+    reload_sessions()
+    return jsonify(calibration.to_dict())
+
+@calibration_bp.route("/<module>/fit", methods=["POST"])
+def fit_calibration(module):
+    """Ajusta as curvas a partir de cargas de referência e grava a tabela do módulo.
+    
+    Corpo: {"kind": "piecewise"|"poly"|"linear", "degree": 2,
+    "references": [{"sensor": 1, "raw": 2048, "kg": 10.0}, ...]}. Sensores
+    sem referências mantêm a curva atual.
+    """
+    body = request.get_json(force=True) or {}
+    kind = body.get('kind', 'piecewise')
+    try:
+        degree = int(body.get('degree', 1))
+        references = [(int(r['sensor']), float(r['raw']), float(r['kg'])) for r in body.get('references') or []]
+        if not references:
+            raise ValueError("sem pontos de referência")
+        current = app_state.calibration_store.get(module)
+        num_sensors = max(len(current.sensors), max(sensor for sensor, _, _ in references))
+        curves = [current.sensors[i] if i < len(current.sensors) else SensorCurve() for i in range(num_sensors)]
+        residuals = {}
+        for sensor in sorted({sensor for sensor, _, _ in references}):
+            if sensor < 1:
+                raise ValueError(f"sensor inválido: {sensor}")
+            raw = [r for s, r, _ in references if s == sensor]
+            kg = [k for s, _, k in references if s == sensor]
+            curves[sensor - 1] = fit_curve(raw, kg, kind, degree)
+            error = curves[sensor - 1].apply(raw) - np.asarray(kg)
+            residuals[f'sensor_{sensor}'] = {'points': len(raw), 'rms_kg': round(float(np.sqrt(np.mean(error ** 2))), 4)}
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"message": f"Referências de calibração inválidas: {e}"}), 400
+    
+    calibration = ModuleCalibration(curves, module)
+    app_state.calibration_store.set(calibration)
+    reload_sessions()
+    return jsonify({**calibration.to_dict(), "residuals": residuals})
+
+@calibration_bp.route("/<module>", methods=["DELETE"])
+def delete_calibration(module):
+    """Remove a tabela do módulo (volta a valer a 'default' ou a escala linear)"""
+    if not app_state.calibration_store.delete(module):
+        return jsonify({"message": f"Módulo {module} sem tabela de calibração"}), 404
+    reload_sessions()
+    return jsonify({"message": f"Calibração de {module} removida"})
@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify
+from services.app_state import app_state
+
+devices_bp = Blueprint('devices', __name__)
+
+@devices_bp.route("")
+def list_devices():
+    """Lista as sessões por dispositivo e os dispositivos vistos pelo scanner"""
+    return jsonify({
+        "sessions": [session.get_status() for session in app_state.devices.list()],
+        "max_devices": app_state.devices.max_devices,
+        "seen": [d.to_dict() for d in app_state.device_scanner.get_devices()]
+    })
+
+@devices_bp.route("/<address>", methods=["DELETE"])
+def close_device(address):
+    """Desconecta o dispositivo, finaliza a gravação e remove a sessão"""
+    if not app_state.devices.close(address):
+        return jsonify({"message": f"Dispositivo {address} sem sessão ativa"}), 404
+    return jsonify({"message": f"Sessão de {address} encerrada"})
@@ -0,0 +1,43 @@
+from flask import Response, jsonify, request
+from services.exporter import COMPRESSIONS, DEFAULT_CHUNK_ROWS, EXPORT_FORMATS, export_stream, select_fields
+from routes.params import int_arg
+
+# Parâmetros que pedem a exportação em streaming em /download e /api/export_data
+EXPORT_PARAMS = ('format', 'compress', 'start', 'end', 'sensors')
+
+def export_requested() -> bool:
+    """A query string tem algum parâmetro de exportação"""
+    return any(name in request.args for name in EXPORT_PARAMS)
+
+def export_range():
+    """start/end (timeStamp) e registros por bloco da query string (ValueError se inválidos)"""
+    chunk_rows = int_arg('chunk_rows', DEFAULT_CHUNK_ROWS)
+    if chunk_rows <= 0:
+        raise ValueError("chunk_rows")
+    return int_arg('start'), int_arg('end'), chunk_rows
+
+def export_response(blocks, dtype, name: str):
+    """Resposta em streaming (format csv|ndjson|npy, compress none|gzip|zstd, sensors=1,3).
+    
+    Parâmetros inválidos ou zstd indisponível retornam 400 antes do primeiro byte.
+    """
+    fmt = request.args.get('format', 'csv')
+    compression = request.args.get('compress', 'none')
+    try:
+        if fmt not in EXPORT_FORMATS or compression not in COMPRESSIONS:
+            raise ValueError(f"{fmt}/{compression}")
+        sensors = request.args.get('sensors')
+        sensors = [int(s) for s in sensors.split(',')] if sensors else None
+        fields = select_fields(dtype.names, sensors)
+        stream = export_stream(blocks, dtype, fields, fmt, compression, int_arg('level'))
+    except ValueError as e:
+        return jsonify({"message": f"Parâmetros de exportação inválidos ({e}): format csv|ndjson|npy, "
+                                   "compress none|gzip|zstd, sensors=1,3, start/end/level inteiros"}), 400
+    except RuntimeError as e:
+        return jsonify({"message": str(e)}), 400
+    
+    content_type, ext = EXPORT_FORMATS[fmt]
+    compressed_type, compressed_ext = COMPRESSIONS[compression]
+    filename = name + ext + compressed_ext
+    return Response(stream, mimetype=compressed_type or content_type,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
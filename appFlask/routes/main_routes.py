@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, send_file, current_app
+from flask import Blueprint, render_template, request, send_file, current_app
 from services.app_state import app_state
+from services.exporter import session_blocks
 import os
+from routes.export import export_range, export_requested, export_response
 
 main_bp = Blueprint('main', __name__)
 
@@ -11,12 +13,40 @@ def index():
 
 @main_bp.route("/download")
 def download():
-    """Download do arquivo CSV atual"""
+    """Download do CSV da sessão atual (ou da sessão gravada em ?session=<id>).
+    
+    Com format/compress/start/end/sensors, a sessão é exportada em streaming
+    (como em /api/sessions/<id>/export).
+    """
     try:
-        csv_filename = app_state.data_manager.get_csv_filename()
+        session_id = request.args.get('session')
+        if export_requested():
+            return stream_download(session_id)
+        if session_id:
+            path = app_state.session_library.find(session_id)
+            csv_path = path and os.path.splitext(path)[0] + '.csv'
+            csv_filename = csv_path if csv_path and os.path.exists(csv_path) else path
+        else:
+            csv_filename = app_state.data_manager.get_csv_filename()
         if csv_filename and os.path.exists(csv_filename):
             return send_file(csv_filename, as_attachment=True)
         else:
             return "Arquivo CSV não encontrado", 404
     except Exception as e:
-        return f"Erro ao baixar arquivo: {str(e)}", 500
\ No newline at end of file
+        return f"Erro ao baixar arquivo: {str(e)}", 500
+
+def stream_download(session_id):
+    """Exportação em streaming da sessão pedida ou da gravação atual"""
+    if session_id:
+        path = app_state.session_library.find(session_id)
+    else:
+        path = app_state.data_manager.get_csv_filename()
+        session_id = path and os.path.splitext(os.path.basename(path))[0]
+    if not path or not os.path.exists(path):
+        return "Arquivo da sessão não encontrado", 404
+    try:
+        start, end, chunk_rows = export_range()
+    except ValueError:
+        return "Parâmetros inválidos (start/end/chunk_rows inteiros)", 400
+    blocks, dtype = session_blocks(path, start, end, chunk_rows)
+    return export_response(blocks, dtype, session_id)
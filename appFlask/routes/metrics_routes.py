@@ -0,0 +1,24 @@
+import time
+from flask import Blueprint, Response, g, request
+from services.metrics import HTTP_REQUEST_SECONDS, registry
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.before_app_request
+def start_timer():
+    """Marca o início de toda requisição da aplicação"""
+    g.request_start = time.perf_counter()
+
+@metrics_bp.after_app_request
+def observe_latency(response):
+    """Latência do handler por endpoint (nome da rota, não a URL, para limitar as séries)"""
+    start = g.get('request_start')
+    if start is not None:
+        HTTP_REQUEST_SECONDS.labels(endpoint=request.endpoint or 'not_found', method=request.method,
+                                    status=response.status_code).observe(time.perf_counter() - start)
+    return response
+
+@metrics_bp.route("")
+def metrics():
+    """Métricas no formato texto do Prometheus"""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,26 @@
+from flask import request
+from services.downsampling import DOWNSAMPLING_METHODS, MIN_POINTS
+
+def int_arg(name: str, default=None):
+    """Lê um parâmetro inteiro opcional da query string (ValueError se inválido)"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    return int(value)
+
+def float_arg(name: str, default=None):
+    """Lê um parâmetro numérico opcional da query string (ValueError se inválido)"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    return float(value)
+
+def downsampling_args():
+    """max_points (opcional, >= MIN_POINTS) e method da query string (ValueError se inválidos)"""
+    max_points = int_arg('max_points')
+    if max_points is not None and max_points < MIN_POINTS:
+        raise ValueError(f"max_points < {MIN_POINTS}")
+    method = request.args.get('method', 'lttb')
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(method)
+    return max_points, method
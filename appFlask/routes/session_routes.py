@@ -0,0 +1,232 @@
+from flask import Blueprint, jsonify, request
+from services.app_state import app_state
+from services.calibration import kg_values
+from services.data_manager import downsample_columns, led_segments
+from services.exporter import session_blocks
+from services.storage import recompute_intervals
+import os
+from routes.caching import cached_json
+from routes.export import export_range, export_response
+from routes.params import downsampling_args, float_arg, int_arg
+
+session_bp = Blueprint('sessions', __name__)
+
+# Limite padrão de pontos por resposta de intervalo
+DEFAULT_RANGE_LIMIT = 100_000
+
+# Sessões por página na listagem/busca do índice
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def catalog_page(**filters):
+    """Página do índice de sessões com os parâmetros comuns (limit, offset, order, desc)"""
+    limit = min(int_arg('limit', DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE)
+    offset = int_arg('offset', 0)
+    if limit < 0 or offset < 0:
+        raise ValueError("limit/offset")
+    result = app_state.session_catalog.search(
+        order=request.args.get('order', 'started_at'),
+        descending=request.args.get('desc', '1') not in ('0', 'false'),
+        limit=limit, offset=offset, **filters)
+    return jsonify({"limit": limit, "offset": offset, **result})
+
+@session_bp.route("")
+def list_sessions():
+    """Lista as sessões gravadas, a partir do índice (mais recentes primeiro, paginado)"""
+    try:
+        return catalog_page()
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (limit/offset inteiros, order started_at|samples|size_bytes|id)"}), 400
+
+@session_bp.route("/search")
+def search_sessions():
+    """Busca no índice: dispositivo, texto no nome, período, tamanho e pico dos sensores"""
+    try:
+        return catalog_page(
+            device=request.args.get('device'),
+            text=request.args.get('q'),
+            started_after=float_arg('from'),
+            started_before=float_arg('to'),
+            min_samples=int_arg('min_points'),
+            status=request.args.get('status'),
+            sensor=int_arg('sensor'),
+            min_peak=int_arg('min_peak'),
+            max_peak=int_arg('max_peak'))
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (from/to em segundos desde 1970; "
+                                   "min_points, sensor, min_peak, max_peak, limit e offset inteiros)"}), 400
+
+@session_bp.route("/reindex", methods=["POST"])
+def reindex_sessions():
+    """Põe o índice em dia com a pasta de dados (importa, recupera e remove entradas)"""
+    return jsonify(app_state.session_catalog.sync(app_state.recording_files()))
+
+def recording_ids():
+    """IDs das sessões sendo gravadas agora (arquivos que ainda crescem)"""
+    return {os.path.splitext(os.path.basename(f))[0] for f in app_state.recording_files()}
+
+@session_bp.route("/analytics", methods=["POST"])
+def batch_analytics():
+    """Análise em lote (impactos, picos em kg, médias por GH, intervalos) em um pool de processos.
+    
+    Corpo JSON opcional: {"sessions": [ids], "workers": n, "force": false}; sem
+    "sessions", analisa todas. Resultados em cache pelo hash do conteúdo.
+    """
+    body = request.get_json(silent=True) or {}
+    ids = body.get('sessions') or app_state.session_library.list_sessions()
+    workers = body.get('workers')
+    if not isinstance(ids, list) or not (workers is None or isinstance(workers, int) and workers > 0):
+        return jsonify({"message": "Parâmetros inválidos (sessions lista de ids, workers inteiro positivo)"}), 400
+    
+    busy = recording_ids()
+    sessions, errors = [], {}
+    for session_id in map(str, ids):
+        path = app_state.session_library.find(session_id)
+        if path is None:
+            errors[session_id] = "Sessão não encontrada"
+        elif session_id in busy:
+            errors[session_id] = "Sessão em gravação"
+        else:
+            sessions.append((session_id, path))
+    
+    report = app_state.session_analytics.analyze(sessions, workers=workers, force=bool(body.get('force')))
+    report['errors'].update(errors)
+    return jsonify(report)
+
+@session_bp.route("/<session_id>/analytics")
+def session_analytics(session_id):
+    """Métricas de uma sessão (do cache, se o arquivo não mudou)"""
+    path = app_state.session_library.find(session_id)
+    if path is None:
+        return jsonify({"message": "Sessão não encontrada"}), 404
+    if session_id in recording_ids():
+        return jsonify({"message": "Sessão em gravação"}), 409
+    
+    report = app_state.session_analytics.analyze([(session_id, path)], workers=1)
+    if session_id in report['errors']:
+        return jsonify({"message": report['errors'][session_id]}), 500
+    return jsonify({"session": session_id, **report['sessions'][session_id]})
+
+@session_bp.route("/<session_id>")
+def session_info(session_id):
+    """Retorna metadados de uma sessão gravada (do índice; sem entrada, do arquivo)"""
+    entry = app_state.session_catalog.get(session_id)
+    if entry is not None:
+        return jsonify({"session": session_id, **entry})
+    
+    reader = app_state.session_library.open(session_id)
+    if reader is None:
+        return jsonify({"message": "Sessão não encontrada"}), 404
+    
+    return jsonify({"session": session_id, **reader.info()})
+
+@session_bp.route("/<session_id>/range")
+def session_range(session_id):
+    """Retorna apenas os registros com start <= timeStamp <= end (busca binária no mmap)"""
+    reader = app_state.session_library.open(session_id)
+    if reader is None:
+        return jsonify({"message": "Sessão não encontrada"}), 404
+    
+    try:
+        start = int_arg('start')
+        end = int_arg('end')
+        limit = int_arg('limit', DEFAULT_RANGE_LIMIT)
+        if limit <= 0:
+            raise ValueError("limit")
+        max_points, method = downsampling_args()
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (start/end inteiros, limit inteiro > 0, "
+                                   "max_points inteiro >= 3, method lttb|minmax)"}), 400
+    
+    # Versão = tamanho e mtime do arquivo: uma sessão em gravação invalida a entrada ao crescer
+    return cached_json(lambda: file_version(reader.path),
+                       lambda: range_payload(session_id, reader, start, end, limit, max_points, method))
+
+def file_version(path: str) -> str:
+    """Versão de um arquivo de sessão para o cache de respostas"""
+    stat = os.stat(path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def range_payload(session_id, reader, start, end, limit, max_points, method):
+    """Registros de um intervalo de timeStamp (truncados em limit ou reduzidos a max_points)"""
+    i0, i1 = reader.index_range(start, end)
+    
+    if max_points:
+        # Com downsampling o intervalo inteiro é considerado e o payload fica limitado a max_points
+        truncated = False
+        columns = reader.columns(reader.records[i0:i1])
+        segments = led_segments(columns['led'], columns['timestamp'])
+        columns = downsample_columns(columns, max_points, method)
+    else:
+        truncated = i1 - i0 > limit
+        columns = reader.columns(reader.records[i0:min(i1, i0 + limit)])
+        segments = None
+    
+    return {
+        "session": session_id,
+        "count": len(columns['timestamp']),
+        "source_points": i1 - i0,
+        "truncated": truncated,
+        "next_start": int(reader.timestamps[i0 + limit]) if truncated else None,
+        "led_segments": segments,
+        "data": {
+            "timestamp": columns['timestamp'].tolist(),
+            "led": columns['led'].tolist(),
+            "sensors": columns['sensors'].tolist(),
+            "sensors_kg": kg_values(columns['sensors_kg']),
+            "interval_ms": columns['interval_ms'].tolist()
+        }
+    }
+
+@session_bp.route("/<session_id>/export")
+def session_export(session_id):
+    """Exporta uma sessão em streaming (formato, compressão, intervalo e sensores escolhidos)"""
+    path = app_state.session_library.find(session_id)
+    if path is None:
+        return jsonify({"message": "Sessão não encontrada"}), 404
+    
+    try:
+        start, end, chunk_rows = export_range()
+    except ValueError:
+        return jsonify({"message": "Parâmetros inválidos (start/end/chunk_rows inteiros)"}), 400
+    
+    blocks, dtype = session_blocks(path, start, end, chunk_rows)
+    return export_response(blocks, dtype, session_id)
+
+@session_bp.route("/<session_id>/recompute_intervals", methods=["POST"])
+def session_recompute_intervals(session_id):
+    """Recalcula interval_ms e as zonas de intervalo de uma sessão inteira, em todos os seus arquivos"""
+    paths = app_state.session_library.files(session_id)
+    if not paths:
+        return jsonify({"message": "Sessão não encontrada"}), 404
+    
+    # Não reescreve a sessão que ainda está sendo gravada
+    recording = app_state.recording_files()
+    if any(os.path.splitext(f)[0] == os.path.splitext(paths[0])[0] for f in recording):
+        return jsonify({"message": "Sessão em gravação"}), 409
+    
+    # Todos os backends (.npy, .arrow, .csv): download e exportação servem o .csv
+    result, stale = None, {}
+    for path in paths:
+        try:
+            outcome = recompute_intervals(path)
+            result = result or outcome
+        except Exception as e:
+            stale[os.path.basename(path)] = str(e)
+    
+    try:
+        app_state.session_catalog.refresh(session_id)
+    except Exception as e:
+        print(f"Erro ao atualizar a sessão {session_id} no índice: {e}")
+    
+    if stale:
+        return jsonify({"message": "Intervalos não recalculados em parte dos arquivos", "session": session_id,
+                        "updated": [os.path.basename(p) for p in paths if os.path.basename(p) not in stale],
+                        "stale": stale}), 500
+    return jsonify({
+        "session": session_id,
+        "files": [os.path.basename(path) for path in paths],
+        "records": result['records'],
+        "total_zones": len(result['zones']),
+        "zones": result['zones']
+    })
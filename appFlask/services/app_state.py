@@ -1,22 +1,103 @@
-from services.ble_manager import BLEManager
-from services.data_manager import DataManager
+from typing import List
+from services.calibration import CalibrationStore
+from services.device_scanner import DeviceScanner
+from services.device_session import DeviceSession, DeviceSessionManager
+from services.metrics import registry
+from services.response_cache import ResponseCache
+from services.session_analytics import SessionAnalytics
+from services.session_catalog import SessionCatalog
+from services.session_reader import SessionLibrary
+from services.worker_pool import shared_pool
 
 class AppState:
     """Classe para gerenciar o estado global da aplicação"""
     
     def __init__(self):
         # Inicializa gerenciadores
-        self.ble_manager = BLEManager()
-        self.data_manager = DataManager()
+        self.device_scanner = DeviceScanner()
         
-        # Conecta callback do BLE ao DataManager
-        self.ble_manager.add_data_callback(self.data_manager.add_sensor_data)
+        # Índice das sessões gravadas (SQLite na pasta de dados, aberto no primeiro uso)
+        self.session_catalog = SessionCatalog("data")
+        # Tabelas de calibração ADC -> kg por módulo (data/calibration.json)
+        self.calibration_store = CalibrationStore("data")
+        
+        # Sessão padrão (rotas /api/...) e sessões por dispositivo (/api/devices/<addr>/...)
+        self.default_session = DeviceSession(scanner=self.device_scanner, catalog=self.session_catalog,
+                                             calibrations=self.calibration_store)
+        self.devices = DeviceSessionManager(scanner=self.device_scanner,
+                                            csv_folder=self.default_session.data_manager.csv_folder,
+                                            catalog=self.session_catalog,
+                                            calibrations=self.calibration_store)
+        
+        # Atalhos para os gerenciadores da sessão padrão
+        self.data_manager = self.default_session.data_manager
+        self.stream_hub = self.default_session.stream_hub
+        self.impact_detector = self.default_session.impact_detector
+        
+        self.session_library = SessionLibrary(self.data_manager.csv_folder)
+        # Respostas JSON já codificadas das rotas de leitura, por versão dos dados
+        self.response_cache = ResponseCache()
+        # Análise em lote das sessões gravadas (cache em data/analytics.db)
+        self.session_analytics = SessionAnalytics(self.data_manager.csv_folder)
+        
+        # Filas e descartes de todas as sessões em /api/metrics
+        registry.register_collector(self.collect_metrics)
+    
+    @property
+    def ble_manager(self):
+        """BLEManager da sessão padrão (muda quando a fonte de dados é trocada)"""
+        return self.default_session.ble_manager
+    
+    def configure(self, config) -> None:
+        """Aplica as configurações da aplicação Flask aos gerenciadores"""
+        self.default_session.configure(config)
+        self.devices.configure(config)
+        
+        self.device_scanner.ttl = config.get('BLE_SCAN_TTL', self.device_scanner.ttl)
+        shared_pool().workers = config.get('PIPELINE_WORKERS', shared_pool().workers)
+        self.response_cache.max_entries = config.get('RESPONSE_CACHE_MAX_ENTRIES', self.response_cache.max_entries)
+        self.response_cache.max_bytes = config.get('RESPONSE_CACHE_MAX_BYTES', self.response_cache.max_bytes)
+        # A análise em lote usa os mesmos limiares de impacto do tempo real
+        self.session_analytics.workers = config.get('ANALYTICS_WORKERS')
+        self.session_analytics.params.update(
+            threshold_on=config.get('IMPACT_THRESHOLD_ON', 400),
+            threshold_off=config.get('IMPACT_THRESHOLD_OFF', 200),
+            min_samples=config.get('IMPACT_MIN_SAMPLES', 1))
+        if config.get('BLE_CONTINUOUS_SCAN', False):
+            self.device_scanner.start()
+        if config.get('SESSION_INDEX_SYNC', False):
+            # Indexa gravações antigas e interrompidas (cada arquivo é lido uma única vez)
+            self.session_catalog.sync(self.recording_files())
+    
+    def all_sessions(self) -> List[DeviceSession]:
+        """Sessão padrão seguida das sessões por dispositivo"""
+        return [self.default_session] + self.devices.list()
+    
+    def collect_metrics(self):
+        """Amostras de todas as sessões e do scanner para o registro de métricas"""
+        for session in self.all_sessions():
+            yield from session.collect_metrics()
+        status = self.device_scanner.get_status()
+        yield ('ble_scanner_devices', 'gauge', 'Dispositivos no registro do scanner', {}, status['devices'])
+        yield ('ble_scanner_running', 'gauge', 'Scanner BLE contínuo ativo', {}, int(status['running']))
+        pool = shared_pool().get_stats()
+        yield ('worker_pool_threads', 'gauge', 'Threads do pool compartilhado (pipeline e gravação)', {}, pool['workers'])
+        yield ('worker_pool_ready_tasks', 'gauge', 'Estágios e escritores aguardando uma thread do pool', {},
+               pool['ready_tasks'])
+        cache = self.response_cache.get_stats()
+        yield ('http_response_cache_entries', 'gauge', 'Respostas no cache', {}, cache['entries'])
+        yield ('http_response_cache_bytes', 'gauge', 'Bytes das respostas no cache', {}, cache['size_bytes'])
+        yield ('http_response_cache_evictions_total', 'counter', 'Respostas expulsas do cache (LRU/limite de bytes)',
+               {}, cache['evictions'])
+    
+    def recording_files(self) -> List[str]:
+        """Arquivos sendo gravados agora, em todas as sessões"""
+        return [f for s in self.all_sessions() for f in s.data_manager.get_session_files().values()]
     
     def reset(self):
         """Reseta o estado da aplicação"""
-        self.ble_manager.disconnect()
-        self.data_manager.stop_csv_recording()
-        self.data_manager.clear_chart_data()
+        self.devices.close_all()
+        self.default_session.reset()
 
 # Instância global do estado da aplicação
-app_state = AppState()
\ No newline at end of file
+app_state = AppState()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Callable, Coroutine, Optional
+
+class BLEEventLoop:
+    """Thread única com um event loop asyncio de longa duração.
+    
+    Todas as corrotinas BLE (scan, conexão, notificações) rodam neste loop;
+    as rotas Flask apenas submetem trabalho com run_coroutine_threadsafe.
+    """
+    
+    def __init__(self, name: str = "ble-loop"):
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def start(self) -> asyncio.AbstractEventLoop:
+        """Inicia a thread do loop (uma única vez) e retorna o loop"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return self.loop
+            
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def run():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+            
+            self._thread = threading.Thread(target=run, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+            self.loop = loop
+            return loop
+    
+    def submit(self, coro: Coroutine) -> Future:
+        """Agenda uma corrotina no loop e retorna um Future thread-safe"""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+    
+    def call_soon(self, callback: Callable, *args) -> None:
+        """Executa um callback dentro do loop (ex.: sinalizar um asyncio.Event)"""
+        self.start().call_soon_threadsafe(callback, *args)
+    
+    def stop(self) -> None:
+        """Para o loop e aguarda a thread terminar"""
+        with self._lock:
+            if not self._thread:
+                return
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
+            self.loop.close()
+            self._thread = None
+            self.loop = None
+
+# Loop compartilhado por todos os BLEManager do processo
+_shared_loop: Optional[BLEEventLoop] = None
+_shared_lock = threading.Lock()
+
+def shared_loop() -> BLEEventLoop:
+    """Retorna o loop BLE compartilhado do processo"""
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None:
+            _shared_loop = BLEEventLoop()
+        return _shared_loop
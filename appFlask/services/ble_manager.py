@@ -1,11 +1,21 @@
 import asyncio
 import struct
-import threading
-from bleak import BleakClient, BleakScanner
-from typing import List, Dict, Optional, Callable
+import time
+from concurrent.futures import Future, wait
+from bleak import BleakClient
+from typing import List, Dict, Optional, Callable, Tuple
 from dataclasses import dataclass
+from services.ble_loop import BLEEventLoop, shared_loop
+from services.device_scanner import DeviceInfo, DeviceScanner
+from services.interval_detector import IntervalDetector
+from services.stream_validator import StreamValidator
+from services.wire_format import HEADER_SIZE, FrameDecoder, detect_version
+from services import metrics
 
-@dataclass
+# Registro decodificado em lote: (sLed, rSensor1..4, timeStamp, interval_ms)
+SensorRecord = Tuple[int, int, int, int, int, int, int]
+
+@dataclass(slots=True)
 class SensorData:
     """Estrutura para dados do sensor"""
     sLed: int
@@ -16,100 +26,60 @@ class SensorData:
     timeStamp: int
     interval_ms: int = 0
 
-@dataclass
-class DeviceInfo:
-    """Informações do dispositivo BLE"""
-    name: str
-    address: str
-
-class IntervalDetector:
-    """Classe para detectar mudanças de intervalo baseado em sLed"""
-    
-    def __init__(self):
-        self.last_sLed: Optional[int] = None
-        self.last_timestamp_change: Optional[int] = None
-        self.current_interval_ms: int = 0
-        self.interval_zones: List[Dict] = []
-    
-    def detect_interval_change(self, sLed: int, timeStamp: int) -> None:
-        """Detecta mudanças no intervalo baseado nas trocas de sLed"""
-        # Se é a primeira leitura
-        if self.last_sLed is None:
-            self.last_sLed = sLed
-            self.last_timestamp_change = timeStamp
-            return
-        
-        # Se houve mudança no sLed
-        if sLed != self.last_sLed:
-            # Calcula quantos timestamps passaram
-            timestamp_diff = timeStamp - self.last_timestamp_change
-            # Converte para milissegundos (cada timestamp = 50ms)
-            interval_ms = timestamp_diff * 50
-            
-            # Se o intervalo mudou significativamente (diferença > 100ms)
-            if abs(interval_ms - self.current_interval_ms) > 100:
-                # Registra mudança de zona
-                zone_info = {
-                    'timestamp': timeStamp,
-                    'old_interval': self.current_interval_ms,
-                    'new_interval': interval_ms,
-                    'change_time': timestamp_diff
-                }
-                self.interval_zones.append(zone_info)
-                
-                # Mantém apenas últimas 20 mudanças de zona
-                if len(self.interval_zones) > 20:
-                    self.interval_zones.pop(0)
-                
-                print(f"🔄 MUDANÇA DE ZONA detectada em timestamp {timeStamp}:")
-                print(f"   Intervalo anterior: {self.current_interval_ms}ms")
-                print(f"   Novo intervalo: {interval_ms}ms") 
-                print(f"   Diferença de timestamps: {timestamp_diff}")
-                
-                self.current_interval_ms = interval_ms
-            
-            # Atualiza referências
-            self.last_sLed = sLed
-            self.last_timestamp_change = timeStamp
-    
-    def reset(self) -> None:
-        """Reset das variáveis de detecção"""
-        self.last_sLed = None
-        self.last_timestamp_change = None
-        self.current_interval_ms = 0
-        self.interval_zones.clear()
-    
-    def get_current_interval(self) -> int:
-        """Retorna o intervalo atual em ms"""
-        return self.current_interval_ms
-    
-    def get_zones(self) -> List[Dict]:
-        """Retorna as zonas de intervalo detectadas"""
-        return self.interval_zones.copy()
-
 class BLEManager:
     """Gerenciador para conexões BLE e processamento de dados"""
     
-    def __init__(self, device_name: str = "ESP32-SENSOR-SERVER"):
+    def __init__(self, device_name: str = "ESP32-SENSOR-SERVER", ble_loop: Optional[BLEEventLoop] = None,
+                 scanner: Optional[DeviceScanner] = None):
         self.DEVICE_NAME = device_name
         self.CHARACTERISTIC_UUID = "abcd1234-5678-90ab-cdef-1234567890ab"
         self.struct_format = "<B4iI"
-        self.struct_size = struct.calcsize(self.struct_format)
+        self.struct = struct.Struct(self.struct_format)
+        self.struct_size = self.struct.size
+        # Formato no ar: 1 (registros PL crus), 2 (frames compactos) ou 'auto'
+        # (decide pela primeira notificação de cada conexão)
+        self.wire_format = 'auto'
+        self.wire_version: Optional[int] = None
         
         # Estado da conexão
         self.status = "Desconectado"
         self.client: Optional[BleakClient] = None
-        self.available_devices: List[DeviceInfo] = []
         self.should_disconnect = False
         
+        # Loop asyncio compartilhado que executa todas as operações BLE
+        self.ble_loop = ble_loop or shared_loop()
+        # Registro de dispositivos alimentado pelo scanner contínuo
+        self.scanner = scanner or DeviceScanner(self.ble_loop)
+        self._disconnect_event: Optional[asyncio.Event] = None
+        self._connection: Optional[Future] = None
+        self.resolve_timeout = 10.0
+        
         # Buffer para dados recebidos
         self.buffer = bytearray()
         
         # Callbacks para dados recebidos
         self.data_callbacks: List[Callable[[SensorData], None]] = []
+        self.batch_callbacks: List[Callable[[List[SensorRecord]], None]] = []
+        # Callbacks de conexão estabelecida (recebem o endereço resolvido)
+        self.connect_callbacks: List[Callable[[str], None]] = []
         
-        # Detector de intervalo
+        # Validação do stream (alinhamento, lacunas, duplicatas) e detector de intervalo
+        self.validator = StreamValidator(self.struct_format)
+        self.frame_decoder = FrameDecoder(self.validator.num_sensors)
         self.interval_detector = IntervalDetector()
+        
+        # Métricas do caminho quente (séries por dispositivo)
+        self.set_metrics_label("default")
+    
+    def set_metrics_label(self, device: str) -> None:
+        """Define o label ``device`` das métricas e guarda as séries (sem lookup por notificação)"""
+        self.metrics_label = device
+        self._m_notifications = metrics.BLE_NOTIFICATIONS.labels(device=device)
+        self._m_bytes = metrics.BLE_BYTES.labels(device=device)
+        self._m_records = metrics.BLE_RECORDS.labels(device=device)
+        self._m_carries = metrics.BLE_PARTIAL_CARRIES.labels(device=device)
+        self._m_decode = metrics.BLE_DECODE_SECONDS.labels(device=device)
+        self._m_callbacks = metrics.BLE_CALLBACK_SECONDS.labels(device=device)
     
     def add_data_callback(self, callback: Callable[[SensorData], None]) -> None:
         """Adiciona callback para quando dados são recebidos"""
@@ -120,31 +90,118 @@ class BLEManager:
         if callback in self.data_callbacks:
             self.data_callbacks.remove(callback)
     
+    def add_batch_callback(self, callback: Callable[[List[SensorRecord]], None]) -> None:
+        """Adiciona callback que recebe todos os registros de uma notificação de uma vez"""
+        self.batch_callbacks.append(callback)
+    
+    def remove_batch_callback(self, callback: Callable[[List[SensorRecord]], None]) -> None:
+        """Remove callback de lote"""
+        if callback in self.batch_callbacks:
+            self.batch_callbacks.remove(callback)
+    
+    def add_connect_callback(self, callback: Callable[[str], None]) -> None:
+        """Adiciona callback chamado no loop BLE quando a conexão é estabelecida, com o endereço do dispositivo"""
+        self.connect_callbacks.append(callback)
+    
+    def remove_connect_callback(self, callback: Callable[[str], None]) -> None:
+        """Remove callback de conexão"""
+        if callback in self.connect_callbacks:
+            self.connect_callbacks.remove(callback)
+    
+    def _connected(self, address: str) -> None:
+        """Avisa os callbacks de conexão (antes das primeiras notificações)"""
+        for callback in self.connect_callbacks:
+            try:
+                callback(address)
+            except Exception as e:
+                print(f"Erro no callback de conexão: {e}")
+    
     def _notification_handler(self, sender, data: bytearray) -> None:
         """Handler para notificações BLE recebidas"""
+        start = time.perf_counter()
+        self._m_notifications.inc()
+        self._m_bytes.inc(len(data))
         self.buffer.extend(data)
-
-        while len(self.buffer) >= self.struct_size:
-            chunk = self.buffer[:self.struct_size]
-            self.buffer[:] = self.buffer[self.struct_size:]
-
-            unpacked = struct.unpack(self.struct_format, chunk)
-            sLed, rSensor1, rSensor2, rSensor3, rSensor4, timeStamp = unpacked
-
-            # Detecta mudanças de intervalo
-            self.interval_detector.detect_interval_change(sLed, timeStamp)
-
-            # Cria objeto SensorData
-            sensor_data = SensorData(
-                sLed=sLed,
-                rSensor1=rSensor1,
-                rSensor2=rSensor2,
-                rSensor3=rSensor3,
-                rSensor4=rSensor4,
-                timeStamp=timeStamp,
-                interval_ms=self.interval_detector.get_current_interval()
-            )
-
+        
+        records = self.decode_buffer()
+        if self.buffer:
+            self._m_carries.inc()
+        if records:
+            decoded = time.perf_counter()
+            self._m_records.inc(len(records))
+            self._m_decode.observe(decoded - start)
+            self._dispatch(records)
+            self._m_callbacks.observe(time.perf_counter() - decoded)
+    
+    def decode_buffer(self) -> List[SensorRecord]:
+        """Decodifica em lote todos os registros completos presentes no buffer.
+        
+        No formato v1 o StreamValidator confere o alinhamento dos bytes
+        (ressincronizando se uma notificação foi perdida) e lê os registros
+        com struct.iter_unpack sobre um memoryview; no v2 o FrameDecoder lê
+        os frames com CRC válido. Nos dois a sequência de timeStamp é
+        conferida pelo validador. O intervalo é calculado em lote pelo
+        IntervalDetector e o buffer é compactado uma única vez, mantendo
+        apenas o resto parcial para a próxima notificação.
+        """
+        if self.wire_version is None:
+            if self.wire_format != 'auto':
+                self.wire_version = int(self.wire_format)
+            elif len(self.buffer) < HEADER_SIZE:
+                return []  # poucos bytes para reconhecer o formato
+            else:
+                self.wire_version = detect_version(self.buffer)
+        if self.wire_version == 2:
+            discarded = self.frame_decoder.bytes_discarded
+            unpacked, consumed = self.frame_decoder.decode(self.buffer)
+            unpacked = self.validator.check_sequence(
+                unpacked, resynced=self.frame_decoder.bytes_discarded > discarded)
+        else:
+            unpacked, consumed = self.validator.decode(self.buffer)
+        if consumed:
+            # Compacta o buffer uma vez por notificação
+            del self.buffer[:consumed]
+        if not unpacked:
+            return []
+        return self.interval_detector.annotate_records(unpacked)
+    
+    def reset_stream(self) -> None:
+        """Zera o estado do stream para uma nova conexão (buffer, formato, validação e intervalo)"""
+        self.buffer.clear()
+        self.wire_version = None if self.wire_format == 'auto' else int(self.wire_format)
+        self.validator.reset()
+        self.frame_decoder.reset()
+        self.interval_detector.reset()
+    
+    def flush_stream(self) -> None:
+        """Entrega o registro que o validador ainda retinha (fim da conexão)"""
+        records = self.validator.flush()
+        if records:
+            self._dispatch(self.interval_detector.annotate_records(records))
+    
+    def get_integrity_report(self) -> Dict:
+        """Relatório de perdas do stream, com o formato no ar e os contadores dos frames v2"""
+        return {
+            'wire_version': self.wire_version,
+            **self.validator.get_report(),
+            **self.frame_decoder.get_report(),
+        }
+    
+    def _dispatch(self, records: List[SensorRecord]) -> None:
+        """Entrega um lote de registros aos callbacks registrados"""
+        for callback in self.batch_callbacks:
+            try:
+                callback(records)
+            except Exception as e:
+                print(f"Erro no callback de lote: {e}")
+        
+        # Objetos SensorData só são criados se houver callbacks por registro
+        if not self.data_callbacks:
+            return
+        
+        for record in records:
+            sensor_data = SensorData(*record)
+            
             # Chama todos os callbacks registrados
             for callback in self.data_callbacks:
                 try:
@@ -153,114 +210,102 @@ class BLEManager:
                     print(f"Erro no callback: {e}")
     
     async def scan_devices(self) -> List[DeviceInfo]:
-        """Escaneia dispositivos BLE disponíveis"""
-        self.status = "Procurando dispositivos..."
-        devices = await BleakScanner.discover()
-        self.available_devices = []
-        
-        for device in devices:
-            if device.name:
-                self.available_devices.append(DeviceInfo(
-                    name=device.name,
-                    address=device.address
-                ))
-        
-        self.status = f"Encontrados {len(self.available_devices)} dispositivos"
-        return self.available_devices
+        """Garante o scanner contínuo ativo e retorna os dispositivos do registro"""
+        self.scanner.start()
+        return self.scanner.get_devices()
     
     async def connect_to_device(self, device_address: str) -> None:
         """Conecta a um dispositivo específico"""
+        disconnected = self._disconnect_event = asyncio.Event()
+        if self.should_disconnect:
+            disconnected.set()
         try:
             self.status = f"Conectando ao dispositivo {device_address}..."
             
-            async with BleakClient(device_address) as client:
+            # Queda do link pelo periférico também encerra a sessão
+            # Usa o BLEDevice do registro, se houver, para não repetir a descoberta
+            cached = self.scanner.get(device_address)
+            target = cached.device if cached and cached.device else device_address
+            async with BleakClient(target, disconnected_callback=lambda _: disconnected.set()) as client:
                 self.client = client
                 self.status = "Conectado!"
                 
-                # Reset do detector de intervalo
-                self.interval_detector.reset()
+                # Reset do detector de intervalo e do relatório de perdas
+                self.reset_stream()
+                self._connected(device_address)
                 
                 await client.start_notify(
-                    self.CHARACTERISTIC_UUID, 
+                    self.CHARACTERISTIC_UUID,
                     self._notification_handler
                 )
                 
-                # Mantém conexão ativa até sinalizar desconexão
-                while not self.should_disconnect:
-                    await asyncio.sleep(1)
-                    
+                # Mantém conexão ativa até sinalizar desconexão (sem polling)
+                await disconnected.wait()
+        
         except Exception as e:
             self.status = f"Erro na conexão: {e}"
             print(f"Erro BLE: {e}")
         finally:
+            self.flush_stream()
             self.client = None
+            self._disconnect_event = None
             self.should_disconnect = False
             self.status = "Desconectado"
     
     async def connect_to_esp32(self) -> None:
-        """Conecta automaticamente ao ESP32 se encontrado"""
+        """Conecta automaticamente ao ESP32, resolvido pelo registro do scanner"""
         self.status = "Procurando ESP32..."
-        devices = await BleakScanner.discover()
-
-        esp32_device = next(
-            (d for d in devices if d.name and self.DEVICE_NAME in d.name), 
-            None
-        )
+        esp32_device = await self.scanner.wait_for_name(self.DEVICE_NAME, timeout=self.resolve_timeout)
         
         if not esp32_device:
             self.status = "Dispositivo ESP32 não encontrado."
             return
-
+        
         await self.connect_to_device(esp32_device.address)
     
-    def start_scan_async(self) -> None:
-        """Inicia escaneamento em thread separada"""
-        def run_scan():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.scan_devices())
-        
-        thread = threading.Thread(target=run_scan, daemon=True)
-        thread.start()
-        return thread
+    def start_scan_async(self) -> Future:
+        """Agenda o escaneamento no loop BLE compartilhado"""
+        return self.ble_loop.submit(self.scan_devices())
     
-    def start_connection_async(self, device_address: str) -> None:
-        """Inicia conexão em thread separada"""
-        def run_connection():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.connect_to_device(device_address))
-        
-        thread = threading.Thread(target=run_connection, daemon=True)
-        thread.start()
-        return thread
+    def start_connection_async(self, device_address: str) -> Future:
+        """Agenda a conexão no loop BLE compartilhado"""
+        self.should_disconnect = False
+        self._connection = self.ble_loop.submit(self.connect_to_device(device_address))
+        return self._connection
     
-    def start_esp32_connection_async(self) -> None:
-        """Inicia conexão ESP32 em thread separada"""
-        def run_esp32_connection():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(self.connect_to_esp32())
-        
-        thread = threading.Thread(target=run_esp32_connection, daemon=True)
-        thread.start()
-        return thread
+    def start_esp32_connection_async(self) -> Future:
+        """Agenda a conexão automática ao ESP32 no loop BLE compartilhado"""
+        self.should_disconnect = False
+        self._connection = self.ble_loop.submit(self.connect_to_esp32())
+        return self._connection
     
     def disconnect(self) -> None:
-        """Sinaliza desconexão"""
+        """Sinaliza desconexão (imediata: acorda a corrotina da conexão)"""
         self.should_disconnect = True
+        connecting = self._connection is not None and not self._connection.done() and self.client is None
+        if connecting:
+            # Ainda procurando/conectando: cancela a tarefa
+            self._connection.cancel()
+            self.status = "Desconectado"
+        elif self._disconnect_event is not None:
+            self.ble_loop.call_soon(self._disconnect_event.set)
+    
+    def wait_disconnected(self, timeout: Optional[float] = 5.0) -> bool:
+        """Aguarda a tarefa da conexão terminar (não chamar de dentro do loop BLE)"""
+        connection = self._connection
+        return connection is None or not wait([connection], timeout).not_done
     
     def get_status(self) -> str:
         """Retorna status atual"""
         return self.status
     
     def get_available_devices(self) -> List[DeviceInfo]:
-        """Retorna dispositivos disponíveis"""
-        return self.available_devices
+        """Retorna dispositivos disponíveis (registro do scanner, sem nova varredura)"""
+        return self.scanner.get_devices()
     
     def get_interval_info(self) -> Dict:
         """Retorna informações do detector de intervalo"""
         return {
             'current_interval': self.interval_detector.get_current_interval(),
             'zones': self.interval_detector.get_zones()
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Escala usada até aqui no gráfico (app.js): valor ADC / 4095 * 20 kg
+ADC_FULL_SCALE = 4095
+DEFAULT_FULL_SCALE_KG = 20.0
+
+# Tipos de curva: 'piecewise' (interpolação linear entre pontos de referência)
+# ou 'poly' (polinômio, coeficientes do maior grau para o menor, como np.polyval)
+CURVE_KINDS = ('piecewise', 'poly')
+
+# Casas decimais dos valores em kg (gravação e respostas JSON)
+KG_DECIMALS = 3
+
+def kg_values(values: np.ndarray) -> list:
+    """Valores em kg como listas Python arredondadas (sem o ruído do float32 no JSON)"""
+    return np.round(np.asarray(values, dtype=np.float64), KG_DECIMALS).tolist()
+
+@dataclass
+class SensorCurve:
+    """Curva ADC -> kg de um sensor"""
+    kind: str = 'poly'
+    coeffs: List[float] = field(default_factory=lambda: [DEFAULT_FULL_SCALE_KG / ADC_FULL_SCALE, 0.0])
+    raw: List[float] = field(default_factory=list)   # piecewise: pontos em ADC (crescentes)
+    kg: List[float] = field(default_factory=list)    # ...e os kg correspondentes
+    
+    def __post_init__(self):
+        if self.kind not in CURVE_KINDS:
+            raise ValueError(f"Tipo de curva desconhecido: {self.kind}")
+        if self.kind == 'piecewise':
+            raw = np.asarray(self.raw, dtype=np.float64)
+            if len(raw) < 2 or len(raw) != len(self.kg) or np.any(np.diff(raw) <= 0):
+                raise ValueError("Curva piecewise precisa de 2+ pontos com raw crescente e um kg por ponto")
+        elif not self.coeffs:
+            raise ValueError("Curva poly sem coeficientes")
+    
+    def apply(self, values: np.ndarray) -> np.ndarray:
+        """kg de um array de valores ADC (vetorizado)"""
+        x = np.asarray(values, dtype=np.float64)
+        if self.kind == 'poly':
+            return np.polyval(self.coeffs, x)
+        raw = np.asarray(self.raw, dtype=np.float64)
+        kg = np.asarray(self.kg, dtype=np.float64)
+        y = np.interp(x, raw, kg)
+        # Fora da faixa calibrada, estende o primeiro/último segmento (np.interp satura)
+        low, high = x < raw[0], x > raw[-1]
+        if low.any():
+            y[low] = kg[0] + (x[low] - raw[0]) * (kg[1] - kg[0]) / (raw[1] - raw[0])
+        if high.any():
+            y[high] = kg[-1] + (x[high] - raw[-1]) * (kg[-1] - kg[-2]) / (raw[-1] - raw[-2])
+        return y
+    
+    def to_dict(self) -> Dict:
+        if self.kind == 'poly':
+            return {'kind': 'poly', 'coeffs': list(self.coeffs)}
+        return {'kind': 'piecewise', 'raw': list(self.raw), 'kg': list(self.kg)}
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> "SensorCurve":
+        kind = data.get('kind', 'poly')
+        if kind == 'poly':
+            return cls('poly', coeffs=[float(c) for c in data.get('coeffs') or []])
+        return cls(kind, coeffs=[], raw=[float(v) for v in data.get('raw') or []],
+                   kg=[float(v) for v in data.get('kg') or []])
+
+def fit_curve(raw: Sequence[float], kg: Sequence[float], kind: str = 'piecewise', degree: int = 1) -> SensorCurve:
+    """Ajusta a curva de um sensor a partir de cargas de referência (raw ADC, kg).
+    
+    'piecewise' passa pelas médias de cada valor ADC medido; 'poly' é um
+    ajuste por mínimos quadrados de grau ``degree`` ('linear' = grau 1).
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    kg = np.asarray(kg, dtype=np.float64)
+    if len(raw) != len(kg) or len(raw) == 0:
+        raise ValueError("Pontos de referência incompletos")
+    if kind == 'linear':
+        kind, degree = 'poly', 1
+    if kind == 'piecewise':
+        points, inverse = np.unique(raw, return_inverse=True)
+        means = np.bincount(inverse, weights=kg) / np.bincount(inverse)
+        return SensorCurve('piecewise', coeffs=[], raw=points.tolist(), kg=means.tolist())
+    if kind == 'poly':
+        if len(np.unique(raw)) <= degree:
+            raise ValueError(f"Ajuste de grau {degree} precisa de pelo menos {degree + 1} valores ADC distintos")
+        return SensorCurve('poly', coeffs=np.polyfit(raw, kg, degree).tolist())
+    raise ValueError(f"Tipo de ajuste desconhecido: {kind}")
+
+@dataclass
+class ModuleCalibration:
+    """Tabela de calibração de um módulo (MOBO): uma curva por sensor"""
+    sensors: List[SensorCurve]
+    module: str = 'default'
+    updated_at: Optional[float] = None
+    
+    @classmethod
+    def default(cls, num_sensors: int = 4, module: str = 'default') -> "ModuleCalibration":
+        """Escala linear 0-4095 -> 0-20 kg em todos os sensores"""
+        return cls([SensorCurve() for _ in range(num_sensors)], module)
+    
+    def apply(self, sensors: np.ndarray) -> np.ndarray:
+        """kg de um bloco (N, n) de valores ADC, arredondados a KG_DECIMALS"""
+        sensors = np.asarray(sensors)
+        out = np.empty(sensors.shape, dtype=np.float64)
+        for i in range(sensors.shape[0]):
+            curve = self.sensors[i] if i < len(self.sensors) else SensorCurve()
+            out[i] = curve.apply(sensors[i])
+        return np.round(out, KG_DECIMALS, out=out)
+    
+    def to_dict(self) -> Dict:
+        return {'module': self.module, 'updated_at': self.updated_at,
+                'sensors': [curve.to_dict() for curve in self.sensors]}
+    
+    @classmethod
+    def from_dict(cls, data: Dict, module: Optional[str] = None) -> "ModuleCalibration":
+        sensors = data.get('sensors')
+        if not isinstance(sensors, list) or not sensors:
+            raise ValueError("Calibração sem curvas ('sensors')")
+        return cls([SensorCurve.from_dict(curve) for curve in sensors],
+                   module or data.get('module', 'default'), data.get('updated_at'))
+
+class CalibrationStore:
+    """Tabelas de calibração por módulo, em ``calibration.json`` na pasta de dados.
+    
+    A chave é o endereço BLE do módulo; 'default' vale para módulos sem
+    tabela própria (e, sem ela, a escala linear de 20 kg).
+    """
+    
+    def __init__(self, folder: str = "data", filename: str = "calibration.json"):
+        self.path = os.path.join(folder, filename)
+        self._lock = threading.Lock()
+        self._modules: Optional[Dict[str, ModuleCalibration]] = None
+    
+    def _load(self) -> Dict[str, ModuleCalibration]:
+        """Lê o arquivo no primeiro uso (tabelas inválidas são ignoradas com aviso)"""
+        if self._modules is None:
+            modules = {}
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    data = json.load(f)
+                for module, table in data.get('modules', {}).items():
+                    try:
+                        modules[module] = ModuleCalibration.from_dict(table, module)
+                    except (AttributeError, TypeError, ValueError) as e:
+                        print(f"Calibração inválida para {module}: {e}")
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                print(f"Erro ao ler {self.path}: {e}")
+            self._modules = modules
+        return self._modules
+    
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'modules': {m: c.to_dict() for m, c in self._modules.items()}}, f, indent=2)
+        os.replace(tmp, self.path)
+    
+    def get(self, module: Optional[str] = None, num_sensors: int = 4) -> ModuleCalibration:
+        """Tabela do módulo, a 'default' ou a escala linear, nessa ordem"""
+        with self._lock:
+            modules = self._load()
+            return modules.get(module or 'default') or modules.get('default') or ModuleCalibration.default(num_sensors)
+    
+    def list(self) -> Dict[str, Dict]:
+        """Tabelas gravadas, por módulo"""
+        with self._lock:
+            return {module: calibration.to_dict() for module, calibration in self._load().items()}
+    
+    def set(self, calibration: ModuleCalibration) -> None:
+        """Grava (ou substitui) a tabela de um módulo"""
+        calibration.updated_at = time.time()
+        with self._lock:
+            self._load()[calibration.module] = calibration
+            self._save()
+    
+    def delete(self, module: str) -> bool:
+        """Remove a tabela de um módulo (volta a valer a 'default')"""
+        with self._lock:
+            if self._load().pop(module, None) is None:
+                return False
+            self._save()
+            return True
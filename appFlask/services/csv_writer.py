@@ -0,0 +1,195 @@
+import csv
+import os
+from abc import abstractmethod
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+from services import metrics
+from services.worker_pool import PoolTask, WorkerPool, shared_pool
+
+class BackgroundWriter(PoolTask):
+    """Escritor de arquivo em segundo plano, alimentado por uma fila limitada.
+    
+    O produtor (callback BLE) apenas enfileira lotes de linhas; o pool de
+    workers compartilhado grava os lotes e faz flush quando acumula
+    ``flush_rows`` linhas ou quando ``flush_interval`` segundos se passaram
+    desde o último flush.
+    Se a fila atingir ``max_queue_rows``, novos lotes são descartados e
+    contabilizados em ``dropped_rows``. Subclasses definem ``backend``,
+    ``_open``, ``_write_batches`` e, se necessário, ``_finalize``.
+    """
+    
+    backend = 'file'
+    
+    def __init__(self, filename: str, flush_rows: int = 1000,
+                 flush_interval: float = 0.5, max_queue_rows: int = 100_000, pool: Optional[WorkerPool] = None):
+        self.filename = filename
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.max_queue_rows = max_queue_rows
+        self.pool = pool or shared_pool()
+        
+        self._file = self._open(filename)
+        
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        # Linhas gravadas desde o último flush e se há um flush por tempo agendado
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+        # A finalização (cabeçalho, fsync, fechar) é sempre feita pela tarefa no pool
+        self._done = threading.Event()
+        
+        # Contadores de back-pressure e desempenho
+        self.queue_depth = 0
+        self.dropped_rows = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self._m_written = metrics.STORAGE_ROWS_WRITTEN.labels(backend=self.backend)
+        self._m_dropped = metrics.STORAGE_ROWS_DROPPED.labels(backend=self.backend)
+        self._m_write = metrics.STORAGE_WRITE_SECONDS.labels(backend=self.backend)
+        self._m_flush = metrics.STORAGE_FLUSH_SECONDS.labels(backend=self.backend)
+    
+    def submit(self, rows: List[Sequence]) -> bool:
+        """Enfileira um lote de linhas; retorna False se foi descartado"""
+        with self._cond:
+            if self._closing:
+                return False
+            if self.queue_depth + len(rows) > self.max_queue_rows:
+                self.dropped_rows += len(rows)
+                self._m_dropped.inc(len(rows))
+                return False
+            self._queue.append(rows)
+            self.queue_depth += len(rows)
+        self.pool.schedule(self)
+        return True
+    
+    def run_pending(self) -> bool:
+        """Grava os lotes enfileirados (executado pelo pool); True se chegaram mais lotes"""
+        with self._cond:
+            if self._done.is_set():
+                return False
+            batches = list(self._queue)
+            self._queue.clear()
+            closing = self._closing
+        
+        written = 0
+        try:
+            if batches:
+                start = time.perf_counter()
+                written = self._write_batches(batches)
+                self._m_write.observe(time.perf_counter() - start)
+        except Exception as e:
+            print(f"Erro ao escrever em {self.filename}: {e}")
+        self._m_written.inc(written)
+        
+        with self._cond:
+            self.queue_depth -= sum(len(rows) for rows in batches)
+            self.rows_written += written
+        self._pending_rows += written
+        
+        now = time.monotonic()
+        if closing:
+            with self._cond:
+                if self._queue:
+                    return True
+            self._finish()
+            self._done.set()
+            return False
+        if self._pending_rows and (self._pending_rows >= self.flush_rows
+                                   or now - self._last_flush >= self.flush_interval):
+            self._flush()
+            self._pending_rows = 0
+            self._last_flush = now
+        elif self._pending_rows and not self._flush_scheduled:
+            # Acorda a tempo de respeitar o intervalo de flush
+            self._flush_scheduled = True
+            self.pool.schedule_at(self, self._last_flush + self.flush_interval)
+        if not self._pending_rows:
+            self._flush_scheduled = False
+        return False
+    
+    def _flush(self, durable: bool = False) -> None:
+        start = time.perf_counter()
+        try:
+            self._file.flush()
+            if durable:
+                os.fsync(self._file.fileno())
+        except Exception as e:
+            print(f"Erro ao fazer flush de {self.filename}: {e}")
+        elapsed = time.perf_counter() - start
+        self.flushes += 1
+        self.last_flush_ms = elapsed * 1000
+        self._m_flush.observe(elapsed)
+    
+    @abstractmethod
+    def _open(self, filename: str):
+        """Abre o arquivo de destino e retorna o objeto de arquivo"""
+    
+    @abstractmethod
+    def _write_batches(self, batches: List[List[Sequence]]) -> int:
+        """Grava os lotes e retorna o número de linhas escritas"""
+    
+    def _finalize(self) -> None:
+        """Executado antes do flush final (ex.: reescrever cabeçalho)"""
+    
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """Drena a fila, faz flush durável (fsync) e fecha o arquivo.
+        
+        A finalização roda na tarefa de gravação do pool; se ela não terminar
+        em ``timeout``, retorna False e o arquivo é finalizado quando a
+        gravação em andamento acabar.
+        """
+        with self._cond:
+            self._closing = True
+        self.pool.schedule(self)
+        if not self._done.wait(timeout):
+            print(f"Gravação de {self.filename} ainda em andamento após {timeout}s; "
+                  "o arquivo será finalizado pela tarefa de gravação")
+            return False
+        return True
+    
+    def _finish(self) -> None:
+        """Finaliza (cabeçalho), faz flush durável e fecha o arquivo"""
+        try:
+            self._finalize()
+        except Exception as e:
+            print(f"Erro ao finalizar {self.filename}: {e}")
+        self._flush(durable=True)
+        self._file.close()
+    
+    def get_stats(self) -> Dict:
+        """Retorna contadores da fila e da gravação"""
+        return {
+            'filename': self.filename,
+            'queue_depth': self.queue_depth,
+            'dropped_rows': self.dropped_rows,
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'last_flush_ms': self.last_flush_ms,
+        }
+
+class BufferedCSVWriter(BackgroundWriter):
+    """Escritor CSV em segundo plano (writerows em lote, flush por política)"""
+    
+    backend = 'csv'
+    
+    def __init__(self, filename: str, header: Sequence[str], **kwargs):
+        self.header = list(header)
+        super().__init__(filename, **kwargs)
+    
+    def _open(self, filename: str):
+        f = open(filename, mode="w", newline="", encoding='utf-8')
+        self._writer = csv.writer(f)
+        self._writer.writerow(self.header)
+        return f
+    
+    def _write_batches(self, batches: List[List[Sequence]]) -> int:
+        written = 0
+        for rows in batches:
+            self._writer.writerows(rows)
+            written += len(rows)
+        return written
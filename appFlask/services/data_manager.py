@@ -1,102 +1,307 @@
-import csv
+import itertools
 import os
+import threading
+import time
+import numpy as np
 from typing import List, Dict, Optional
-from collections import deque
-from services.ble_manager import SensorData
+from services.ble_manager import SensorData, SensorRecord
+from services.calibration import ModuleCalibration, kg_values
+from services.ring_buffer import ColumnarRingBuffer
+from services.rolling_stats import RollingStats, SessionTotals
+from services.csv_writer import BackgroundWriter
+from services.storage import open_backend
+from services.downsampling import downsample_indices
+from services.session_reader import SESSION_EXTENSIONS
+
+# Versões dos dados únicas no processo (entre todos os DataManagers), para o
+# cache de respostas: uma sessão recriada nunca repete a versão de outra
+_DATA_VERSIONS = itertools.count(1)
+
+def led_segments(leds: np.ndarray, timestamps: np.ndarray) -> List[List[int]]:
+    """Codifica sLed em segmentos [led, x0, x1] (run-length), de forma vetorizada.
+    
+    Cada segmento vai do primeiro timestamp do trecho até o timestamp da
+    amostra seguinte (ou a última amostra), como os retângulos do gráfico.
+    """
+    if len(leds) == 0:
+        return []
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(leds)) + 1))
+    ends = np.append(starts[1:], len(leds) - 1)
+    return np.column_stack((leds[starts], timestamps[starts], timestamps[ends])).tolist()
+
+def downsample_columns(columns: Dict[str, np.ndarray], max_points: int, method: str = 'lttb') -> Dict[str, np.ndarray]:
+    """Aplica downsampling (LTTB ou min/max) a um conjunto de colunas do gráfico"""
+    indices = downsample_indices(columns['timestamp'], columns['sensors'], max_points, method)
+    if len(indices) == len(columns['timestamp']):
+        return columns
+    # Colunas 1D e por sensor (sensors, sensors_kg): indexa sempre o último eixo
+    return {name: column[..., indices] for name, column in columns.items()}
 
 class DataManager:
     """Gerenciador para armazenamento e processamento de dados dos sensores"""
     
-    def __init__(self, csv_folder: str = "data", max_chart_points: int = 100):
+    def __init__(self, csv_folder: str = "data", max_chart_points: int = 100, num_sensors: int = 4):
         self.csv_folder = csv_folder
         self.max_chart_points = max_chart_points
+        self.num_sensors = num_sensors
         
-        # Dados para o gráfico em tempo real
-        self.chart_data: deque = deque(maxlen=max_chart_points)
+        # Dados para o gráfico em tempo real (buffer circular colunar)
+        self.chart_data = ColumnarRingBuffer(max_chart_points, num_sensors)
         
-        # Estado do CSV
-        self.csv_file = None
-        self.csv_writer = None
+        # Estatísticas incrementais: canal 0 = timestamp, canais 1..N = sensores
+        self.window_stats = RollingStats(max_chart_points, 1 + num_sensors)
+        self.session_totals = SessionTotals(1 + num_sensors)
+        
+        # Calibração ADC -> kg do módulo conectado (escala linear até set_calibration)
+        self.calibration = ModuleCalibration.default(num_sensors)
+        
+        # Estado da gravação: um escritor em segundo plano por backend (csv, npy, arrow)
+        self.storage_backends: List[str] = ['csv', 'npy']
+        self.writers: Dict[str, BackgroundWriter] = {}
         self.csv_filename = None
+        self.csv_flush_rows = 1000
+        self.csv_flush_interval = 0.5
+        self.csv_max_queue_rows = 100_000
+        self.last_csv_stats: Optional[Dict] = None
+        
+        # Índice das sessões (SessionCatalog, opcional) e identificação da gravação atual
+        self.catalog = None
+        self.device_address: Optional[str] = None
+        self.session_id: Optional[str] = None
         
         # Flag para notificar novos dados
         self.new_data_received = False
         
+        # Muda a cada alteração visível nas respostas (amostras, limpeza, gravação)
+        self.data_version = next(_DATA_VERSIONS)
+        
+        # Protege buffer e estatísticas: um escritor (estágio do pipeline) e
+        # vários leitores (threads do Flask), que recebem cópias consistentes
+        self._lock = threading.RLock()
+        
         # Criar diretório se não existir
         os.makedirs(csv_folder, exist_ok=True)
     
+    def new_session_id(self, prefix: str) -> str:
+        """Nome único da sessão: prefixo + data/hora (+ contador se já existir)"""
+        base = f"{prefix}_{time.strftime('%Y%m%d-%H%M%S')}"
+        session_id, n = base, 1
+        while any(os.path.exists(os.path.join(self.csv_folder, session_id + ext)) for ext in SESSION_EXTENSIONS):
+            n += 1
+            session_id = f"{base}_{n}"
+        return session_id
+    
     def start_csv_recording(self, filename: str = "dados_ble.csv") -> None:
-        """Inicia gravação em arquivo CSV"""
-        self.csv_filename = os.path.join(self.csv_folder, filename)
+        """Inicia a gravação de uma nova sessão em CSV e nos demais backends configurados.
         
-        try:
-            self.csv_file = open(self.csv_filename, mode="w", newline="", encoding='utf-8')
-            self.csv_writer = csv.writer(self.csv_file)
-            
-            # Escreve cabeçalho
-            self.csv_writer.writerow([
-                "sLed", "rSensor1", "rSensor2", "rSensor3", "rSensor4", 
-                "timeStamp", "interval_ms"
-            ])
-            
-            print(f"Iniciada gravação CSV: {self.csv_filename}")
-            
-        except Exception as e:
-            print(f"Erro ao abrir arquivo CSV: {e}")
-            self.csv_file = None
-            self.csv_writer = None
+        ``filename`` dá o prefixo: cada gravação vai para arquivos próprios
+        (``dados_ble_20250101-120000.csv``...), sem sobrescrever as anteriores.
+        """
+        # Garante que uma gravação anterior seja finalizada antes de reabrir
+        self.stop_csv_recording()
+        
+        self.session_id = self.new_session_id(os.path.splitext(filename)[0])
+        base_path = os.path.join(self.csv_folder, self.session_id)
+        self.session_totals.reset()
+        
+        for backend in self.storage_backends:
+            try:
+                self.writers[backend] = open_backend(
+                    backend,
+                    base_path,
+                    num_sensors=self.num_sensors,
+                    calibrated=True,
+                    flush_rows=self.csv_flush_rows,
+                    flush_interval=self.csv_flush_interval,
+                    max_queue_rows=self.csv_max_queue_rows
+                )
+                print(f"Iniciada gravação {backend}: {self.writers[backend].filename}")
+            except Exception as e:
+                print(f"Erro ao abrir arquivo {backend}: {e}")
+        
+        csv_writer = self.writers.get('csv')
+        self.csv_filename = csv_writer.filename if csv_writer else None
+        self.data_version = next(_DATA_VERSIONS)
+        
+        if self.catalog is not None and self.writers:
+            try:
+                self.catalog.start_session(self.session_id, self.device_address, self.get_session_files(),
+                                           self.num_sensors)
+            except Exception as e:
+                print(f"Erro ao registrar a sessão no índice: {e}")
     
     def stop_csv_recording(self) -> None:
-        """Para gravação em arquivo CSV"""
-        if self.csv_file:
+        """Para a gravação (drena as filas e faz flush durável de cada backend)"""
+        if not self.writers:
+            return
+        
+        stats = {}
+        for backend, writer in self.writers.items():
             try:
-                self.csv_file.close()
-                print(f"Gravação CSV finalizada: {self.csv_filename}")
+                writer.close()
+                print(f"Gravação {backend} finalizada: {writer.filename}")
             except Exception as e:
-                print(f"Erro ao fechar arquivo CSV: {e}")
+                print(f"Erro ao fechar arquivo {backend}: {e}")
             finally:
-                self.csv_file = None
-                self.csv_writer = None
+                stats[backend] = writer.get_stats()
+        
+        files = {backend: writer.filename for backend, writer in self.writers.items()}
+        self.writers = {}
+        self.last_csv_stats = stats
+        self.data_version = next(_DATA_VERSIONS)
+        
+        if self.catalog is not None:
+            self._finish_catalog_entry(files, stats)
+    
+    def _finish_catalog_entry(self, files: Dict[str, str], stats: Dict) -> None:
+        """Completa a entrada da sessão no índice com os totais incrementais (sem reler os arquivos)"""
+        totals = self.session_totals
+        samples = max((s.get('rows_written', 0) for s in stats.values()), default=0)
+        time_range = totals.channel_summary(0)
+        try:
+            self.catalog.finish_session(self.session_id, files, samples, time_range['min'], time_range['max'],
+                                        [totals.channel_summary(i) for i in range(1, self.num_sensors + 1)])
+        except Exception as e:
+            print(f"Erro ao atualizar a sessão no índice: {e}")
+    
+    @property
+    def csv_writer(self) -> Optional[BackgroundWriter]:
+        return self.writers.get('csv')
+    
+    def get_session_files(self) -> Dict[str, str]:
+        """Retorna os arquivos da sessão atual, por backend"""
+        return {backend: writer.filename for backend, writer in self.writers.items()}
+    
+    def get_csv_stats(self) -> Dict:
+        """Retorna contadores da gravação (fila, descartes, flushes) por backend"""
+        writers = self.writers
+        if writers:
+            stats = {backend: writer.get_stats() for backend, writer in writers.items()}
+        else:
+            stats = self.last_csv_stats or {}
+        return {'recording': bool(writers), **stats.get('csv', {}), 'storage': stats}
     
     def add_sensor_data(self, sensor_data: SensorData) -> None:
         """Adiciona dados do sensor (callback para BLEManager)"""
-        # Adiciona aos dados do gráfico
-        chart_point = {
-            'timestamp': sensor_data.timeStamp,
-            'led': sensor_data.sLed,
-            'sensors': [
-                sensor_data.rSensor1, 
-                sensor_data.rSensor2, 
-                sensor_data.rSensor3, 
-                sensor_data.rSensor4
-            ],
-            'interval_ms': sensor_data.interval_ms
-        }
+        self.add_sensor_batch([(
+            sensor_data.sLed,
+            sensor_data.rSensor1,
+            sensor_data.rSensor2,
+            sensor_data.rSensor3,
+            sensor_data.rSensor4,
+            sensor_data.timeStamp,
+            sensor_data.interval_ms
+        )])
+    
+    def set_calibration(self, calibration: ModuleCalibration) -> None:
+        """Troca a calibração aplicada aos próximos lotes (amostras já gravadas não mudam)"""
+        with self._lock:
+            self.calibration = calibration
+    
+    def add_sensor_batch(self, records: List[SensorRecord]) -> None:
+        """Adiciona um lote de registros (callback de lote do BLEManager)"""
+        block = np.asarray(records, dtype=np.int64)
         
-        self.chart_data.append(chart_point)
+        # Calibração: uma conversão vetorizada por lote, compartilhada por gráfico e gravação
+        sensors_kg = self.calibration.apply(block[:, 1:1 + self.num_sensors].T)
         
-        # Grava no CSV se ativo
-        if self.csv_writer:
-            try:
-                self.csv_writer.writerow([
-                    sensor_data.sLed,
-                    sensor_data.rSensor1,
-                    sensor_data.rSensor2,
-                    sensor_data.rSensor3,
-                    sensor_data.rSensor4,
-                    sensor_data.timeStamp,
-                    sensor_data.interval_ms
-                ])
-                self.csv_file.flush()
-            except Exception as e:
-                print(f"Erro ao escrever no CSV: {e}")
+        # Atualiza estatísticas antes que o buffer sobrescreva as amostras antigas
+        channels = self._stat_channels(block)
+        with self._lock:
+            self.window_stats.update(channels, self._evicted_channels(block))
+            self.session_totals.update(channels)
+            self.chart_data.extend(block, sensors_kg)
+            self.data_version = next(_DATA_VERSIONS)
+        
+        # Enfileira o lote para as threads de gravação (colunas kgSensorN após interval_ms)
+        writers = list(self.writers.values())
+        if writers:
+            rows = [(*record, *kg) for record, kg in zip(records, sensors_kg.T.tolist())]
+            for writer in writers:
+                writer.submit(rows)
         
         # Marca que novos dados foram recebidos
         self.new_data_received = True
     
-    def get_chart_data(self) -> List[Dict]:
-        """Retorna dados para o gráfico"""
-        return list(self.chart_data)
+    def _stat_channels(self, block: np.ndarray) -> np.ndarray:
+        """Reorganiza registros (n, campos) em canais (timestamp, sensores...) x n"""
+        ts_col = 1 + self.num_sensors
+        return np.vstack((block[:, ts_col], block[:, 1:ts_col].T))
+    
+    def _evicted_channels(self, block: np.ndarray) -> np.ndarray:
+        """Amostras que sairão da janela ao inserir o lote (mais antigas primeiro)"""
+        capacity = self.chart_data.capacity
+        current = len(self.chart_data)
+        evicted_old = max(0, min(current, current + len(block) - capacity))
+        overflow = max(0, len(block) - capacity)
+        
+        window = self.chart_data.window(current)
+        old = np.vstack((window['timestamp'][:evicted_old], window['sensors'][:, :evicted_old]))
+        return np.hstack((old, self._stat_channels(block[:overflow])))
+    
+    def set_chart_capacity(self, max_chart_points: int) -> None:
+        """Redimensiona o buffer do gráfico (descarta os pontos atuais)"""
+        with self._lock:
+            self.max_chart_points = max_chart_points
+            self.chart_data = ColumnarRingBuffer(max_chart_points, self.num_sensors)
+            self.window_stats = RollingStats(max_chart_points, 1 + self.num_sensors)
+            self.data_version = next(_DATA_VERSIONS)
+    
+    def get_chart_window(self, n: Optional[int] = None) -> Dict:
+        """Retorna um snapshot colunar (cópia consistente) das últimas n amostras"""
+        return self._chart_snapshot(n)[0]
+    
+    def _chart_snapshot(self, n: Optional[int] = None):
+        """Cópia das últimas n amostras e o cursor correspondente, lidos juntos"""
+        with self._lock:
+            window = {name: column.copy() for name, column in self.chart_data.window(n).items()}
+            return window, self.chart_data.sequence
+    
+    def get_chart_data(self, max_points: Optional[int] = None, method: str = 'lttb') -> List[Dict]:
+        """Retorna dados para o gráfico (opcionalmente reduzidos a max_points)"""
+        return self.get_chart_payload(max_points, method)['data']
+    
+    def get_chart_payload(self, max_points: Optional[int] = None, method: str = 'lttb') -> Dict:
+        """Dados do gráfico (formato legado) e o cursor do mesmo snapshot"""
+        window, cursor = self._chart_snapshot()
+        if max_points:
+            window = downsample_columns(window, max_points, method)
+        data = [
+            {'timestamp': ts, 'led': led, 'sensors': sensors, 'sensors_kg': sensors_kg, 'interval_ms': interval}
+            for ts, led, sensors, sensors_kg, interval in zip(
+                window['timestamp'].tolist(),
+                window['led'].tolist(),
+                window['sensors'].T.tolist(),
+                kg_values(window['sensors_kg'].T),
+                window['interval_ms'].tolist()
+            )
+        ]
+        return {'data': data, 'cursor': cursor}
+    
+    def get_chart_delta(self, since: int, max_points: Optional[int] = None, method: str = 'lttb') -> Dict:
+        """Retorna só as amostras posteriores ao cursor `since`, em colunas.
+        
+        O fundo do gráfico vem como segmentos run-length de sLed
+        ([led, x0, x1]) em vez de um retângulo por amostra. Com max_points,
+        o delta é reduzido no servidor (os segmentos usam a resolução total).
+        """
+        with self._lock:
+            columns, reset = self.chart_data.since(since)
+            columns = {name: column.copy() for name, column in columns.items()}
+            cursor, capacity = self.chart_data.sequence, self.chart_data.capacity
+        segments = led_segments(columns['led'], columns['timestamp'])
+        if max_points:
+            columns = downsample_columns(columns, max_points, method)
+        return {
+            'cursor': cursor,
+            'reset': reset,
+            'window': capacity,
+            'timestamp': columns['timestamp'].tolist(),
+            'sensors': columns['sensors'].tolist(),
+            'sensors_kg': kg_values(columns['sensors_kg']),
+            'interval_ms': columns['interval_ms'].tolist(),
+            'led_segments': segments
+        }
     
     def has_new_data(self) -> bool:
         """Verifica e reseta flag de novos dados"""
@@ -110,43 +315,57 @@ class DataManager:
     
     def clear_chart_data(self) -> None:
         """Limpa dados do gráfico"""
-        self.chart_data.clear()
+        with self._lock:
+            self.chart_data.clear()
+            self.window_stats.reset()
+            self.data_version = next(_DATA_VERSIONS)
+    
+    def get_data_summary(self, include_session: bool = False) -> Dict:
+        """Retorna resumo dos dados (O(1), a partir das estatísticas incrementais)"""
+        with self._lock:
+            return self._data_summary(include_session)
     
-    def get_data_summary(self) -> Dict:
-        """Retorna resumo dos dados"""
-        if not self.chart_data:
-            return {
+    def _data_summary(self, include_session: bool) -> Dict:
+        stats = self.window_stats
+        if not stats.count:
+            summary = {
                 'total_points': 0,
                 'time_range': {'start': None, 'end': None},
                 'sensor_ranges': {}
             }
+        else:
+            summary = {
+                'total_points': stats.count,
+                'time_range': {
+                    'start': stats.minimum(0),
+                    'end': stats.maximum(0)
+                },
+                'sensor_ranges': {
+                    f'sensor_{i}': stats.channel_summary(i)
+                    for i in range(1, self.num_sensors + 1)
+                }
+            }
         
-        data_list = list(self.chart_data)
-        timestamps = [d['timestamp'] for d in data_list]
-        
-        # Calcula ranges dos sensores
-        sensor_ranges = {}
-        for i in range(4):
-            sensor_values = [d['sensors'][i] for d in data_list]
-            sensor_ranges[f'sensor_{i+1}'] = {
-                'min': min(sensor_values),
-                'max': max(sensor_values),
-                'avg': sum(sensor_values) / len(sensor_values)
+        if include_session:
+            totals = self.session_totals
+            summary['session'] = {
+                'total_points': totals.count,
+                'time_range': {
+                    'start': totals.channel_summary(0)['min'],
+                    'end': totals.channel_summary(0)['max']
+                },
+                'sensor_ranges': {
+                    f'sensor_{i}': totals.channel_summary(i)
+                    for i in range(1, self.num_sensors + 1)
+                }
             }
         
-        return {
-            'total_points': len(data_list),
-            'time_range': {
-                'start': min(timestamps),
-                'end': max(timestamps)
-            },
-            'sensor_ranges': sensor_ranges
-        }
+        return summary
     
     def export_data_to_dict(self) -> Dict:
         """Exporta todos os dados para um dicionário"""
         return {
-            'chart_data': list(self.chart_data),
+            'chart_data': self.get_chart_data(),
             'csv_filename': self.csv_filename,
-            'data_summary': self.get_data_summary()
-        }
\ No newline at end of file
+            'data_summary': self.get_data_summary(include_session=True)
+        }
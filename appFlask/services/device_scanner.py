@@ -0,0 +1,147 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from bleak import BleakScanner
+from services.ble_loop import BLEEventLoop, shared_loop
+
+@dataclass
+class DeviceInfo:
+    """Informações do dispositivo BLE"""
+    name: str
+    address: str
+    rssi: Optional[int] = None
+    last_seen: float = 0.0
+    # BLEDevice do Bleak: conectar com ele evita uma nova descoberta
+    device: Any = field(default=None, repr=False, compare=False)
+    
+    def to_dict(self, now: Optional[float] = None) -> Dict:
+        """Representação JSON (sem o objeto do Bleak)"""
+        now = now or time.time()
+        return {
+            'name': self.name,
+            'address': self.address,
+            'rssi': self.rssi,
+            'last_seen': self.last_seen,
+            'age_s': round(now - self.last_seen, 1) if self.last_seen else None,
+        }
+
+class DeviceScanner:
+    """Scanner BLE contínuo (modo detection callback) com registro de dispositivos.
+    
+    Cada anúncio recebido atualiza nome, RSSI e horário do último anúncio do
+    dispositivo; entradas sem anúncio há mais de ``ttl`` segundos expiram.
+    Consultas ao registro são instantâneas e não disparam novas varreduras.
+    """
+    
+    def __init__(self, ble_loop: Optional[BLEEventLoop] = None, ttl: float = 30.0, retry_interval: float = 5.0):
+        self.ble_loop = ble_loop or shared_loop()
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.registry: Dict[str, DeviceInfo] = {}
+        self.running = False
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._task: Optional[Future] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._seen: Optional[asyncio.Event] = None
+    
+    def start(self) -> None:
+        """Inicia a varredura contínua no loop BLE (sem efeito se já estiver rodando)"""
+        with self._lock:
+            if self._task is None or self._task.done():
+                self._task = self.ble_loop.submit(self._run())
+    
+    def stop(self) -> None:
+        """Encerra a varredura contínua"""
+        if self._stop is not None:
+            self.ble_loop.call_soon(self._stop.set)
+    
+    async def _run(self) -> None:
+        """Mantém o BleakScanner ativo; em caso de erro (ex.: sem adaptador) tenta de novo"""
+        self._stop = asyncio.Event()
+        self._seen = asyncio.Event()
+        while not self._stop.is_set():
+            try:
+                scanner = BleakScanner(detection_callback=self._on_detection)
+                await scanner.start()
+                self.running = True
+                self.error = None
+                try:
+                    await self._stop.wait()
+                finally:
+                    self.running = False
+                    await scanner.stop()
+            except Exception as e:
+                if str(e) != self.error:
+                    print(f"Erro no scanner BLE: {e}")
+                self.error = str(e)
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.retry_interval)
+                except asyncio.TimeoutError:
+                    pass
+    
+    def _on_detection(self, device, advertisement_data) -> None:
+        """Atualiza o registro a cada anúncio recebido"""
+        name = device.name or advertisement_data.local_name
+        now = time.time()
+        with self._lock:
+            info = self.registry.get(device.address)
+            if info is None:
+                info = self.registry[device.address] = DeviceInfo(name=name, address=device.address)
+            info.name = name or info.name
+            info.rssi = advertisement_data.rssi
+            info.last_seen = now
+            info.device = device
+        self._seen.set()
+    
+    def _evict(self, now: float) -> None:
+        expired = [address for address, info in self.registry.items() if now - info.last_seen > self.ttl]
+        for address in expired:
+            del self.registry[address]
+    
+    def get_devices(self, named_only: bool = True) -> List[DeviceInfo]:
+        """Dispositivos vistos dentro do TTL, do sinal mais forte para o mais fraco"""
+        with self._lock:
+            self._evict(time.time())
+            devices = [info for info in self.registry.values() if info.name or not named_only]
+        return sorted(devices, key=lambda d: d.rssi if d.rssi is not None else -999, reverse=True)
+    
+    def get(self, address: str) -> Optional[DeviceInfo]:
+        """Entrada do registro para um endereço (None se ausente ou expirada)"""
+        with self._lock:
+            info = self.registry.get(address)
+            if info is None or time.time() - info.last_seen > self.ttl:
+                return None
+            return info
+    
+    def find_by_name(self, name: str) -> Optional[DeviceInfo]:
+        """Dispositivo com o nome pedido visto mais recentemente"""
+        matches = [d for d in self.get_devices() if name in d.name]
+        return max(matches, key=lambda d: d.last_seen) if matches else None
+    
+    async def wait_for_name(self, name: str, timeout: float = 10.0) -> Optional[DeviceInfo]:
+        """Resolve um dispositivo pelo nome a partir do registro, aguardando novos anúncios se preciso"""
+        self.start()
+        deadline = time.monotonic() + timeout
+        while True:
+            device = self.find_by_name(name)
+            remaining = deadline - time.monotonic()
+            if device or remaining <= 0:
+                return device
+            if self._seen is None:
+                await asyncio.sleep(min(0.1, remaining))
+                continue
+            self._seen.clear()
+            try:
+                await asyncio.wait_for(self._seen.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+    
+    def get_status(self) -> Dict:
+        """Estado do scanner"""
+        with self._lock:
+            count = len(self.registry)
+        return {'running': self.running, 'error': self.error, 'devices': count, 'ttl': self.ttl}
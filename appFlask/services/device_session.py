@@ -0,0 +1,287 @@
+import re
+import threading
+from typing import Dict, Iterator, List, Optional
+from services.ble_loop import BLEEventLoop, shared_loop
+from services.ble_manager import BLEManager
+from services.calibration import CalibrationStore
+from services.data_manager import DataManager
+from services.device_scanner import DeviceScanner
+from services.impact_detector import ImpactDetector
+from services.metrics import Sample
+from services.pipeline import Pipeline
+from services.session_catalog import SessionCatalog
+from services.simulator import SimulatedBLEManager, create_ble_manager
+from services.stream_hub import StreamHub
+
+# Contadores do StreamValidator e do FrameDecoder exportados em /api/metrics
+STREAM_COUNTERS = {
+    'records': 'Registros aceitos pelo validador do stream',
+    'missing_records': 'Registros perdidos (lacunas no timeStamp após ressincronização)',
+    'gaps': 'Lacunas na sequência de timeStamp com perda de registros',
+    'pauses': 'Pausas na sequência de timeStamp (botão de gravação solto)',
+    'paused_records': 'Ticks do firmware sem registros durante as pausas',
+    'duplicates': 'Registros duplicados descartados',
+    'replayed': 'Registros reenviados pelo firmware (timeStamp já recebido) descartados',
+    'implausible': 'Registros descartados por quebrar a sequência sem confirmação após ressincronização',
+    'resyncs': 'Ressincronizações do alinhamento do buffer',
+    'bytes_discarded': 'Bytes descartados na ressincronização',
+    'frames': 'Frames v2 com CRC válido',
+    'crc_errors': 'Frames v2 descartados por CRC inválido',
+    'sensor_mismatch': 'Frames v2 descartados por ter mais sensores que a sessão',
+    'padded_frames': 'Frames v2 com menos sensores que a sessão (colunas que faltam em 0)',
+    'frame_bytes_discarded': 'Bytes descartados na busca do sincronismo dos frames v2',
+}
+
+class DeviceSession:
+    """Aquisição de um MOBO: conexão BLE, decodificador, detector de intervalo,
+    buffer do gráfico, gravação, stream SSE e detector de impactos próprios.
+    
+    Nenhuma thread por dispositivo: as notificações chegam pelo loop BLE
+    compartilhado e os estágios do pipeline e os escritores rodam no pool de
+    workers compartilhado (services.worker_pool).
+    """
+    
+    def __init__(self, address: Optional[str] = None, ble_loop: Optional[BLEEventLoop] = None,
+                 scanner: Optional[DeviceScanner] = None, csv_folder: str = "data",
+                 catalog: Optional[SessionCatalog] = None, calibrations: Optional[CalibrationStore] = None):
+        self.address = address
+        self.ble_loop = ble_loop
+        self.scanner = scanner
+        self.calibrations = calibrations
+        self.calibration_module = address
+        self.ble_manager: BLEManager = BLEManager(ble_loop=ble_loop, scanner=scanner)
+        self.ble_manager.set_metrics_label(self.metrics_label)
+        # Número de sensores da sessão: o do formato v1 do BLEManager (struct_format)
+        num_sensors = self.ble_manager.validator.num_sensors
+        self.data_manager = DataManager(csv_folder, num_sensors=num_sensors)
+        self.data_manager.catalog = catalog
+        self.data_manager.device_address = address
+        self.stream_hub = StreamHub()
+        self.impact_detector = ImpactDetector(num_sensors)
+        
+        # O loop BLE só decodifica e enfileira; cada consumidor roda no seu
+        # estágio. Gravação e impactos preservam a sequência já enfileirada
+        # (drop_newest); o stream ao vivo prefere as amostras recentes.
+        self.pipeline = Pipeline()
+        self.pipeline.add_stage('data', self.data_manager.add_sensor_batch, overflow='drop_newest')
+        self.pipeline.add_stage('stream', self.stream_hub.publish, overflow='drop_oldest')
+        self.pipeline.add_stage('impacts', self.impact_detector.process, overflow='drop_newest')
+        self.ble_manager.add_batch_callback(self.pipeline.publish)
+        self.ble_manager.add_connect_callback(self._on_connected)
+        self.load_calibration()
+    
+    @property
+    def metrics_label(self) -> str:
+        """Label ``device`` das métricas da sessão"""
+        return self.address or "default"
+    
+    @property
+    def recording_name(self) -> str:
+        """Prefixo dos arquivos da gravação (o DataManager acrescenta data/hora)"""
+        if self.address is None:
+            return "dados_ble.csv"
+        return f"dados_ble_{re.sub(r'[^0-9a-zA-Z]', '', self.address).lower()}.csv"
+    
+    def configure(self, config) -> None:
+        """Aplica as configurações da aplicação Flask aos gerenciadores da sessão"""
+        max_chart_points = config.get('CHART_MAX_POINTS', self.data_manager.max_chart_points)
+        if max_chart_points != self.data_manager.max_chart_points:
+            self.data_manager.set_chart_capacity(max_chart_points)
+        
+        self.data_manager.csv_flush_rows = config.get('CSV_FLUSH_ROWS', self.data_manager.csv_flush_rows)
+        self.data_manager.csv_flush_interval = config.get('CSV_FLUSH_INTERVAL', self.data_manager.csv_flush_interval)
+        self.data_manager.csv_max_queue_rows = config.get('CSV_MAX_QUEUE_ROWS', self.data_manager.csv_max_queue_rows)
+        self.data_manager.storage_backends = list(config.get('STORAGE_BACKENDS', self.data_manager.storage_backends))
+        
+        frame_rate = config.get('STREAM_FRAME_RATE')
+        if frame_rate:
+            self.stream_hub.frame_interval = 1.0 / frame_rate
+        self.stream_hub.set_history(config.get('STREAM_HISTORY', self.stream_hub.history.maxlen))
+        
+        self.impact_detector.threshold_on = config.get('IMPACT_THRESHOLD_ON', self.impact_detector.threshold_on)
+        self.impact_detector.threshold_off = config.get('IMPACT_THRESHOLD_OFF', self.impact_detector.threshold_off)
+        self.impact_detector.min_samples = config.get('IMPACT_MIN_SAMPLES', self.impact_detector.min_samples)
+        
+        for stage in self.pipeline.stages.values():
+            stage.max_records = config.get('PIPELINE_QUEUE_RECORDS', stage.max_records)
+        
+        self.set_source(config.get('BLE_SOURCE', 'ble'), config.get('BLE_REPLAY_FILE'),
+                        config.get('BLE_REPLAY_SPEED', 1.0), config.get('BLE_SIM_SEED'))
+        self.ble_manager.wire_format = config.get('BLE_WIRE_FORMAT', 'auto')
+        if isinstance(self.ble_manager, SimulatedBLEManager):
+            self.ble_manager.drop_rate = config.get('BLE_SIM_DROP_RATE', 0.0)
+            self.ble_manager.sim_wire_version = config.get('BLE_SIM_WIRE_VERSION', 1)
+    
+    @property
+    def source(self) -> str:
+        """Fonte de dados da sessão: 'ble', 'replay' ou 'simulator'"""
+        if isinstance(self.ble_manager, SimulatedBLEManager):
+            return self.ble_manager.source
+        return 'ble'
+    
+    def set_source(self, source: str, replay_path: Optional[str] = None, speed: float = 1.0,
+                   seed: Optional[int] = None) -> None:
+        """Troca o BLEManager pela fonte pedida (só com a sessão desconectada)"""
+        manager = self.ble_manager
+        if source == self.source and (source != 'replay' or replay_path == manager.replay_path):
+            if isinstance(manager, SimulatedBLEManager):
+                manager.speed = speed
+            return
+        if manager.client is not None:
+            raise RuntimeError("Desconecte antes de trocar a fonte de dados")
+        
+        new_manager = create_ble_manager(source, replay_path=replay_path, speed=speed, seed=seed,
+                                         ble_loop=self.ble_loop, scanner=self.scanner)
+        new_manager.set_metrics_label(self.metrics_label)
+        new_manager.add_batch_callback(self.pipeline.publish)
+        new_manager.add_connect_callback(self._on_connected)
+        manager.remove_batch_callback(self.pipeline.publish)
+        manager.remove_connect_callback(self._on_connected)
+        self.ble_manager = new_manager
+    
+    def load_calibration(self, module: Optional[str] = None) -> None:
+        """Aplica a tabela de calibração do módulo (ou do último usado) à gravação e ao stream"""
+        if module is not None:
+            self.calibration_module = module
+        if self.calibrations is None:
+            return
+        calibration = self.calibrations.get(self.calibration_module, self.data_manager.num_sensors)
+        self.data_manager.set_calibration(calibration)
+        self.stream_hub.calibration = calibration
+    
+    def _on_connected(self, address: str) -> None:
+        """Conexão estabelecida (loop BLE): aplica a calibração do módulo conectado.
+        
+        Sem endereço em connect() (``/api/start``), o módulo só é conhecido
+        depois que o scanner resolve o ESP32 pelo nome.
+        """
+        if address != self.calibration_module:
+            self.load_calibration(address)
+    
+    def connect(self, address: Optional[str] = None) -> None:
+        """Inicia a gravação e a conexão (ao endereço dado, ao da sessão ou ao ESP32 pelo nome)"""
+        address = address or self.address
+        self.load_calibration(address)
+        self.data_manager.start_csv_recording(self.recording_name)
+        if address:
+            self.ble_manager.start_connection_async(address)
+        else:
+            self.ble_manager.start_esp32_connection_async()
+    
+    def disconnect(self) -> None:
+        """Encerra a conexão BLE e finaliza a gravação"""
+        self.ble_manager.disconnect()
+        # A conexão termina entregando o registro retido pelo validador e as
+        # últimas notificações; depois, grava o que está na fila do pipeline
+        self.ble_manager.wait_disconnected(timeout=5.0)
+        self.pipeline.flush(timeout=5.0)
+        self.data_manager.stop_csv_recording()
+    
+    def clear(self) -> None:
+        """Limpa o gráfico, o stream e os eventos (não afeta a gravação)"""
+        self.pipeline.flush(timeout=1.0)
+        self.data_manager.clear_chart_data()
+        self.stream_hub.clear()
+        self.impact_detector.reset()
+    
+    def reset(self) -> None:
+        """Desconecta e limpa todo o estado da sessão"""
+        self.disconnect()
+        self.clear()
+    
+    def collect_metrics(self) -> Iterator[Sample]:
+        """Filas e descartes da sessão (pipeline e gravação), lidos na hora da coleta"""
+        device = self.metrics_label
+        yield ('device_connected', 'gauge', 'Sessão com conexão BLE ativa', {'device': device},
+               int(self.ble_manager.client is not None))
+        for name, stage in self.pipeline.stages.items():
+            labels = {'device': device, 'stage': name}
+            yield ('pipeline_queue_records', 'gauge', 'Registros aguardando o estágio do pipeline',
+                   labels, stage.queued_records)
+            yield ('pipeline_dropped_records_total', 'counter', 'Registros descartados pelo estágio (overflow)',
+                   labels, stage.dropped_records)
+            yield ('pipeline_processed_records_total', 'counter', 'Registros processados pelo estágio',
+                   labels, stage.processed_records)
+            yield ('pipeline_lag_seconds', 'gauge', 'Atraso do último lote entre o BLE e o estágio',
+                   labels, stage.last_lag_ms / 1000)
+        for key, value in self.ble_manager.get_integrity_report().items():
+            if key in STREAM_COUNTERS:
+                yield (f'stream_{key}_total', 'counter', STREAM_COUNTERS[key], {'device': device}, value)
+        for backend, writer in list(self.data_manager.writers.items()):
+            yield ('storage_queue_rows', 'gauge', 'Linhas aguardando a thread de gravação',
+                   {'device': device, 'backend': backend}, writer.queue_depth)
+        yield ('stream_clients', 'gauge', 'Clientes conectados ao stream SSE', {'device': device},
+               len(self.stream_hub.subscribers))
+    
+    def get_status(self) -> Dict:
+        """Resumo da sessão para listagens"""
+        return {
+            'address': self.address,
+            'source': self.source,
+            'status': self.ble_manager.get_status(),
+            'recording': self.data_manager.get_csv_filename(),
+            'points': self.data_manager.chart_data.sequence,
+            'events': self.impact_detector.total_events,
+            'current_interval': self.ble_manager.interval_detector.get_current_interval(),
+        }
+
+class DeviceSessionManager:
+    """Mantém uma DeviceSession por endereço BLE (vários MOBOs em paralelo)"""
+    
+    def __init__(self, ble_loop: Optional[BLEEventLoop] = None, scanner: Optional[DeviceScanner] = None,
+                 csv_folder: str = "data", max_devices: int = 8, catalog: Optional[SessionCatalog] = None,
+                 calibrations: Optional[CalibrationStore] = None):
+        self.ble_loop = ble_loop or shared_loop()
+        self.scanner = scanner
+        self.csv_folder = csv_folder
+        self.catalog = catalog
+        self.calibrations = calibrations
+        self.max_devices = max_devices
+        self.config: Dict = {}
+        self.sessions: Dict[str, DeviceSession] = {}
+        self._lock = threading.Lock()
+    
+    def configure(self, config) -> None:
+        """Guarda as configurações para novas sessões e aplica às existentes"""
+        self.config = config
+        self.max_devices = config.get('MAX_DEVICES', self.max_devices)
+        for session in self.list():
+            session.configure(config)
+    
+    def open(self, address: str) -> DeviceSession:
+        """Retorna a sessão do endereço, criando-a se necessário"""
+        with self._lock:
+            session = self.sessions.get(address)
+            if session is None:
+                if len(self.sessions) >= self.max_devices:
+                    raise RuntimeError(f"Limite de {self.max_devices} dispositivos atingido")
+                session = DeviceSession(address, self.ble_loop, self.scanner, self.csv_folder, self.catalog,
+                                        self.calibrations)
+                session.configure(self.config)
+                self.sessions[address] = session
+            return session
+    
+    def get(self, address: str) -> Optional[DeviceSession]:
+        """Sessão do endereço, ou None"""
+        with self._lock:
+            return self.sessions.get(address)
+    
+    def close(self, address: str) -> bool:
+        """Desconecta e remove a sessão do endereço"""
+        with self._lock:
+            session = self.sessions.pop(address, None)
+        if session is None:
+            return False
+        session.disconnect()
+        session.pipeline.stop()
+        return True
+    
+    def close_all(self) -> None:
+        """Encerra todas as sessões"""
+        for session in self.list():
+            self.close(session.address)
+    
+    def list(self) -> List[DeviceSession]:
+        """Sessões abertas"""
+        with self._lock:
+            return list(self.sessions.values())
@@ -0,0 +1,88 @@
+import numpy as np
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+# Menor max_points aceito: o LTTB sempre mantém o primeiro e o último ponto e precisa de um balde
+MIN_POINTS = 3
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices escolhidos pelo Largest-Triangle-Three-Buckets.
+    
+    Mantém o primeiro e o último ponto e, em cada balde intermediário, o
+    ponto que forma o maior triângulo com o ponto já escolhido e a média do
+    balde seguinte. O laço é por balde; dentro dele tudo é vetorizado.
+    """
+    n = len(y)
+    if n_out < MIN_POINTS:
+        raise ValueError(f"n_out deve ser >= {MIN_POINTS}")
+    if n_out >= n:
+        return np.arange(n)
+    
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - avg_x) * (by - y[a]) - (x[a] - bx) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    
+    return selected
+
+def minmax_indices(values: np.ndarray, n_out: int) -> np.ndarray:
+    """Índices de mínimo e máximo de cada canal em cada balde (decimação min/max).
+    
+    values tem forma (canais, n). O número de baldes é escolhido para que o
+    total de índices (mais o primeiro e o último) não passe de n_out; se não
+    couber um balde por canal, usa o envelope (máximo entre os canais).
+    """
+    if n_out < MIN_POINTS:
+        raise ValueError(f"n_out deve ser >= {MIN_POINTS}")
+    channels, n = values.shape
+    if n <= n_out:
+        return np.arange(n)
+    if (n_out - 2) // (2 * channels) < 1 and channels > 1:
+        values = values.max(axis=0, keepdims=True)
+        channels = 1
+    buckets = (n_out - 2) // (2 * channels)
+    if buckets < 1:
+        return np.unique([0, int(np.argmax(values[0])), n - 1])
+    
+    size = -(-n // buckets)
+    padded = np.pad(values, ((0, 0), (0, buckets * size - n)), mode='edge')
+    blocks = padded.reshape(channels, buckets, size)
+    offsets = np.arange(buckets)[None, :] * size
+    
+    lo = blocks.argmin(axis=2) + offsets
+    hi = blocks.argmax(axis=2) + offsets
+    # Índices do preenchimento apontam para a última amostra real
+    return np.unique(np.minimum(np.concatenate((lo.ravel(), hi.ravel(), [0, n - 1])), n - 1))
+
+def downsample_indices(timestamps: np.ndarray, sensors: np.ndarray, max_points: int,
+                       method: str = 'lttb') -> np.ndarray:
+    """Escolhe até max_points amostras preservando os picos de impacto.
+    
+    No LTTB a série guia é o envelope (máximo entre os sensores), para que o
+    pico de qualquer sensor seja mantido.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError(f"Método de downsampling desconhecido: {method}")
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points deve ser >= {MIN_POINTS}")
+    if len(timestamps) <= max_points:
+        return np.arange(len(timestamps))
+    
+    if method == 'minmax':
+        return minmax_indices(sensors, max_points)
+    return lttb_indices(timestamps, sensors.max(axis=0), max_points)
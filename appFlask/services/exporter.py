@@ -0,0 +1,172 @@
+import csv
+import io
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from services.calibration import KG_DECIMALS, ModuleCalibration
+from services.storage import _npy_header, load_session, read_csv_records, session_dtype, session_layout
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional
+    zstandard = None
+
+# Formatos de exportação: (content type, extensão)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    'csv': ('text/csv', '.csv'),
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'npy': ('application/octet-stream', '.npy'),
+}
+
+# Compressões: (content type, extensão)
+COMPRESSIONS: Dict[str, Tuple[Optional[str], str]] = {
+    'none': (None, ''),
+    'gzip': ('application/gzip', '.gz'),
+    'zstd': ('application/zstd', '.zst'),
+}
+
+# Registros por bloco: limita a memória da exportação a alguns MB, qualquer que seja a sessão
+DEFAULT_CHUNK_ROWS = 16_384
+
+def available_compressions() -> List[str]:
+    """Compressões utilizáveis neste ambiente"""
+    return [name for name in COMPRESSIONS if name != 'zstd' or zstandard is not None]
+
+def select_fields(names: Sequence[str], sensors: Optional[Sequence[int]] = None) -> List[str]:
+    """Campos exportados: todos, ou só os sensores pedidos (brutos e em kg; sLed, timeStamp e interval_ms sempre)"""
+    if sensors is None:
+        return list(names)
+    available = {int(name[len('rSensor'):]) for name in names if name.startswith('rSensor')}
+    missing = sorted(set(sensors) - available)
+    if missing:
+        raise ValueError(f"Sensores inexistentes: {missing}")
+    keep = {f'{prefix}{i}' for i in sensors for prefix in ('rSensor', 'kgSensor')}
+    return [name for name in names if not name.startswith(('rSensor', 'kgSensor')) or name in keep]
+
+def iter_blocks(records: np.ndarray, start: Optional[int] = None, end: Optional[int] = None,
+                chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Fatias de até chunk_rows registros com start <= timeStamp <= end (busca binária)"""
+    timestamps = records['timeStamp']
+    i0 = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+    i1 = len(records) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+    for i in range(i0, i1, chunk_rows):
+        yield records[i:min(i + chunk_rows, i1)]
+
+def iter_csv_blocks(path: str, start: Optional[int] = None, end: Optional[int] = None,
+                    chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[np.ndarray]:
+    """Como iter_blocks, lendo um CSV em blocos (sem carregar a sessão inteira)"""
+    for block in read_csv_records(path, chunk_rows):
+        timestamps = block['timeStamp']
+        if end is not None and len(block) and timestamps[0] > end:
+            return
+        mask = np.ones(len(block), dtype=bool)
+        if start is not None:
+            mask &= timestamps >= start
+        if end is not None:
+            mask &= timestamps <= end
+        if mask.any():
+            yield block if mask.all() else block[mask]
+
+def session_blocks(path: str, start: Optional[int] = None, end: Optional[int] = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[Callable[[], Iterator[np.ndarray]], np.dtype]:
+    """Fonte de blocos de uma sessão gravada e o dtype dos registros.
+    
+    .npy é lido por memória mapeada (só as páginas do intervalo); .csv em
+    blocos. Retorna uma fábrica de iteradores, para permitir uma passada de
+    contagem antes da exportação em .npy.
+    """
+    if path.endswith('.csv'):
+        with open(path, encoding='utf-8') as f:
+            layout = session_layout(f.readline().strip().split(','))
+        return (lambda: iter_csv_blocks(path, start, end, chunk_rows)), session_dtype(*layout)
+    records = load_session(path, mmap=True)
+    return (lambda: iter_blocks(records, start, end, chunk_rows)), records.dtype
+
+def window_records(window: Dict[str, np.ndarray]) -> np.ndarray:
+    """Snapshot colunar do gráfico (get_chart_window) como registros de sessão (com kg)"""
+    sensors = window['sensors']
+    sensors_kg = window.get('sensors_kg')
+    if sensors_kg is None:
+        sensors_kg = ModuleCalibration.default(len(sensors)).apply(sensors)
+    out = np.empty(len(window['timestamp']), dtype=session_dtype(len(sensors), calibrated=True))
+    out['sLed'] = window['led']
+    for i, (column, column_kg) in enumerate(zip(sensors, sensors_kg), 1):
+        out[f'rSensor{i}'] = column
+        out[f'kgSensor{i}'] = column_kg
+    out['timeStamp'] = window['timestamp']
+    out['interval_ms'] = window['interval_ms']
+    return out
+
+def encode_csv(blocks: Iterable[np.ndarray], fields: Sequence[str]) -> Iterator[bytes]:
+    """CSV com cabeçalho, um bloco de linhas por vez"""
+    yield (','.join(fields) + '\n').encode('utf-8')
+    for block in blocks:
+        text = io.StringIO()
+        csv.writer(text, lineterminator='\n').writerows(_rows(block, fields))
+        yield text.getvalue().encode('utf-8')
+
+def encode_ndjson(blocks: Iterable[np.ndarray], fields: Sequence[str]) -> Iterator[bytes]:
+    """Um objeto JSON por linha, com as colunas do CSV como chaves"""
+    template = '{{' + ','.join(f'"{name}":{{}}' for name in fields) + '}}\n'
+    for block in blocks:
+        yield ''.join([template.format(*row) for row in _rows(block, fields)]).encode('utf-8')
+
+def encode_npy(blocks: Iterable[np.ndarray], fields: Sequence[str], count: int, source: np.dtype) -> Iterator[bytes]:
+    """Arquivo .npy estruturado (carregável com np.load) com as colunas escolhidas"""
+    dtype = np.dtype([(name, source.fields[name][0]) for name in fields])
+    yield _npy_header(dtype, count)
+    for block in blocks:
+        out = np.empty(len(block), dtype=dtype)
+        for name in fields:
+            out[name] = block[name]
+        yield out.tobytes()
+
+def _rows(block: np.ndarray, fields: Sequence[str]) -> List[Sequence]:
+    """Linhas das colunas escolhidas de um bloco (int; kg como float com KG_DECIMALS casas)"""
+    if not any(name.startswith('kgSensor') for name in fields):
+        return np.column_stack([block[name].astype(np.int64) for name in fields]).tolist()
+    columns = [np.round(block[name].astype(np.float64), KG_DECIMALS).tolist() if name.startswith('kgSensor')
+               else block[name].astype(np.int64).tolist() for name in fields]
+    return list(zip(*columns))
+
+def compress_stream(chunks: Iterable[bytes], method: str = 'none', level: Optional[int] = None) -> Iterator[bytes]:
+    """Comprime os pedaços à medida que são gerados (gzip ou zstd).
+    
+    Erros de configuração (método desconhecido, zstandard ausente) saem
+    aqui, antes do início da resposta.
+    """
+    if method == 'none':
+        return iter(chunks)
+    if method == 'gzip':
+        if level is not None and not -1 <= level <= 9:
+            raise ValueError(f"Nível gzip inválido: {level}")
+        compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)  # 31: cabeçalho gzip
+    elif method == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstandard não está instalado")
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+    else:
+        raise ValueError(f"Compressão desconhecida: {method}")
+    return _compressed(chunks, compressor)
+
+def _compressed(chunks: Iterable[bytes], compressor) -> Iterator[bytes]:
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def export_stream(blocks: Callable[[], Iterator[np.ndarray]], dtype: np.dtype, fields: Sequence[str],
+                  fmt: str = 'csv', compression: str = 'none', level: Optional[int] = None) -> Iterator[bytes]:
+    """Gera a exportação (formato + compressão) bloco a bloco, em memória constante"""
+    if fmt == 'csv':
+        chunks = encode_csv(blocks(), fields)
+    elif fmt == 'ndjson':
+        chunks = encode_ndjson(blocks(), fields)
+    elif fmt == 'npy':
+        # O cabeçalho .npy leva a contagem: uma passada só de contagem antes
+        count = sum(len(block) for block in blocks())
+        chunks = encode_npy(blocks(), fields, count, dtype)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    return compress_stream(chunks, compression, level)
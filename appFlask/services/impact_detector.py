@@ -0,0 +1,242 @@
+import threading
+import numpy as np
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+from services.ble_manager import SensorRecord
+
+@dataclass(slots=True)
+class ImpactEvent:
+    """Impacto detectado em um sensor"""
+    id: int
+    sensor: int          # 1..N
+    start_ts: int
+    end_ts: int
+    peak_ts: int
+    peak: int            # valor ADC bruto no pico
+    amplitude: float     # pico acima da linha de base
+    energy: float        # soma do excesso sobre a linha de base
+    samples: int
+    duration_ms: int
+    led: int             # sLed ativo no pico
+    baseline: float
+
+class ImpactDetector:
+    """Detector de impactos em streaming, por sensor, processado em lotes vetorizados.
+    
+    Usa linha de base adaptativa (média exponencial das amostras fora de
+    impacto) e limiar com histerese: o impacto começa quando o excesso sobre
+    a linha de base passa de ``threshold_on`` e termina quando cai abaixo de
+    ``threshold_off``. Eventos abertos continuam entre lotes.
+    
+    A linha de base é atualizada a cada ``baseline_block`` amostras, em
+    blocos alinhados à contagem total de amostras (não aos lotes): o
+    resultado é o mesmo para qualquer divisão do stream em lotes, seja o
+    tempo real ou o reprocessamento de uma sessão gravada.
+    """
+    
+    def __init__(self, num_sensors: int = 4, threshold_on: int = 400, threshold_off: int = 200,
+                 baseline_alpha: float = 0.01, min_samples: int = 1, sample_ms: int = 50,
+                 max_events: int = 10_000, baseline_block: int = 64):
+        self.num_sensors = num_sensors
+        self.threshold_on = threshold_on
+        self.threshold_off = threshold_off
+        self.baseline_alpha = baseline_alpha
+        self.baseline_block = baseline_block
+        self.min_samples = min_samples
+        self.sample_ms = sample_ms
+        
+        self.events: deque = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zera linha de base, eventos abertos e histórico"""
+        with self._lock:
+            self.events.clear()
+            self.next_id = 1
+            self.total_events = 0
+            self.counts = [0] * self.num_sensors
+            self.baseline: Optional[np.ndarray] = None
+            self.active = np.zeros(self.num_sensors, dtype=bool)
+            # Amostras fora de impacto do bloco de linha de base em andamento
+            self._block_fill = 0
+            self._quiet_sum = np.zeros(self.num_sensors)
+            self._quiet_count = np.zeros(self.num_sensors, dtype=np.int64)
+            # Acumuladores dos eventos abertos, por sensor
+            self._open: List[Optional[Dict]] = [None] * self.num_sensors
+    
+    def process(self, records: List[SensorRecord]) -> List[ImpactEvent]:
+        """Callback de lote do BLEManager"""
+        if not records:
+            return []
+        block = np.asarray(records, dtype=np.int64)
+        ts_col = 1 + self.num_sensors
+        return self.process_arrays(block[:, 0], block[:, 1:ts_col].T, block[:, ts_col])
+    
+    def process_session(self, records: np.ndarray, chunk: int = 65_536) -> List[ImpactEvent]:
+        """Reprocessa uma sessão gravada (array estruturado) em blocos; os eventos são os mesmos do tempo real"""
+        events = []
+        for i in range(0, len(records), chunk):
+            part = records[i:i + chunk]
+            sensors = np.vstack([part[f'rSensor{s}'] for s in range(1, self.num_sensors + 1)])
+            events += self.process_arrays(part['sLed'], sensors, part['timeStamp'])
+        return events
+    
+    def process_arrays(self, leds: np.ndarray, sensors: np.ndarray, timestamps: np.ndarray) -> List[ImpactEvent]:
+        """Processa um lote em forma colunar: sensors tem forma (N, n)"""
+        n = sensors.shape[1]
+        if n == 0:
+            return []
+        values = sensors.astype(np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        
+        with self._lock:
+            if self.baseline is None:
+                # Primeira amostra: ponto de partida que não depende do tamanho do lote
+                self.baseline = values[:, 0].copy()
+            
+            # Fatia o lote nas fronteiras dos blocos de linha de base
+            found: List[ImpactEvent] = []
+            start = 0
+            while start < n:
+                end = min(n, start + self.baseline_block - self._block_fill)
+                found += self._process_block(leds[start:end], sensors[:, start:end], values[:, start:end],
+                                             timestamps[start:end])
+                start = end
+            
+            # Ordem de fechamento (como amostra a amostra), e ids nessa ordem
+            found.sort(key=lambda event: (event.end_ts, event.sensor))
+            for event in found:
+                event.id = self.next_id
+                self.next_id += 1
+                self.events.append(event)
+                self.counts[event.sensor - 1] += 1
+            self.total_events += len(found)
+            return found
+    
+    def _process_block(self, leds: np.ndarray, sensors: np.ndarray, values: np.ndarray,
+                       timestamps: np.ndarray) -> List[ImpactEvent]:
+        """Detecta os eventos de um trecho dentro de um bloco (mesma linha de base)"""
+        excess = values - self.baseline[:, None]
+        state = self._hysteresis(excess)
+        found: List[ImpactEvent] = []
+        for s in range(self.num_sensors):
+            found += self._segments(s, state[s], excess[s], sensors[s], leds, timestamps)
+        self.active = state[:, -1].copy()
+        
+        quiet = ~state
+        self._quiet_sum += np.where(quiet, values, 0.0).sum(axis=1)
+        self._quiet_count += quiet.sum(axis=1)
+        self._block_fill += values.shape[1]
+        if self._block_fill >= self.baseline_block:
+            self._update_baseline()
+        return found
+    
+    def _hysteresis(self, excess: np.ndarray) -> np.ndarray:
+        """Estado (em impacto ou não) por amostra, com histerese, sem laço por amostra"""
+        marks = np.zeros(excess.shape, dtype=np.int8)
+        marks[excess >= self.threshold_on] = 1
+        marks[excess < self.threshold_off] = -1
+        
+        # Propaga a última marcação (+1/-1) para as amostras na zona de histerese
+        n = excess.shape[1]
+        last = np.where(marks != 0, np.arange(n), -1)
+        np.maximum.accumulate(last, axis=1, out=last)
+        filled = np.take_along_axis(marks, np.maximum(last, 0), axis=1) == 1
+        return np.where(last >= 0, filled, self.active[:, None])
+    
+    def _segments(self, s: int, state: np.ndarray, excess: np.ndarray, raw: np.ndarray,
+                  leds: np.ndarray, timestamps: np.ndarray) -> List[ImpactEvent]:
+        """Extrai os eventos do sensor s a partir das transições de estado do lote"""
+        padded = np.concatenate(([self.active[s]], state, [False])).astype(np.int8)
+        changes = np.diff(padded)
+        starts = np.flatnonzero(changes == 1)
+        ends = np.flatnonzero(changes == -1)   # primeira amostra fora do evento (n = ainda aberto)
+        n = len(state)
+        
+        # Evento aberto no lote anterior: o primeiro trecho é continuação dele
+        if self.active[s]:
+            starts = np.concatenate(([0], starts))
+        
+        events = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            seg = slice(start, end)
+            acc = self._accumulate(self._take_open(s, start), excess[seg], raw[seg], leds[seg], timestamps[seg])
+            if end < n:
+                event = self._close(s, acc)
+                if event:
+                    events.append(event)
+            else:
+                self._open[s] = acc
+        return events
+    
+    def _take_open(self, s: int, start: int) -> Optional[Dict]:
+        if start == 0 and self._open[s] is not None:
+            acc, self._open[s] = self._open[s], None
+            return acc
+        return None
+    
+    def _accumulate(self, acc: Optional[Dict], excess: np.ndarray, raw: np.ndarray,
+                    leds: np.ndarray, timestamps: np.ndarray) -> Dict:
+        """Soma um trecho de evento aos acumuladores (pico, energia, duração)"""
+        if len(raw) == 0:
+            return acc
+        i = int(np.argmax(raw))
+        if acc is None:
+            acc = {'start_ts': int(timestamps[0]), 'peak': -1, 'energy': 0.0, 'samples': 0}
+        if raw[i] > acc['peak']:
+            acc.update(peak=int(raw[i]), peak_ts=int(timestamps[i]), led=int(leds[i]),
+                       amplitude=float(excess[i]))
+        acc['energy'] += float(np.clip(excess, 0, None).sum())
+        acc['samples'] += len(raw)
+        acc['end_ts'] = int(timestamps[-1])
+        return acc
+    
+    def _close(self, s: int, acc: Dict) -> Optional[ImpactEvent]:
+        if acc is None or acc['samples'] < self.min_samples:
+            return None
+        return ImpactEvent(
+            id=0,  # atribuído por process_arrays, na ordem de fechamento
+            sensor=s + 1,
+            start_ts=acc['start_ts'],
+            end_ts=acc['end_ts'],
+            peak_ts=acc['peak_ts'],
+            peak=acc['peak'],
+            amplitude=acc['amplitude'],
+            energy=acc['energy'],
+            samples=acc['samples'],
+            duration_ms=acc['samples'] * self.sample_ms,
+            led=acc['led'],
+            baseline=float(self.baseline[s])
+        )
+    
+    def _update_baseline(self) -> None:
+        """Fecha o bloco: média exponencial da linha de base com as amostras fora de impacto"""
+        k = self._quiet_count
+        has_quiet = k > 0
+        quiet_mean = self._quiet_sum / np.maximum(k, 1)
+        # Peso equivalente a aplicar a EMA amostra a amostra k vezes
+        weight = 1.0 - (1.0 - self.baseline_alpha) ** k
+        self.baseline = np.where(has_quiet, self.baseline + weight * (quiet_mean - self.baseline), self.baseline)
+        self._block_fill = 0
+        self._quiet_sum = np.zeros(self.num_sensors)
+        self._quiet_count = np.zeros(self.num_sensors, dtype=np.int64)
+    
+    def get_events(self, since_id: int = 0, sensor: Optional[int] = None, limit: int = 1000) -> List[Dict]:
+        """Eventos com id > since_id (opcionalmente de um sensor), mais antigos primeiro"""
+        with self._lock:
+            events = [e for e in self.events if e.id > since_id and (sensor is None or e.sensor == sensor)]
+        return [asdict(e) for e in events[:limit]]
+    
+    def get_summary(self) -> Dict:
+        """Contagens de eventos e estado atual do detector"""
+        with self._lock:
+            return {
+                'total_events': self.total_events,
+                'per_sensor': {f'sensor_{i + 1}': count for i, count in enumerate(self.counts)},
+                'active': [bool(a) for a in self.active],
+                'baseline': None if self.baseline is None else [float(b) for b in self.baseline],
+                'threshold_on': self.threshold_on,
+                'threshold_off': self.threshold_off,
+            }
@@ -0,0 +1,158 @@
+import numpy as np
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+class IntervalDetector:
+    """Classe para detectar mudanças de intervalo baseado em sLed.
+    
+    O intervalo é o tempo entre duas trocas consecutivas de sLed; uma nova
+    zona é registrada quando ele muda mais que ``threshold_ms``. O
+    processamento em lote (``detect_batch``) encontra as trocas com
+    diff/flatnonzero e só itera sobre as mudanças de intervalo candidatas.
+    """
+    
+    def __init__(self, max_zones: Optional[int] = 20, timestamp_ms: int = 50, threshold_ms: int = 100):
+        self.timestamp_ms = timestamp_ms  # Cada timestamp = 50ms
+        self.threshold_ms = threshold_ms
+        self.small_batch = 64  # Abaixo disso o laço em Python é mais rápido que o NumPy
+        self.last_sLed: Optional[int] = None
+        self.last_timestamp_change: Optional[int] = None
+        self.current_interval_ms: int = 0
+        self.interval_zones: deque = deque(maxlen=max_zones)
+        self.total_zones = 0
+    
+    def detect_interval_change(self, sLed: int, timeStamp: int) -> None:
+        """Detecta mudanças no intervalo baseado nas trocas de sLed (uma amostra)"""
+        # Se é a primeira leitura
+        if self.last_sLed is None:
+            self.last_sLed = sLed
+            self.last_timestamp_change = timeStamp
+            return
+        
+        # Se houve mudança no sLed
+        if sLed != self.last_sLed:
+            # Calcula quantos timestamps passaram
+            timestamp_diff = timeStamp - self.last_timestamp_change
+            interval_ms = timestamp_diff * self.timestamp_ms
+            
+            # Se o intervalo mudou significativamente
+            if abs(interval_ms - self.current_interval_ms) > self.threshold_ms:
+                self._add_zone(timeStamp, interval_ms, timestamp_diff)
+            
+            # Atualiza referências
+            self.last_sLed = sLed
+            self.last_timestamp_change = timeStamp
+    
+    def detect_batch(self, leds: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """Processa um lote de sLed/timeStamp e retorna o interval_ms de cada amostra.
+        
+        Equivale a chamar detect_interval_change amostra a amostra.
+        """
+        n = len(leds)
+        if n == 0:
+            return np.empty(0, dtype=np.int32)
+        if n <= self.small_batch:
+            return np.array(self._detect_loop(zip(leds, timestamps)), dtype=np.int32)
+        leds = np.asarray(leds)
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        
+        # Primeira leitura: só define as referências
+        offset = 0
+        if self.last_sLed is None:
+            self.last_sLed = int(leds[0])
+            self.last_timestamp_change = int(timestamps[0])
+            offset = 1
+        
+        # Trocas de sLed (incluindo a troca em relação ao último lote)
+        previous = np.concatenate(([self.last_sLed], leds[offset:-1])) if n > offset else leds[:0]
+        changes = np.flatnonzero(leds[offset:] != previous) + offset
+        
+        intervals = np.full(n, self.current_interval_ms, dtype=np.int32)
+        if len(changes) == 0:
+            return intervals
+        
+        change_ts = timestamps[changes]
+        diffs = np.diff(change_ts, prepend=self.last_timestamp_change)
+        candidates = diffs * self.timestamp_ms
+        
+        # A decisão de zona só depende do intervalo atual: basta avaliá-la no
+        # início de cada sequência de candidatos iguais
+        run_starts = np.flatnonzero(np.diff(candidates, prepend=candidates[0] - 1))
+        current = np.empty(len(changes), dtype=np.int64)
+        for i, run_end in zip(run_starts.tolist(), np.append(run_starts[1:], len(changes)).tolist()):
+            interval_ms = int(candidates[i])
+            if abs(interval_ms - self.current_interval_ms) > self.threshold_ms:
+                self._add_zone(int(change_ts[i]), interval_ms, int(diffs[i]))
+            current[i:run_end] = self.current_interval_ms
+        
+        # Cada amostra herda o intervalo vigente após a última troca até ela
+        intervals[changes[0]:] = np.repeat(current, np.diff(np.append(changes, n)))
+        
+        self.last_sLed = int(leds[-1])
+        self.last_timestamp_change = int(change_ts[-1])
+        return intervals
+    
+    def annotate_records(self, records: Sequence[Tuple[int, ...]]) -> List[Tuple[int, ...]]:
+        """Acrescenta o interval_ms a cada registro decodificado (sLed no campo 0, timeStamp no 5).
+        
+        Lotes pequenos (uma notificação BLE) usam um laço simples, sem o custo
+        fixo do NumPy; lotes grandes usam detect_batch.
+        """
+        if len(records) > self.small_batch:
+            intervals = self.detect_batch([r[0] for r in records], [r[5] for r in records]).tolist()
+            return [(*r, interval) for r, interval in zip(records, intervals)]
+        
+        # Sem troca de sLed na notificação (o caso comum): o intervalo não muda
+        last = self.last_sLed
+        if last is not None and all(r[0] == last for r in records):
+            current = self.current_interval_ms
+            return [(*r, current) for r in records]
+        
+        detect = self.detect_interval_change
+        annotated = []
+        for r in records:
+            detect(r[0], r[5])
+            annotated.append((*r, self.current_interval_ms))
+        return annotated
+    
+    def _detect_loop(self, pairs: Iterable[Tuple[int, int]]) -> List[int]:
+        detect = self.detect_interval_change
+        intervals = []
+        for sLed, timeStamp in pairs:
+            detect(int(sLed), int(timeStamp))
+            intervals.append(self.current_interval_ms)
+        return intervals
+    
+    @classmethod
+    def recompute(cls, leds: np.ndarray, timestamps: np.ndarray, **kwargs) -> Tuple[np.ndarray, List[Dict]]:
+        """Recalcula interval_ms e todas as zonas de uma sessão inteira (offline)"""
+        detector = cls(max_zones=None, **kwargs)
+        intervals = detector.detect_batch(leds, timestamps)
+        return intervals, detector.get_zones()
+    
+    def _add_zone(self, timeStamp: int, interval_ms: int, timestamp_diff: int) -> None:
+        """Registra mudança de zona"""
+        self.interval_zones.append({
+            'timestamp': timeStamp,
+            'old_interval': self.current_interval_ms,
+            'new_interval': interval_ms,
+            'change_time': timestamp_diff
+        })
+        self.total_zones += 1
+        self.current_interval_ms = interval_ms
+    
+    def reset(self) -> None:
+        """Reset das variáveis de detecção"""
+        self.last_sLed = None
+        self.last_timestamp_change = None
+        self.current_interval_ms = 0
+        self.interval_zones.clear()
+        self.total_zones = 0
+    
+    def get_current_interval(self) -> int:
+        """Retorna o intervalo atual em ms"""
+        return self.current_interval_ms
+    
+    def get_zones(self) -> List[Dict]:
+        """Retorna as zonas de intervalo detectadas"""
+        return list(self.interval_zones)
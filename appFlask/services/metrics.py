@@ -0,0 +1,232 @@
+import bisect
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Buckets padrão (segundos): de 10 µs (decodificação de uma notificação) a 10 s
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+# Amostra de um coletor: (nome, tipo, ajuda, labels, valor)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class CounterChild:
+    """Série de um contador (um conjunto de labels).
+    
+    Sem lock quando a série tem um único escritor (thread do loop BLE): ``+=``
+    não perde incrementos e custa dezenas de ns, o que permite manter as
+    métricas sempre ligadas. Séries escritas por várias threads usam lock.
+    """
+    
+    __slots__ = ('value', '_lock')
+    
+    def __init__(self, shared: bool = False):
+        self.value = 0
+        self._lock = threading.Lock() if shared else None
+    
+    def inc(self, amount: float = 1) -> None:
+        if self._lock is None:
+            self.value += amount
+            return
+        with self._lock:
+            self.value += amount
+
+class HistogramChild:
+    """Série de um histograma; ``observe`` é uma busca binária e três somas"""
+    
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+    
+    def __init__(self, buckets: Sequence[float], shared: bool = False):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # Séries escritas por várias threads (ex.: handlers HTTP) usam lock
+        self._lock = threading.Lock() if shared else None
+    
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        if self._lock is None:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+            return
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+class Metric(ABC):
+    """Métrica com labels; cada combinação de labels vira uma série (child)"""
+    
+    kind = ''
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), shared: bool = False):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.shared = shared
+        self.children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+    
+    def labels(self, **labels):
+        """Série para os labels dados (criada na primeira chamada; guarde a referência no caminho quente)"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+    
+    @abstractmethod
+    def _new_child(self):
+        """Nova série da métrica"""
+    
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Linhas do formato texto do Prometheus"""
+    
+    def _label_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+class Counter(Metric):
+    kind = 'counter'
+    
+    def _new_child(self) -> CounterChild:
+        return CounterChild(self.shared)
+    
+    def inc(self, amount: float = 1) -> None:
+        """Incrementa a série sem labels"""
+        self.labels().inc(amount)
+    
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self._label_dict(key))} {_format_value(child.value)}"
+                for key, child in list(self.children.items())]
+
+class Histogram(Metric):
+    kind = 'histogram'
+    
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, shared: bool = False):
+        super().__init__(name, help_text, labelnames, shared)
+        self.buckets = tuple(sorted(buckets))
+    
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets, self.shared)
+    
+    def observe(self, value: float) -> None:
+        """Registra uma observação na série sem labels"""
+        self.labels().observe(value)
+    
+    def render(self) -> List[str]:
+        lines = []
+        for key, child in list(self.children.items()):
+            labels = self._label_dict(key)
+            counts = list(child.counts)
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                bucket_labels = _format_labels({**labels, 'le': _format_value(float(bound))})
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Registro das métricas da aplicação e exportação no formato texto do Prometheus.
+    
+    Contadores e histogramas são atualizados no caminho quente; valores que já
+    existem em outros objetos (profundidade de filas, descartes do pipeline)
+    vêm de coletores chamados só no momento da leitura de /api/metrics.
+    """
+    
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self.metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self.metrics[metric.name] = metric
+            return metric
+    
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = (), shared: bool = False) -> Counter:
+        return self._register(Counter(name, help_text, labelnames, shared))
+    
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS, shared: bool = False) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets, shared))
+    
+    def register_collector(self, collector: Callable[[], Iterable[Sample]]) -> None:
+        """Adiciona uma função que gera amostras (gauges/contadores) na hora da leitura"""
+        self.collectors.append(collector)
+    
+    def render(self) -> str:
+        """Todas as métricas no formato de exposição texto 0.0.4 do Prometheus"""
+        lines: List[str] = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        
+        grouped: Dict[str, Tuple[str, str, List[str]]] = {}
+        for collector in self.collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Erro no coletor de métricas: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                entry = grouped.setdefault(name, (kind, help_text, []))
+                entry[2].append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for name, (kind, help_text, samples) in grouped.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+# Registro global (como o app_state)
+registry = MetricsRegistry()
+
+# BLE: por dispositivo (label device = endereço ou "default")
+BLE_NOTIFICATIONS = registry.counter('ble_notifications_total', 'Notificações BLE recebidas', ['device'])
+BLE_BYTES = registry.counter('ble_bytes_total', 'Bytes recebidos em notificações BLE', ['device'])
+BLE_RECORDS = registry.counter('ble_records_decoded_total', 'Registros decodificados', ['device'])
+BLE_PARTIAL_CARRIES = registry.counter('ble_partial_carries_total',
+                                       'Notificações que deixaram um registro parcial no buffer', ['device'])
+BLE_DECODE_SECONDS = registry.histogram('ble_decode_seconds', 'Tempo de decodificação por notificação', ['device'])
+BLE_CALLBACK_SECONDS = registry.histogram('ble_callback_seconds',
+                                          'Tempo dos callbacks (entrega ao pipeline) por notificação', ['device'])
+
+# Gravação: por backend (csv, npy, arrow); cada sessão tem seus escritores, daí o lock
+STORAGE_ROWS_WRITTEN = registry.counter('storage_rows_written_total', 'Linhas gravadas', ['backend'], shared=True)
+STORAGE_ROWS_DROPPED = registry.counter('storage_rows_dropped_total', 'Linhas descartadas com a fila cheia',
+                                        ['backend'], shared=True)
+STORAGE_WRITE_SECONDS = registry.histogram('storage_write_seconds', 'Tempo de escrita de um grupo de lotes',
+                                           ['backend'], shared=True)
+STORAGE_FLUSH_SECONDS = registry.histogram('storage_flush_seconds', 'Latência do flush (e fsync no fechamento)',
+                                           ['backend'], shared=True)
+
+# HTTP: handlers Flask (várias threads escrevem na mesma série)
+HTTP_REQUEST_SECONDS = registry.histogram('http_request_duration_seconds', 'Latência dos handlers HTTP',
+                                          ['endpoint', 'method', 'status'], shared=True)
+RESPONSE_CACHE_REQUESTS = registry.counter('http_response_cache_total',
+                                           'Consultas ao cache de respostas (hit, miss, not_modified)',
+                                           ['endpoint', 'result'], shared=True)
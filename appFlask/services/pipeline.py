@@ -0,0 +1,175 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from services.ble_manager import SensorRecord
+from services.worker_pool import PoolTask, WorkerPool, shared_pool
+
+# Políticas quando a fila de um estágio está cheia
+OVERFLOW_POLICIES = ('drop_oldest', 'drop_newest')
+
+class PipelineStage(PoolTask):
+    """Estágio consumidor com fila própria, executado no pool de workers compartilhado.
+    
+    Produtor (thread do loop BLE) e worker usam a fila sob a condição do
+    estágio, mantida só durante o append/popleft; cada execução no pool
+    consome um lote agrupado (até ``max_coalesce`` registros). Quando a fila passa de
+    ``max_records``, a política de overflow descarta os lotes mais antigos
+    (``drop_oldest``, bom para visualização) ou os novos (``drop_newest``,
+    mantém a sequência contínua já enfileirada). O BLE nunca espera por um
+    consumidor lento.
+    """
+    
+    def __init__(self, name: str, consumer: Callable[[List[SensorRecord]], None],
+                 max_records: int = 100_000, overflow: str = 'drop_oldest', max_coalesce: int = 4096,
+                 pool: Optional[WorkerPool] = None):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow desconhecida: {overflow}")
+        self.name = name
+        self.consumer = consumer
+        self.max_records = max_records
+        self.overflow = overflow
+        self.max_coalesce = max_coalesce
+        self.pool = pool or shared_pool()
+        
+        # Itens: (instante de enfileiramento, lote). Fila, contagem e _busy
+        # mudam sob _cond, que também acorda o worker e quem espera o flush
+        self.queue: deque = deque()
+        self._queued = 0
+        self._busy = False
+        self._cond = threading.Condition()
+        self._running = True
+        
+        # Métricas
+        self.enqueued_records = 0
+        self.processed_records = 0
+        self.processed_batches = 0
+        self.dropped_records = 0
+        self.errors = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self.busy_s = 0.0
+    
+    def put(self, records: List[SensorRecord]) -> bool:
+        """Enfileira um lote (chamado pelo produtor); False se o lote foi descartado"""
+        if not self._running:
+            return False
+        size = len(records)
+        with self._cond:
+            self.enqueued_records += size
+            if self._queued + size > self.max_records:
+                if self.overflow == 'drop_newest':
+                    self.dropped_records += size
+                    return False
+                while self.queue and self._queued + size > self.max_records:
+                    _, old = self.queue.popleft()
+                    self._queued -= len(old)
+                    self.dropped_records += len(old)
+            self.queue.append((time.monotonic(), records))
+            self._queued += size
+        self.pool.schedule(self)
+        return True
+    
+    @property
+    def queued_records(self) -> int:
+        """Registros aguardando o worker"""
+        return self._queued
+    
+    def _take(self) -> tuple:
+        """Retira lotes da fila (não vazia), agrupando até max_coalesce registros; chamado sob _cond"""
+        enqueued_at, batch = self.queue.popleft()
+        while self.queue and len(batch) < self.max_coalesce:
+            _, more = self.queue.popleft()
+            batch = batch + more
+        self._queued -= len(batch)
+        return enqueued_at, batch
+    
+    def run_pending(self) -> bool:
+        """Consome um lote agrupado da fila (executado pelo pool); True se ainda há lotes"""
+        with self._cond:
+            if not self.queue:
+                return False
+            enqueued_at, batch = self._take()
+            self._busy = True
+        start = time.monotonic()
+        lag_ms = (start - enqueued_at) * 1000
+        self.last_lag_ms = lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        try:
+            self.consumer(batch)
+        except Exception as e:
+            self.errors += 1
+            print(f"Erro no estágio {self.name}: {e}")
+        self.busy_s += time.monotonic() - start
+        self.processed_records += len(batch)
+        self.processed_batches += 1
+        with self._cond:
+            self._busy = False
+            if not self.queue:
+                # Fila drenada: acorda quem espera em flush()
+                self._cond.notify_all()
+            return bool(self.queue)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda a fila esvaziar e o lote em andamento terminar"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self.queue and not self._busy, timeout)
+    
+    def stop(self, timeout: float = 5.0) -> bool:
+        """Recusa novos lotes e aguarda o pool processar o que restou na fila"""
+        self._running = False
+        return self.flush(timeout)
+    
+    def get_stats(self) -> Dict:
+        """Profundidade da fila, descartes e atraso do estágio"""
+        return {
+            'overflow': self.overflow,
+            'queue_records': self.queued_records,
+            'queue_batches': len(self.queue),
+            'max_records': self.max_records,
+            'enqueued_records': self.enqueued_records,
+            'processed_records': self.processed_records,
+            'processed_batches': self.processed_batches,
+            'dropped_records': self.dropped_records,
+            'errors': self.errors,
+            'last_lag_ms': round(self.last_lag_ms, 3),
+            'max_lag_ms': round(self.max_lag_ms, 3),
+            'busy_s': round(self.busy_s, 3),
+        }
+
+class Pipeline:
+    """Distribui os lotes decodificados no BLE para estágios consumidores independentes"""
+    
+    def __init__(self):
+        self.stages: Dict[str, PipelineStage] = {}
+        self.published_records = 0
+    
+    def add_stage(self, name: str, consumer: Callable[[List[SensorRecord]], None], **kwargs) -> PipelineStage:
+        """Cria um estágio (executado no pool de workers compartilhado)"""
+        stage = PipelineStage(name, consumer, **kwargs)
+        self.stages[name] = stage
+        return stage
+    
+    def publish(self, records: List[SensorRecord]) -> None:
+        """Callback de lote do BLEManager: entrega o lote a todos os estágios"""
+        self.published_records += len(records)
+        for stage in self.stages.values():
+            stage.put(records)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Aguarda todos os estágios processarem o que está enfileirado (``timeout`` vale para o conjunto)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return all(stage.flush(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                   for stage in self.stages.values())
+    
+    def stop(self) -> None:
+        """Encerra os estágios, processando o que restou nas filas"""
+        for stage in self.stages.values():
+            stage.stop()
+    
+    def get_stats(self) -> Dict:
+        """Métricas por estágio"""
+        return {
+            'published_records': self.published_records,
+            'stages': {name: stage.get_stats() for name, stage in self.stages.items()},
+        }
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+# Muda a cada inicialização: ETags de outro processo nunca coincidem com as atuais
+_BOOT_ID = os.urandom(4).hex()
+
+class ResponseCache:
+    """Cache LRU de respostas já codificadas (bytes), limitado em entradas e em bytes.
+    
+    A chave identifica a consulta (rota e parâmetros) e cada entrada guarda
+    a versão dos dados com que foi gerada: uma versão nova (DataManager
+    recebeu amostras, arquivo de sessão mudou) invalida a entrada na próxima
+    consulta, sem varrer o cache. A ETag deriva só de chave e versão, então
+    um If-None-Match é respondido sem gerar nem guardar o corpo.
+    """
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 << 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def etag(key: Hashable, version) -> str:
+        """ETag (sem aspas) da consulta na versão dada"""
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+        return f"{_BOOT_ID}-{digest}-{version}"
+    
+    def get(self, key: Hashable, version) -> Optional[bytes]:
+        """Corpo guardado para a chave, se foi gerado nesta versão"""
+        version = str(version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, key: Hashable, version, body: bytes) -> None:
+        """Guarda o corpo (substitui a versão anterior da chave) e aplica os limites"""
+        if len(body) > self.max_bytes // 4:
+            return  # uma resposta enorme expulsaria quase todo o cache
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= len(old[1])
+            self._entries[key] = (str(version), body)
+            self.size_bytes += len(body)
+            while len(self._entries) > self.max_entries or self.size_bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+    
+    def get_stats(self) -> Dict:
+        """Ocupação e contadores do cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_bytes': self.size_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,126 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+class ColumnarRingBuffer:
+    """Buffer circular colunar e pré-alocado para as amostras do gráfico.
+    
+    Cada coluna (timestamp, led, sensores, kg, interval_ms) é um array NumPy
+    de tamanho fixo. O armazenamento é espelhado: cada amostra é escrita na
+    posição ``i`` e em ``i + capacity``, de modo que qualquer janela das
+    últimas ``n`` amostras é sempre contígua e pode ser lida como view, sem
+    cópia. Inserções são O(1) e não alocam memória.
+    """
+    
+    def __init__(self, capacity: int = 100, num_sensors: int = 4):
+        if capacity <= 0:
+            raise ValueError("capacity deve ser positivo")
+        
+        self.capacity = capacity
+        self.num_sensors = num_sensors
+        
+        size = 2 * capacity
+        self._timestamp = np.zeros(size, dtype=np.int64)
+        self._led = np.zeros(size, dtype=np.uint8)
+        self._sensors = np.zeros((num_sensors, size), dtype=np.int32)
+        self._sensors_kg = np.zeros((num_sensors, size), dtype=np.float32)
+        self._interval_ms = np.zeros(size, dtype=np.int32)
+        
+        # Próxima posição de escrita, amostras válidas e total já inserido
+        self._head = 0
+        self._count = 0
+        self.sequence = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    @property
+    def nbytes(self) -> int:
+        """Memória ocupada pelas colunas"""
+        return (self._timestamp.nbytes + self._led.nbytes
+                + self._sensors.nbytes + self._sensors_kg.nbytes + self._interval_ms.nbytes)
+    
+    def append(self, led: int, sensors: Sequence[int], timestamp: int, interval_ms: int = 0,
+               sensors_kg: Optional[Sequence[float]] = None) -> None:
+        """Insere uma amostra (O(1), sem alocação); sem sensors_kg, os kg ficam zerados"""
+        i = self._head
+        j = i + self.capacity
+        
+        self._timestamp[i] = self._timestamp[j] = timestamp
+        self._led[i] = self._led[j] = led
+        self._sensors[:, i] = sensors
+        self._sensors[:, j] = sensors
+        self._sensors_kg[:, i] = self._sensors_kg[:, j] = 0 if sensors_kg is None else sensors_kg
+        self._interval_ms[i] = self._interval_ms[j] = interval_ms
+        
+        self._advance(1)
+    
+    def extend(self, records: Union[List[Sequence[int]], np.ndarray],
+               sensors_kg: Optional[np.ndarray] = None) -> None:
+        """Insere um lote de registros (sLed, rSensor1..N, timeStamp, interval_ms).
+        
+        ``sensors_kg`` (sensores x amostras) traz os valores já calibrados do
+        lote; sem ele, os kg ficam zerados.
+        """
+        if len(records) == 0:
+            return
+        
+        n_total = len(records)
+        # Só as últimas `capacity` amostras sobrevivem ao lote
+        if n_total > self.capacity:
+            records = records[-self.capacity:]
+            if sensors_kg is not None:
+                sensors_kg = sensors_kg[:, -self.capacity:]
+        
+        block = np.asarray(records, dtype=np.int64)
+        n = len(block)
+        pos = (self._head + np.arange(n)) % self.capacity
+        mirror = pos + self.capacity
+        ts_col = 1 + self.num_sensors
+        
+        for idx in (pos, mirror):
+            self._led[idx] = block[:, 0]
+            self._sensors[:, idx] = block[:, 1:ts_col].T
+            self._sensors_kg[:, idx] = 0 if sensors_kg is None else sensors_kg
+            self._timestamp[idx] = block[:, ts_col]
+            self._interval_ms[idx] = block[:, ts_col + 1]
+        
+        self._advance(n)
+        self.sequence += n_total - n
+    
+    def _advance(self, n: int) -> None:
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        self.sequence += n
+    
+    def window(self, n: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Retorna views (somente leitura) das últimas n amostras, da mais antiga à mais recente"""
+        n = self._count if n is None else max(0, min(n, self._count))
+        end = self._head + self.capacity
+        start = end - n
+        
+        columns = {
+            'timestamp': self._timestamp[start:end],
+            'led': self._led[start:end],
+            'sensors': self._sensors[:, start:end],
+            'sensors_kg': self._sensors_kg[:, start:end],
+            'interval_ms': self._interval_ms[start:end],
+        }
+        for view in columns.values():
+            view.flags.writeable = False
+        return columns
+    
+    def since(self, cursor: int) -> Tuple[Dict[str, np.ndarray], bool]:
+        """Views das amostras inseridas depois da sequência `cursor`.
+        
+        Retorna (colunas, reset); reset é True quando o cursor é inválido ou
+        parte das amostras já saiu do buffer, e então vem a janela inteira.
+        """
+        new = self.sequence - cursor
+        if cursor < 0 or new < 0 or new > self._count:
+            return self.window(), True
+        return self.window(new), False
+    
+    def clear(self) -> None:
+        """Descarta as amostras (a sequência global continua crescendo)"""
+        self._head = 0
+        self._count = 0
@@ -0,0 +1,168 @@
+import numpy as np
+import operator
+from collections import deque
+from typing import Dict, List, Optional
+
+class RollingStats:
+    """Estatísticas incrementais de uma janela deslizante, por canal.
+    
+    Mantém soma e contagem, média/variância de Welford (com remoção) e
+    mínimo/máximo por deques monotônicos indexados pela sequência da amostra.
+    Atualizações são O(1) amortizado por amostra e as consultas são O(1),
+    independente do tamanho da janela.
+    """
+    
+    def __init__(self, capacity: int, num_channels: int):
+        self.capacity = capacity
+        self.num_channels = num_channels
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zera todas as estatísticas"""
+        self.count = 0
+        self.sequence = 0  # total de amostras já inseridas
+        self.sum = np.zeros(self.num_channels, dtype=np.int64)
+        self.mean = np.zeros(self.num_channels, dtype=np.float64)
+        self.m2 = np.zeros(self.num_channels, dtype=np.float64)
+        # Deques de (sequência, valor): crescente para mínimo, decrescente para máximo
+        self._min_q: List[deque] = [deque() for _ in range(self.num_channels)]
+        self._max_q: List[deque] = [deque() for _ in range(self.num_channels)]
+    
+    def update(self, values: np.ndarray, evicted: Optional[np.ndarray] = None) -> None:
+        """Insere um lote e remove as amostras que saíram da janela.
+        
+        values e evicted têm forma (canais, n); evicted traz, da mais antiga à
+        mais recente, as amostras que deixaram a janela por causa deste lote.
+        """
+        n = values.shape[1]
+        if n == 0:
+            return
+        
+        values = values.astype(np.int64, copy=False)
+        self._merge(values, sign=1)
+        if evicted is not None and evicted.shape[1]:
+            self._merge(evicted.astype(np.int64, copy=False), sign=-1)
+        
+        first_seq = self.sequence
+        self.sequence += n
+        oldest_valid = self.sequence - self.count
+        
+        for c in range(self.num_channels):
+            column = values[c]
+            self._push_extreme(self._min_q[c], column, first_seq, oldest_valid, np.minimum, operator.ge)
+            self._push_extreme(self._max_q[c], column, first_seq, oldest_valid, np.maximum, operator.le)
+    
+    def _merge(self, block: np.ndarray, sign: int) -> None:
+        """Combina (sign=1) ou remove (sign=-1) um bloco nas estatísticas (Chan/Welford)"""
+        nb = block.shape[1]
+        mean_b = block.mean(axis=1)
+        m2_b = ((block - mean_b[:, None]) ** 2).sum(axis=1)
+        self.sum += sign * block.sum(axis=1)
+        
+        if sign > 0:
+            n = self.count + nb
+            delta = mean_b - self.mean
+            self.mean = self.mean + delta * nb / n
+            self.m2 = self.m2 + m2_b + delta ** 2 * self.count * nb / n
+            self.count = n
+            return
+        
+        n_a = self.count - nb
+        if n_a <= 0:
+            self.count = 0
+            self.mean[:] = 0.0
+            self.m2[:] = 0.0
+            return
+        mean_a = (self.count * self.mean - nb * mean_b) / n_a
+        delta = mean_b - mean_a
+        self.m2 = np.maximum(self.m2 - m2_b - delta ** 2 * n_a * nb / self.count, 0.0)
+        self.mean = mean_a
+        self.count = n_a
+    
+    @staticmethod
+    def _push_extreme(queue: deque, column: np.ndarray, first_seq: int,
+                      oldest_valid: int, accumulate, dominated) -> None:
+        """Atualiza um deque monotônico com um lote já filtrado pelos candidatos.
+        
+        Só sobrevivem no deque os valores estritamente melhores que todos os
+        posteriores do mesmo lote; eles são obtidos de forma vetorizada pelo
+        acumulado reverso (mínimo ou máximo) do lote.
+        """
+        suffix = accumulate.accumulate(column[::-1])[::-1]
+        keep = np.ones(len(column), dtype=bool)
+        keep[:-1] = column[:-1] != suffix[1:]
+        keep[:-1] &= column[:-1] == suffix[:-1]
+        positions = np.flatnonzero(keep)
+        
+        for pos, value in zip(positions.tolist(), column[positions].tolist()):
+            while queue and dominated(queue[-1][1], value):
+                queue.pop()
+            queue.append((first_seq + pos, value))
+        
+        while queue and queue[0][0] < oldest_valid:
+            queue.popleft()
+    
+    def minimum(self, channel: int) -> Optional[int]:
+        queue = self._min_q[channel]
+        return queue[0][1] if self.count and queue else None
+    
+    def maximum(self, channel: int) -> Optional[int]:
+        queue = self._max_q[channel]
+        return queue[0][1] if self.count and queue else None
+    
+    def average(self, channel: int) -> Optional[float]:
+        return int(self.sum[channel]) / self.count if self.count else None
+    
+    def std(self, channel: int) -> Optional[float]:
+        return float(np.sqrt(self.m2[channel] / self.count)) if self.count else None
+    
+    def channel_summary(self, channel: int) -> Dict:
+        return {
+            'min': self.minimum(channel),
+            'max': self.maximum(channel),
+            'avg': self.average(channel),
+            'std': self.std(channel)
+        }
+
+class SessionTotals:
+    """Totais acumulados de uma sessão inteira (sem janela), por canal"""
+    
+    def __init__(self, num_channels: int):
+        self.num_channels = num_channels
+        self.reset()
+    
+    def reset(self) -> None:
+        self.count = 0
+        self.sum = np.zeros(self.num_channels, dtype=np.int64)
+        self.mean = np.zeros(self.num_channels, dtype=np.float64)
+        self.m2 = np.zeros(self.num_channels, dtype=np.float64)
+        self.min = np.full(self.num_channels, np.iinfo(np.int64).max, dtype=np.int64)
+        self.max = np.full(self.num_channels, np.iinfo(np.int64).min, dtype=np.int64)
+    
+    def update(self, values: np.ndarray) -> None:
+        """Acumula um lote de forma (canais, n)"""
+        nb = values.shape[1]
+        if nb == 0:
+            return
+        
+        values = values.astype(np.int64, copy=False)
+        mean_b = values.mean(axis=1)
+        m2_b = ((values - mean_b[:, None]) ** 2).sum(axis=1)
+        n = self.count + nb
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * nb / n
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.count * nb / n
+        self.count = n
+        self.sum += values.sum(axis=1)
+        np.minimum(self.min, values.min(axis=1), out=self.min)
+        np.maximum(self.max, values.max(axis=1), out=self.max)
+    
+    def channel_summary(self, channel: int) -> Dict:
+        if not self.count:
+            return {'min': None, 'max': None, 'avg': None, 'std': None}
+        return {
+            'min': int(self.min[channel]),
+            'max': int(self.max[channel]),
+            'avg': int(self.sum[channel]) / self.count,
+            'std': float(np.sqrt(self.m2[channel] / self.count))
+        }
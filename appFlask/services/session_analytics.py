@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from services.calibration import ModuleCalibration
+from services.impact_detector import ImpactDetector
+from services.interval_detector import IntervalDetector
+from services.storage import load_session, session_layout
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT NOT NULL,
+    params       TEXT NOT NULL,   -- JSON dos parâmetros da análise (e versão)
+    result       TEXT NOT NULL,   -- JSON do resultado
+    computed_at  REAL NOT NULL,
+    PRIMARY KEY (content_hash, params)
+) WITHOUT ROWID;
+"""
+
+# Sobe quando os kernels mudam, para invalidar os resultados em cache
+ANALYTICS_VERSION = 3
+
+SAMPLE_MS = 50  # delay(50) no loop do firmware
+
+DEFAULT_PARAMS = {'threshold_on': 400, 'threshold_off': 200, 'min_samples': 1}
+
+def content_hash(path: str, block_size: int = 1 << 20) -> str:
+    """BLAKE2b do conteúdo do arquivo (lido em blocos de 1 MB)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def analyze_records(records: np.ndarray, threshold_on: int = 400, threshold_off: int = 200,
+                    min_samples: int = 1) -> Dict:
+    """Métricas de uma sessão inteira: impactos e picos por sensor, médias por
+    zona de GH (sLed) e estatísticas de intervalo, com kernels vetorizados.
+    
+    Os valores em kg vêm das colunas calibradas gravadas (kgSensorN); sessões
+    anteriores a elas usam a escala linear padrão.
+    """
+    num_sensors, calibrated = session_layout(records.dtype.names)
+    n = len(records)
+    leds = np.asarray(records['sLed'], dtype=np.int64)
+    timestamps = np.asarray(records['timeStamp'], dtype=np.int64)
+    sensors = np.vstack([records[f'rSensor{i}'] for i in range(1, num_sensors + 1)]).astype(np.int64)
+    if calibrated:
+        sensors_kg = np.vstack([records[f'kgSensor{i}'] for i in range(1, num_sensors + 1)]).astype(np.float64)
+    else:
+        sensors_kg = ModuleCalibration.default(num_sensors).apply(sensors)
+    result = {
+        'samples': n,
+        'num_sensors': num_sensors,
+        'time_range': {'start': int(timestamps[0]) if n else None, 'end': int(timestamps[-1]) if n else None},
+        'duration_s': (int(timestamps[-1] - timestamps[0]) + 1) * SAMPLE_MS / 1000 if n else 0.0,
+    }
+    if n == 0:
+        result.update(sensors={}, zones={}, intervals={'zones': 0, 'led_changes': 0, 'time_by_interval_s': {}})
+        return result
+    
+    # Impactos: o mesmo detector do tempo real, sobre a sessão inteira
+    detector = ImpactDetector(num_sensors, threshold_on=threshold_on, threshold_off=threshold_off,
+                              min_samples=min_samples, sample_ms=SAMPLE_MS, max_events=1)
+    events = detector.process_session(records)
+    event_sensor = np.array([e.sensor for e in events], dtype=np.int64)
+    event_led = np.array([e.led for e in events], dtype=np.int64)
+    # Amostra do pico de cada evento (timestamps crescentes), para ler o kg calibrado gravado
+    event_index = np.searchsorted(timestamps, np.array([e.peak_ts for e in events], dtype=np.int64))
+    event_index = np.minimum(event_index, n - 1)
+    
+    result['sensors'] = {}
+    for s in range(num_sensors):
+        mask = event_sensor == s + 1
+        peaks_kg = sensors_kg[s, event_index[mask]]
+        column, column_kg = sensors[s], sensors_kg[s]
+        result['sensors'][f'sensor_{s + 1}'] = {
+            'max': int(column.max()),
+            'max_kg': round(float(column_kg.max()), 3),
+            'avg': float(column.mean()),
+            'avg_kg': round(float(column_kg.mean()), 3),
+            'impacts': int(mask.sum()),
+            'peak_mean_kg': round(float(peaks_kg.mean()), 3) if len(peaks_kg) else None,
+            'peak_max_kg': round(float(peaks_kg.max()), 3) if len(peaks_kg) else None,
+        }
+    
+    # Médias por zona de GH: somas por sLed com bincount (uma passada por sensor)
+    size = int(leds.max()) + 1
+    counts = np.bincount(leds, minlength=size)
+    sums = np.vstack([np.bincount(leds, weights=sensors[s], minlength=size) for s in range(num_sensors)])
+    sums_kg = np.vstack([np.bincount(leds, weights=sensors_kg[s], minlength=size) for s in range(num_sensors)])
+    impacts = np.bincount(event_led, minlength=size) if len(events) else np.zeros(size, dtype=np.int64)
+    result['zones'] = {}
+    for led in np.flatnonzero(counts).tolist():
+        averages = sums[:, led] / counts[led]
+        result['zones'][str(led)] = {
+            'samples': int(counts[led]),
+            'time_s': int(counts[led]) * SAMPLE_MS / 1000,
+            'sensor_avg': [round(float(v), 3) for v in averages],
+            'sensor_avg_kg': [round(float(v), 3) for v in sums_kg[:, led] / counts[led]],
+            'impacts': int(impacts[led]),
+        }
+    
+    # Intervalos: recalculados pelo detector em lote (independe do interval_ms gravado)
+    intervals, zones = IntervalDetector.recompute(leds, timestamps)
+    changes = np.flatnonzero(np.diff(leds)) + 1
+    gaps = np.diff(timestamps[changes]) * SAMPLE_MS
+    values, seconds = np.unique(intervals, return_counts=True)
+    result['intervals'] = {
+        'zones': len(zones),
+        'led_changes': len(changes),
+        'mean_ms': round(float(gaps.mean()), 3) if len(gaps) else None,
+        'min_ms': int(gaps.min()) if len(gaps) else None,
+        'max_ms': int(gaps.max()) if len(gaps) else None,
+        'time_by_interval_s': {str(v): c * SAMPLE_MS / 1000 for v, c in zip(values.tolist(), seconds.tolist())},
+    }
+    return result
+
+def analyze_file(path: str, params: Dict) -> Dict:
+    """Tarefa de um processo do pool: carrega a sessão (mmap) e a analisa"""
+    return analyze_records(load_session(path, mmap=True), **params)
+
+class SessionAnalytics:
+    """Análise em lote das sessões gravadas, em paralelo e com cache.
+    
+    Cada sessão é identificada pelo hash do conteúdo: o resultado fica em
+    ``analytics.db`` e só arquivos novos ou alterados são processados de
+    novo. O hash é refeito apenas quando tamanho/mtime mudam. As sessões
+    em falta são distribuídas em um ProcessPoolExecutor (cada processo
+    recebe só o caminho e os parâmetros).
+    """
+    
+    def __init__(self, folder: str = "data", filename: str = "analytics.db", workers: Optional[int] = None,
+                 **params):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self.workers = workers
+        self.params = {**DEFAULT_PARAMS, **params}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Abre o banco no primeiro uso (importar o módulo não cria arquivos)"""
+        if self._conn is None:
+            os.makedirs(self.folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def params_key(self) -> str:
+        return json.dumps({'version': ANALYTICS_VERSION, **self.params}, sort_keys=True)
+    
+    def file_hash(self, path: str) -> str:
+        """Hash do conteúdo, reaproveitado enquanto tamanho e mtime não mudam"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            row = self._connection().execute("SELECT size, mtime_ns, content_hash FROM file_hashes WHERE path = ?",
+                                             (key,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        digest = content_hash(path)
+        with self._lock:
+            self._connection().execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                                       (key, stat.st_size, stat.st_mtime_ns, digest))
+        return digest
+    
+    def cached(self, digest: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute("SELECT result FROM results WHERE content_hash = ? AND params = ?",
+                                             (digest, self.params_key())).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def store(self, digest: str, result: Dict) -> None:
+        with self._lock:
+            self._connection().execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                       (digest, self.params_key(), json.dumps(result), time.time()))
+    
+    def analyze(self, sessions: Sequence[Tuple[str, str]], workers: Optional[int] = None,
+                force: bool = False) -> Dict:
+        """Analisa as sessões (id, arquivo) e retorna resultados, erros e contagens.
+        
+        Com ``workers`` = 1 (ou uma única sessão a processar) tudo roda no
+        processo atual, sem o custo de subir o pool.
+        """
+        start = time.perf_counter()
+        results: Dict[str, Dict] = {}
+        errors: Dict[str, str] = {}
+        pending: List[Tuple[str, str, str]] = []
+        for session_id, path in sessions:
+            try:
+                digest = self.file_hash(path)
+            except OSError as e:
+                errors[session_id] = str(e)
+                continue
+            result = None if force else self.cached(digest)
+            if result is None:
+                pending.append((session_id, path, digest))
+            else:
+                results[session_id] = {'content_hash': digest, 'cached': True, **result}
+        
+        cached = len(results)
+        workers = workers or self.workers or os.cpu_count() or 1
+        for session_id, digest, outcome in self._run(pending, workers):
+            if isinstance(outcome, Exception):
+                errors[session_id] = f"{type(outcome).__name__}: {outcome}"
+                continue
+            self.store(digest, outcome)
+            results[session_id] = {'content_hash': digest, 'cached': False, **outcome}
+        
+        return {
+            'sessions': dict(sorted(results.items())),
+            'errors': errors,
+            'computed': len(results) - cached,
+            'cached': cached,
+            'workers': min(workers, len(pending)) if pending else 0,
+            'elapsed_s': round(time.perf_counter() - start, 3),
+            'summary': self.summarize(results.values()),
+        }
+    
+    def _run(self, pending: List[Tuple[str, str, str]], workers: int):
+        """Executa as análises pendentes; gera (id, hash, resultado ou exceção)"""
+        if workers <= 1 or len(pending) <= 1:
+            for session_id, path, digest in pending:
+                try:
+                    yield session_id, digest, analyze_file(path, self.params)
+                except Exception as e:
+                    yield session_id, digest, e
+            return
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            futures = {executor.submit(analyze_file, path, self.params): (session_id, digest)
+                       for session_id, path, digest in pending}
+            for future in as_completed(futures):
+                session_id, digest = futures[future]
+                try:
+                    yield session_id, digest, future.result()
+                except Exception as e:
+                    yield session_id, digest, e
+    
+    @staticmethod
+    def summarize(results) -> Dict:
+        """Totais do lote: amostras, duração, impactos e maior pico (kg)"""
+        results = list(results)
+        peaks = [s['peak_max_kg'] for r in results for s in r['sensors'].values() if s['peak_max_kg'] is not None]
+        return {
+            'sessions': len(results),
+            'samples': sum(r['samples'] for r in results),
+            'duration_s': round(sum(r['duration_s'] for r in results), 3),
+            'impacts': sum(s['impacts'] for r in results for s in r['sensors'].values()),
+            'peak_max_kg': max(peaks) if peaks else None,
+        }
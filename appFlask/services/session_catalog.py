@@ -0,0 +1,295 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from services.session_reader import SESSION_EXTENSIONS
+from services.storage import load_session, session_layout
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    device      TEXT,
+    status      TEXT NOT NULL,      -- recording | complete | interrupted | imported
+    started_at  REAL,
+    ended_at    REAL,
+    samples     INTEGER NOT NULL DEFAULT 0,
+    size_bytes  INTEGER NOT NULL DEFAULT 0,
+    first_ts    INTEGER,
+    last_ts     INTEGER,
+    num_sensors INTEGER,
+    files       TEXT NOT NULL       -- JSON {backend: arquivo na pasta de dados}
+);
+CREATE INDEX IF NOT EXISTS sessions_started ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS sessions_device ON sessions (device, started_at);
+CREATE TABLE IF NOT EXISTS sensor_stats (
+    session_id TEXT NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    sensor     INTEGER NOT NULL,
+    min        INTEGER,
+    max        INTEGER,
+    avg        REAL,
+    std        REAL,
+    PRIMARY KEY (session_id, sensor)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS sensor_stats_max ON sensor_stats (sensor, max);
+"""
+
+# Backend de cada extensão de arquivo de sessão
+EXTENSION_BACKENDS = {'.csv': 'csv', '.npy': 'npy', '.arrow': 'arrow'}
+
+# Colunas aceitas na ordenação da busca
+ORDER_COLUMNS = ('started_at', 'samples', 'size_bytes', 'id')
+
+def sensor_summary(values: np.ndarray) -> Dict:
+    """min/max/média/desvio de uma coluna (mesmo formato do SessionTotals)"""
+    if not len(values):
+        return {'min': None, 'max': None, 'avg': None, 'std': None}
+    values = np.asarray(values, dtype=np.int64)
+    return {
+        'min': int(values.min()),
+        'max': int(values.max()),
+        'avg': float(values.mean()),
+        'std': float(values.std()),
+    }
+
+class SessionCatalog:
+    """Índice SQLite das sessões gravadas na pasta de dados.
+    
+    Cada gravação entra no índice ao começar (status 'recording') e é
+    completada ao terminar com contagem, tamanho, intervalo de timeStamp e
+    resumo por sensor, que já vêm dos totais incrementais do DataManager.
+    Listagem e busca respondem só com o índice, sem abrir os arquivos.
+    Arquivos sem entrada (gravações antigas) entram pelo ``sync``.
+    """
+    
+    def __init__(self, folder: str = "data", filename: str = "sessions.db"):
+        self.folder = folder
+        self.path = os.path.join(folder, filename)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Abre o banco na primeira consulta (importar o módulo não cria arquivos)"""
+        if self._conn is None:
+            os.makedirs(self.folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def _write(self, statements: Sequence) -> None:
+        """Executa (sql, parâmetros) em uma transação; parâmetros em lista usam executemany"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN")
+            try:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        conn.executemany(sql, params)
+                    else:
+                        conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    def _query(self, sql: str, params: Sequence = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+    
+    def start_session(self, session_id: str, device: Optional[str], files: Dict[str, str],
+                      num_sensors: int, started_at: Optional[float] = None) -> None:
+        """Registra uma gravação que começou"""
+        self._write([("INSERT OR REPLACE INTO sessions (id, device, status, started_at, num_sensors, files) "
+                      "VALUES (?, ?, 'recording', ?, ?, ?)",
+                      (session_id, device, started_at or time.time(), num_sensors, self._files_json(files)))])
+    
+    def finish_session(self, session_id: str, files: Dict[str, str], samples: int,
+                       first_ts: Optional[int], last_ts: Optional[int], sensors: List[Dict],
+                       ended_at: Optional[float] = None, status: str = 'complete') -> None:
+        """Completa a entrada da gravação com contagem, tamanho e resumo por sensor"""
+        self._write([
+            ("UPDATE sessions SET status = ?, ended_at = ?, samples = ?, size_bytes = ?, first_ts = ?, "
+             "last_ts = ?, files = ? WHERE id = ?",
+             (status, ended_at or time.time(), samples, self._size(files), first_ts, last_ts,
+              self._files_json(files), session_id)),
+            ("DELETE FROM sensor_stats WHERE session_id = ?", (session_id,)),
+            ("INSERT INTO sensor_stats (session_id, sensor, min, max, avg, std) VALUES (?, ?, ?, ?, ?, ?)",
+             [(session_id, i, s['min'], s['max'], s['avg'], s['std']) for i, s in enumerate(sensors, 1)]),
+        ])
+    
+    def _files_json(self, files: Dict[str, str]) -> str:
+        return json.dumps({backend: os.path.basename(path) for backend, path in files.items()})
+    
+    def _size(self, files: Dict[str, str]) -> int:
+        total = 0
+        for path in files.values():
+            try:
+                total += os.path.getsize(os.path.join(self.folder, os.path.basename(path)))
+            except OSError:
+                pass
+        return total
+    
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Entrada de uma sessão, ou None"""
+        rows = self._query("SELECT * FROM sessions WHERE id = ?", (session_id,))
+        if not rows:
+            return None
+        return self._to_dicts(rows)[0]
+    
+    def search(self, device: Optional[str] = None, text: Optional[str] = None,
+               started_after: Optional[float] = None, started_before: Optional[float] = None,
+               min_samples: Optional[int] = None, status: Optional[str] = None,
+               sensor: Optional[int] = None, min_peak: Optional[int] = None, max_peak: Optional[int] = None,
+               order: str = 'started_at', descending: bool = True, limit: int = 100, offset: int = 0) -> Dict:
+        """Busca no índice; retorna o total de resultados e uma página.
+        
+        ``min_peak``/``max_peak`` filtram pelo máximo do sensor ``sensor``
+        (ou de qualquer sensor, sem ``sensor``), pelo índice de sensor_stats.
+        """
+        if order not in ORDER_COLUMNS:
+            raise ValueError(f"Ordenação inválida: {order}")
+        where, params = [], []
+        if device:
+            where.append("device = ?")
+            params.append(device)
+        if text:
+            where.append("(id LIKE ? ESCAPE '\\' OR device LIKE ? ESCAPE '\\')")
+            pattern = "%" + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + "%"
+            params += [pattern, pattern]
+        if started_after is not None:
+            where.append("started_at >= ?")
+            params.append(started_after)
+        if started_before is not None:
+            where.append("started_at <= ?")
+            params.append(started_before)
+        if min_samples is not None:
+            where.append("samples >= ?")
+            params.append(min_samples)
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if min_peak is not None or max_peak is not None:
+            condition = ["session_id = sessions.id"]
+            if sensor is not None:
+                condition.append("sensor = ?")
+                params.append(sensor)
+            if min_peak is not None:
+                condition.append("max >= ?")
+                params.append(min_peak)
+            if max_peak is not None:
+                condition.append("max <= ?")
+                params.append(max_peak)
+            where.append(f"EXISTS (SELECT 1 FROM sensor_stats WHERE {' AND '.join(condition)})")
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute(f"SELECT COUNT(*) FROM sessions{clause}", params).fetchone()[0]
+            rows = conn.execute(f"SELECT * FROM sessions{clause} ORDER BY {order} {'DESC' if descending else 'ASC'}, id "
+                                f"LIMIT ? OFFSET ?", params + [limit, offset]).fetchall()
+        return {'total': total, 'sessions': self._to_dicts(rows)}
+    
+    def _to_dicts(self, rows: List[sqlite3.Row]) -> List[Dict]:
+        """Linhas do índice no formato da API, com o resumo por sensor (uma consulta por página)"""
+        if not rows:
+            return []
+        ids = [row['id'] for row in rows]
+        stats: Dict[str, Dict] = {}
+        for stat in self._query(f"SELECT * FROM sensor_stats WHERE session_id IN ({','.join('?' * len(ids))}) "
+                                "ORDER BY session_id, sensor", ids):
+            stats.setdefault(stat['session_id'], {})[f"sensor_{stat['sensor']}"] = {
+                'min': stat['min'], 'max': stat['max'], 'avg': stat['avg'], 'std': stat['std']}
+        sessions = []
+        for row in rows:
+            started, ended = row['started_at'], row['ended_at']
+            sessions.append({
+                'id': row['id'],
+                'device': row['device'],
+                'status': row['status'],
+                'started_at': started,
+                'ended_at': ended,
+                'duration_s': round(ended - started, 3) if started and ended else None,
+                'total_points': row['samples'],
+                'size_bytes': row['size_bytes'],
+                'time_range': {'start': row['first_ts'], 'end': row['last_ts']},
+                'num_sensors': row['num_sensors'],
+                'files': json.loads(row['files']),
+                'sensor_ranges': stats.get(row['id'], {}),
+            })
+        return sessions
+    
+    def sync(self, recording: Sequence[str] = ()) -> Dict[str, int]:
+        """Põe o índice em dia com a pasta de dados.
+        
+        Importa arquivos sem entrada (abrindo cada um uma única vez),
+        recalcula entradas que ficaram em 'recording' (gravação interrompida)
+        e remove entradas cujos arquivos sumiram. ``recording`` são os
+        arquivos em gravação agora, que não são tocados.
+        """
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            names = []
+        on_disk: Dict[str, Dict[str, str]] = {}
+        for name in names:
+            session_id, extension = os.path.splitext(name)
+            if extension in EXTENSION_BACKENDS:
+                on_disk.setdefault(session_id, {})[EXTENSION_BACKENDS[extension]] = name
+        busy = {os.path.splitext(os.path.basename(path))[0] for path in recording}
+        
+        known = {row['id']: row['status'] for row in self._query("SELECT id, status FROM sessions")}
+        removed = [session_id for session_id in known if session_id not in on_disk and session_id not in busy]
+        if removed:
+            self._write([("DELETE FROM sessions WHERE id = ?", [(session_id,) for session_id in removed])])
+        
+        imported = 0
+        for session_id, files in on_disk.items():
+            if session_id in busy or known.get(session_id, 'recording') != 'recording':
+                continue
+            try:
+                # Entrada parada em 'recording': a gravação foi interrompida (queda do app)
+                self.import_session(session_id, files, status='interrupted' if session_id in known else 'imported')
+                imported += 1
+            except Exception as e:
+                print(f"Erro ao indexar a sessão {session_id}: {e}")
+        return {'imported': imported, 'removed': len(removed), 'total': len(on_disk)}
+    
+    def refresh(self, session_id: str) -> None:
+        """Reindexa uma sessão cujos arquivos foram reescritos (mantém status e datas)"""
+        files = {backend: session_id + extension for extension, backend in EXTENSION_BACKENDS.items()
+                 if os.path.exists(os.path.join(self.folder, session_id + extension))}
+        if files:
+            existing = self.get(session_id)
+            self.import_session(session_id, files, status=(existing or {}).get('status') or 'imported')
+    
+    def import_session(self, session_id: str, files: Dict[str, str], status: str = 'imported') -> None:
+        """Indexa uma sessão existente lendo o arquivo preferido (npy, arrow ou csv)"""
+        by_extension = {os.path.splitext(name)[1]: name for name in files.values()}
+        path = next(os.path.join(self.folder, by_extension[ext]) for ext in SESSION_EXTENSIONS if ext in by_extension)
+        records = load_session(path, mmap=True)
+        num_sensors, _ = session_layout(records.dtype.names)
+        timestamps = records['timeStamp']
+        modified = os.path.getmtime(path)
+        existing = self.get(session_id)
+        self._write([("INSERT OR IGNORE INTO sessions (id, status, started_at, num_sensors, files) "
+                      "VALUES (?, 'recording', ?, ?, ?)",
+                      (session_id, modified, num_sensors, self._files_json(files)))])
+        self.finish_session(
+            session_id, files, len(records),
+            int(timestamps[0]) if len(records) else None,
+            int(timestamps[-1]) if len(records) else None,
+            [sensor_summary(records[f'rSensor{i}']) for i in range(1, num_sensors + 1)],
+            ended_at=(existing or {}).get('ended_at') or modified, status=status)
@@ -0,0 +1,135 @@
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from services.calibration import ModuleCalibration
+from services.storage import load_session, session_layout
+
+# Ordem de preferência dos formatos ao abrir uma sessão
+SESSION_EXTENSIONS = ('.npy', '.arrow', '.csv')
+
+class SessionReader:
+    """Leitor de uma sessão gravada, aberta por memória mapeada (.npy).
+    
+    Consultas por intervalo de timestamp usam busca binária na coluna
+    timeStamp (crescente), tocando apenas as páginas necessárias do arquivo.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.records = load_session(path, mmap=True)
+        self.timestamps = self.records['timeStamp']
+        self.num_sensors, self.calibrated = session_layout(self.records.dtype.names)
+    
+    def __len__(self) -> int:
+        return len(self.records)
+    
+    def time_range(self) -> Tuple[Optional[int], Optional[int]]:
+        """Primeiro e último timestamp da sessão"""
+        if not len(self.records):
+            return None, None
+        return int(self.timestamps[0]), int(self.timestamps[-1])
+    
+    def index_range(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """Índices [i0, i1) dos registros com start <= timeStamp <= end"""
+        i0 = 0 if start is None else int(np.searchsorted(self.timestamps, start, side='left'))
+        i1 = len(self.records) if end is None else int(np.searchsorted(self.timestamps, end, side='right'))
+        return i0, max(i0, i1)
+    
+    def range(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Fatia (view do mapa de memória) com os registros no intervalo"""
+        i0, i1 = self.index_range(start, end)
+        return self.records[i0:i1]
+    
+    def columns(self, records: np.ndarray) -> Dict[str, np.ndarray]:
+        """Separa uma fatia em colunas no formato do gráfico.
+        
+        Sessões anteriores à calibração no servidor (sem kgSensorN) recebem
+        a escala linear padrão.
+        """
+        sensors = np.vstack([records[f'rSensor{i}'] for i in range(1, self.num_sensors + 1)])
+        if self.calibrated:
+            sensors_kg = np.vstack([records[f'kgSensor{i}'] for i in range(1, self.num_sensors + 1)])
+        else:
+            sensors_kg = ModuleCalibration.default(self.num_sensors).apply(sensors)
+        return {
+            'timestamp': records['timeStamp'],
+            'led': records['sLed'],
+            'sensors': sensors,
+            'sensors_kg': sensors_kg,
+            'interval_ms': records['interval_ms'],
+        }
+    
+    def info(self) -> Dict:
+        """Metadados básicos da sessão"""
+        start, end = self.time_range()
+        return {
+            'file': os.path.basename(self.path),
+            'total_points': len(self.records),
+            'num_sensors': self.num_sensors,
+            'calibrated': self.calibrated,
+            'time_range': {'start': start, 'end': end},
+            'size_bytes': os.path.getsize(self.path),
+        }
+
+class SessionLibrary:
+    """Localiza sessões gravadas na pasta de dados e mantém leitores abertos (LRU)"""
+    
+    def __init__(self, folder: str = "data", max_open: int = 16):
+        self.folder = folder
+        self.max_open = max_open
+        self._readers: "OrderedDict[str, Tuple[Tuple[int, int], SessionReader]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def list_sessions(self) -> List[str]:
+        """IDs das sessões disponíveis (nome do arquivo sem extensão)"""
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return sorted({
+            os.path.splitext(name)[0] for name in names
+            if os.path.splitext(name)[1] in SESSION_EXTENSIONS
+        })
+    
+    def find(self, session_id: str) -> Optional[str]:
+        """Arquivo preferido da sessão, ou None se não existir"""
+        if not session_id or os.path.basename(session_id) != session_id or session_id.startswith('.'):
+            return None
+        for extension in SESSION_EXTENSIONS:
+            path = os.path.join(self.folder, session_id + extension)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def files(self, session_id: str) -> List[str]:
+        """Todos os arquivos da sessão (um por backend), na ordem de preferência"""
+        preferred = self.find(session_id)
+        if preferred is None:
+            return []
+        base = os.path.splitext(preferred)[0]
+        return [base + extension for extension in SESSION_EXTENSIONS if os.path.exists(base + extension)]
+    
+    def open(self, session_id: str) -> Optional[SessionReader]:
+        """Abre (ou reaproveita) o leitor de uma sessão"""
+        path = self.find(session_id)
+        if path is None:
+            return None
+        
+        stat = os.stat(path)
+        # Uma sessão em gravação cresce: reabre quando tamanho/mtime mudam
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._readers.get(path)
+            if cached and cached[0] == version:
+                self._readers.move_to_end(path)
+                return cached[1]
+        
+        reader = SessionReader(path)
+        with self._lock:
+            self._readers[path] = (version, reader)
+            self._readers.move_to_end(path)
+            while len(self._readers) > self.max_open:
+                self._readers.popitem(last=False)
+        return reader
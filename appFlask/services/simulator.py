@@ -0,0 +1,273 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+import numpy as np
+from services.ble_manager import BLEManager
+from services.device_scanner import DeviceInfo
+from services.storage import load_session, session_layout
+from services.wire_format import encode_frames
+
+# Fontes de dados disponíveis (config BLE_SOURCE)
+BLE_SOURCES = ('ble', 'replay', 'simulator')
+
+TICK_MS = 50       # delay(50) no loop do firmware
+MTU_BYTES = 180    # tamanho de cada notify() do firmware
+
+def wire_dtype(num_sensors: int = 4) -> np.dtype:
+    """Layout do registro no ar ("<B4iI", empacotado)"""
+    return np.dtype([('sLed', '<u1')] + [(f'rSensor{i}', '<i4') for i in range(1, num_sensors + 1)]
+                    + [('timeStamp', '<u4')])
+
+class FirmwareModel:
+    """Modelo do sketchBuildado.ino para gerar um stream sintético.
+    
+    A cada tick de 50 ms o timestamp avança; o GH (sLed) é sorteado em 0-3
+    a cada ``interval_ms`` (potenciômetro, 250-4000 ms). Os sensores são
+    ruído em torno de uma linha de base, com impactos ocasionais (subida
+    rápida e decaimento exponencial) para exercitar os detectores.
+    """
+    
+    def __init__(self, num_sensors: int = 4, intervals_ms: Sequence[int] = (1000, 500, 2000),
+                 zone_duration_s: float = 30.0, baseline: int = 300, noise: float = 20.0,
+                 impact_rate: float = 0.2, impact_peak: Sequence[int] = (800, 3500), seed: Optional[int] = None):
+        self.num_sensors = num_sensors
+        self.intervals_ms = [min(4000, max(250, int(i))) for i in intervals_ms]
+        self.zone_ticks = max(1, int(zone_duration_s * 1000 / TICK_MS))
+        self.baseline = baseline
+        self.noise = noise
+        self.impact_rate = impact_rate  # impactos por segundo, por sensor
+        self.impact_peak = impact_peak
+        self.rng = np.random.default_rng(seed)
+        self.dtype = wire_dtype(num_sensors)
+        
+        self.timestamp = 0
+        self.led = 1  # intLed = 1 no setup()
+        self.last_switch = 0
+        self.decay = np.zeros(num_sensors)
+    
+    def interval_at(self, tick: int) -> int:
+        """Intervalo de troca do GH vigente no tick (troca de zona a cada zone_duration_s)"""
+        return self.intervals_ms[(tick // self.zone_ticks) % len(self.intervals_ms)]
+    
+    def generate(self, n: int) -> np.ndarray:
+        """Gera os próximos n ticks como registros no formato do firmware"""
+        out = np.empty(n, dtype=self.dtype)
+        ticks = self.timestamp + np.arange(n)
+        out['timeStamp'] = ticks
+        
+        # GH: sorteado a cada intervalo (laço só sobre as trocas)
+        leds = np.empty(n, dtype=np.uint8)
+        pos = 0
+        while pos < n:
+            tick = self.timestamp + pos
+            hold = max(1, self.interval_at(tick) // TICK_MS)
+            switch_at = self.last_switch + hold
+            end = min(n, pos + max(0, switch_at - tick))
+            leds[pos:end] = self.led
+            pos = end
+            if pos < n and self.timestamp + pos >= switch_at:
+                self.led = int(self.rng.integers(0, 4))
+                self.last_switch = self.timestamp + pos
+        out['sLed'] = leds
+        
+        # Sensores: ruído + impactos com decaimento exponencial entre lotes
+        values = self.baseline + self.rng.normal(0, self.noise, (self.num_sensors, n))
+        p = self.impact_rate * TICK_MS / 1000
+        hits = self.rng.random((self.num_sensors, n)) < p
+        peaks = np.where(hits, self.rng.uniform(*self.impact_peak, (self.num_sensors, n)), 0.0)
+        envelope = self._envelope(peaks)
+        values = np.clip(values + envelope, 0, 4095).astype(np.int32)
+        for s in range(self.num_sensors):
+            out[f'rSensor{s + 1}'] = values[s]
+        
+        self.timestamp += n
+        return out
+    
+    def _envelope(self, peaks: np.ndarray, decay: float = 0.5) -> np.ndarray:
+        """y[i] = max(x[i], decay * y[i-1]) sem laço por amostra.
+        
+        No domínio log vira um máximo acumulado: log y[i] = i·log d +
+        max(log s + log d, max_{j<=i}(log x[j] - j·log d)), com s o estado
+        que vem do lote anterior.
+        """
+        n = peaks.shape[1]
+        log_d = np.log(decay)
+        j = np.arange(n)
+        with np.errstate(divide='ignore'):
+            terms = np.log(peaks) - j * log_d
+            initial = np.log(self.decay) + log_d
+        running = np.maximum(np.maximum.accumulate(terms, axis=1), initial[:, None])
+        envelope = np.exp(j * log_d + running)
+        self.decay = envelope[:, -1].copy()
+        return envelope
+
+class ReplaySource:
+    """Registros de uma sessão gravada (.csv, .npy ou .arrow), em laço opcional.
+    
+    No laço, os timestamps continuam crescendo, como um firmware que nunca
+    reinicia.
+    """
+    
+    def __init__(self, path: str, loop: bool = True):
+        records = load_session(path, mmap=True)
+        if not len(records):
+            raise ValueError(f"Sessão vazia: {path}")
+        num_sensors, _ = session_layout(records.dtype.names)
+        self.dtype = wire_dtype(num_sensors)
+        self.records = records
+        self.loop = loop
+        self.position = 0
+        self.offset = 0
+        self.span = int(records['timeStamp'][-1]) - int(records['timeStamp'][0]) + 1
+    
+    def generate(self, n: int) -> np.ndarray:
+        """Próximos n registros (menos se a sessão acabar sem laço)"""
+        parts: List[np.ndarray] = []
+        while n > 0:
+            if self.position >= len(self.records):
+                if not self.loop:
+                    break
+                self.position = 0
+                self.offset += self.span
+            part = self.records[self.position:self.position + n]
+            out = np.empty(len(part), dtype=self.dtype)
+            for name in self.dtype.names:
+                out[name] = part[name]
+            out['timeStamp'] += self.offset
+            parts.append(out)
+            self.position += len(part)
+            n -= len(part)
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self.dtype)
+
+@dataclass
+class SimulatedClient:
+    """Marcador de conexão ativa (no lugar do BleakClient)"""
+    address: str
+
+class SimulatedBLEManager(BLEManager):
+    """BLEManager alimentado por uma sessão gravada ou pelo modelo do firmware.
+    
+    Mesma interface do BLEManager (scan, conexão, status, callbacks); os dados
+    passam pelo mesmo _notification_handler em notificações de 180 bytes, no
+    ritmo do firmware multiplicado por ``speed`` (1x a 1000x; 0 = sem limite).
+    Com ``drop_rate`` > 0, uma fração das notificações é perdida, como num
+    link BLE ruim. ``wire_version`` escolhe o formato enviado: 1 (registros
+    PL crus) ou 2 (frames compactos, um por notificação).
+    """
+    
+    SIMULATED_ADDRESS = "SIM:00:00:00:00:01"
+    
+    def __init__(self, source: str = 'simulator', replay_path: Optional[str] = None, speed: float = 1.0,
+                 replay_loop: bool = True, seed: Optional[int] = None, wire_version: int = 1, **kwargs):
+        if source not in ('replay', 'simulator'):
+            raise ValueError(f"Fonte simulada desconhecida: {source}")
+        if wire_version not in (1, 2):
+            raise ValueError(f"Formato de stream desconhecido: {wire_version}")
+        if source == 'replay' and not replay_path:
+            raise ValueError("BLE_REPLAY_FILE não definido para a fonte 'replay'")
+        super().__init__(**kwargs)
+        self.source = source
+        self.replay_path = replay_path
+        self.replay_loop = replay_loop
+        self.speed = speed
+        self.seed = seed
+        self.sim_wire_version = wire_version
+        self.poll_interval = 0.01
+        self.max_block = 65_536
+        self.sent_records = 0
+        self.sent_notifications = 0
+        # Fração de notificações perdidas de propósito (testa a ressincronização)
+        self.drop_rate = 0.0
+        self.dropped_notifications = 0
+        self._rng = np.random.default_rng(seed)
+    
+    def _open_source(self):
+        if self.source == 'replay':
+            return ReplaySource(self.replay_path, loop=self.replay_loop)
+        return FirmwareModel(self.validator.num_sensors, seed=self.seed)
+    
+    async def scan_devices(self) -> List[DeviceInfo]:
+        """Retorna o dispositivo simulado"""
+        return self.get_available_devices()
+    
+    def get_available_devices(self) -> List[DeviceInfo]:
+        """Retorna o dispositivo simulado"""
+        return [DeviceInfo(name=self.DEVICE_NAME, address=self.SIMULATED_ADDRESS, rssi=-40, last_seen=time.time())]
+    
+    async def connect_to_esp32(self) -> None:
+        """Conecta ao dispositivo simulado (sem varredura)"""
+        await self.connect_to_device(self.SIMULATED_ADDRESS)
+    
+    async def connect_to_device(self, device_address: str) -> None:
+        """Conecta a um dispositivo simulado e gera notificações até a desconexão"""
+        disconnected = self._disconnect_event = asyncio.Event()
+        if self.should_disconnect:
+            disconnected.set()
+        try:
+            self.status = f"Conectando ao dispositivo {device_address}..."
+            source = self._open_source()
+            self.client = SimulatedClient(device_address)
+            self.status = "Conectado!"
+            self.reset_stream()
+            self._connected(device_address)
+            await self._stream(source, disconnected)
+        except Exception as e:
+            self.status = f"Erro na conexão: {e}"
+            print(f"Erro na simulação: {e}")
+        finally:
+            self.flush_stream()
+            self.client = None
+            self._disconnect_event = None
+            self.should_disconnect = False
+            self.status = "Desconectado"
+    
+    async def _stream(self, source, disconnected: asyncio.Event) -> None:
+        """Envia os registros no ritmo do firmware (em ticks de 50 ms / speed)"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        sent_ticks = 0
+        pending = bytearray()
+        while not disconnected.is_set():
+            if self.speed > 0:
+                due = int((loop.time() - start) * self.speed * 1000 / TICK_MS) - sent_ticks
+            else:
+                due = self.max_block
+            if due > 0:
+                block = source.generate(min(due, self.max_block))
+                if not len(block):
+                    break  # fim da sessão (sem laço)
+                sent_ticks += len(block)
+                self.sent_records += len(block)
+                if self.sim_wire_version == 2:
+                    notifications = encode_frames(block, MTU_BYTES)
+                else:
+                    # Rajadas de notify() de até 180 bytes, como o firmware
+                    pending += block.tobytes()
+                    complete = len(pending) - len(pending) % MTU_BYTES
+                    notifications = [pending[i:i + MTU_BYTES] for i in range(0, complete, MTU_BYTES)]
+                    del pending[:complete]
+                for data in notifications:
+                    if self.drop_rate and self._rng.random() < self.drop_rate:
+                        self.dropped_notifications += 1
+                        continue
+                    self._notification_handler(None, data)
+                    self.sent_notifications += 1
+            if self.speed > 0:
+                try:
+                    await asyncio.wait_for(disconnected.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(0)
+        if pending:
+            self._notification_handler(None, pending)
+
+def create_ble_manager(source: str = 'ble', replay_path: Optional[str] = None, speed: float = 1.0,
+                       seed: Optional[int] = None, **kwargs) -> BLEManager:
+    """Cria o BLEManager da fonte configurada (BLE real, replay ou simulador)"""
+    if source not in BLE_SOURCES:
+        raise ValueError(f"Fonte BLE desconhecida: {source}")
+    if source == 'ble':
+        return BLEManager(**kwargs)
+    return SimulatedBLEManager(source, replay_path=replay_path, speed=speed, seed=seed, **kwargs)
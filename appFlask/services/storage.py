@@ -0,0 +1,266 @@
+import os
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence
+from services.csv_writer import BackgroundWriter, BufferedCSVWriter
+from services.interval_detector import IntervalDetector
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow é opcional
+    pa = None
+
+# Alinhamento do cabeçalho .npy (tamanho fixo, para reescrever a contagem ao fechar)
+NPY_HEADER_ALIGN = 64
+
+def session_dtype(num_sensors: int = 4, calibrated: bool = False) -> np.dtype:
+    """dtype estruturado e empacotado de um registro de sessão (<B{n}iI + interval_ms).
+    
+    Com ``calibrated``, as colunas kgSensor1..N (float32, já calibradas)
+    vêm depois de interval_ms, preservando as posições das colunas brutas.
+    """
+    fields = [('sLed', '<u1')]
+    fields += [(f'rSensor{i}', '<i4') for i in range(1, num_sensors + 1)]
+    fields += [('timeStamp', '<u4'), ('interval_ms', '<i4')]
+    if calibrated:
+        fields += [(f'kgSensor{i}', '<f4') for i in range(1, num_sensors + 1)]
+    return np.dtype(fields)
+
+def session_layout(names: Sequence[str]):
+    """(número de sensores, tem colunas calibradas) a partir dos nomes das colunas"""
+    num_sensors = sum(1 for name in names if name.startswith('rSensor'))
+    return num_sensors, any(name.startswith('kgSensor') for name in names)
+
+def csv_header(num_sensors: int = 4, calibrated: bool = False) -> List[str]:
+    """Cabeçalho CSV de uma sessão"""
+    return list(session_dtype(num_sensors, calibrated).names)
+
+def records_to_structured(records, num_sensors: int = 4, calibrated: bool = False) -> np.ndarray:
+    """Converte registros (sLed, rSensor1..N, timeStamp, interval_ms[, kgSensor1..N]) em array estruturado"""
+    width = num_sensors * 2 + 3 if calibrated else num_sensors + 3
+    block = np.asarray(records, dtype=np.float64 if calibrated else np.int64).reshape(-1, width)
+    out = np.empty(len(block), dtype=session_dtype(num_sensors, calibrated))
+    for i, name in enumerate(out.dtype.names):
+        out[name] = block[:, i]
+    return out
+
+def _npy_header_dict(dtype: np.dtype, count: int) -> str:
+    return repr({
+        'descr': np.lib.format.dtype_to_descr(dtype),
+        'fortran_order': False,
+        'shape': (count,),
+    })
+
+def _npy_header(dtype: np.dtype, count: int) -> bytes:
+    """Cabeçalho .npy v1.0 cujo tamanho depende só do dtype (não da contagem)"""
+    prefix = b'\x93NUMPY\x01\x00'
+    # Reserva espaço para a maior contagem possível (20 dígitos)
+    longest = len(prefix) + 2 + len(_npy_header_dict(dtype, 10 ** 19)) + 1
+    size = -(-longest // NPY_HEADER_ALIGN) * NPY_HEADER_ALIGN
+    
+    header = _npy_header_dict(dtype, count)
+    body = (header + ' ' * (size - len(prefix) - 2 - len(header) - 1) + '\n').encode('latin1')
+    return prefix + len(body).to_bytes(2, 'little') + body
+
+class NpyRecordWriter(BackgroundWriter):
+    """Grava os registros brutos em um .npy estruturado, em modo append.
+    
+    O arquivo é um .npy válido (carregável com np.load/mmap) cujo cabeçalho
+    é reescrito com a contagem final ao fechar; se o processo cair antes
+    disso, a contagem é recuperada a partir do tamanho do arquivo.
+    """
+    
+    backend = 'npy'
+    
+    def __init__(self, filename: str, num_sensors: int = 4, calibrated: bool = False, **kwargs):
+        self.num_sensors = num_sensors
+        self.calibrated = calibrated
+        self.dtype = session_dtype(num_sensors, calibrated)
+        super().__init__(filename, **kwargs)
+    
+    def _open(self, filename: str):
+        f = open(filename, mode="wb")
+        f.write(_npy_header(self.dtype, 0))
+        return f
+    
+    def _write_batches(self, batches: List[List[Sequence]]) -> int:
+        rows = [row for batch in batches for row in batch]
+        self._file.write(records_to_structured(rows, self.num_sensors, self.calibrated).tobytes())
+        return len(rows)
+    
+    def _finalize(self) -> None:
+        self._file.seek(0)
+        self._file.write(_npy_header(self.dtype, self.rows_written))
+        self._file.seek(0, os.SEEK_END)
+
+class ArrowRecordWriter(BackgroundWriter):
+    """Grava os registros em um arquivo Arrow IPC (um RecordBatch por lote gravado)"""
+    
+    backend = 'arrow'
+    
+    def __init__(self, filename: str, num_sensors: int = 4, calibrated: bool = False, **kwargs):
+        if pa is None:
+            raise RuntimeError("pyarrow não está instalado")
+        self.num_sensors = num_sensors
+        self.calibrated = calibrated
+        self.dtype = session_dtype(num_sensors, calibrated)
+        self.schema = pa.schema([
+            (name, pa.from_numpy_dtype(self.dtype[name])) for name in self.dtype.names
+        ])
+        super().__init__(filename, **kwargs)
+    
+    def _open(self, filename: str):
+        f = open(filename, mode="wb")
+        self._ipc_writer = pa.ipc.new_file(f, self.schema)
+        return f
+    
+    def _write_batches(self, batches: List[List[Sequence]]) -> int:
+        rows = [row for batch in batches for row in batch]
+        arr = records_to_structured(rows, self.num_sensors, self.calibrated)
+        self._ipc_writer.write_batch(pa.record_batch(
+            [pa.array(arr[name]) for name in self.dtype.names], schema=self.schema
+        ))
+        return len(rows)
+    
+    def _finalize(self) -> None:
+        self._ipc_writer.close()
+
+# Backends de armazenamento: nome -> (extensão, classe do escritor)
+STORAGE_BACKENDS = {
+    'csv': ('.csv', BufferedCSVWriter),
+    'npy': ('.npy', NpyRecordWriter),
+    'arrow': ('.arrow', ArrowRecordWriter),
+}
+
+def available_backends() -> List[str]:
+    """Backends utilizáveis neste ambiente"""
+    return [name for name in STORAGE_BACKENDS if name != 'arrow' or pa is not None]
+
+def open_backend(name: str, base_path: str, num_sensors: int = 4, calibrated: bool = False,
+                 **writer_kwargs) -> BackgroundWriter:
+    """Abre o escritor do backend `name` em `base_path` + extensão do backend"""
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {name}")
+    extension, writer_cls = STORAGE_BACKENDS[name]
+    filename = base_path + extension
+    if writer_cls is BufferedCSVWriter:
+        return BufferedCSVWriter(filename, csv_header(num_sensors, calibrated), **writer_kwargs)
+    return writer_cls(filename, num_sensors=num_sensors, calibrated=calibrated, **writer_kwargs)
+
+def read_csv_records(csv_path: str, chunk_rows: int = 1_000_000) -> Iterator[np.ndarray]:
+    """Lê um CSV de sessão em blocos de arrays estruturados"""
+    with open(csv_path, encoding='utf-8') as f:
+        num_sensors, calibrated = session_layout(f.readline().strip().split(','))
+        dtype = np.float64 if calibrated else np.int64
+        while True:
+            block = np.loadtxt(f, delimiter=',', dtype=dtype, max_rows=chunk_rows, ndmin=2)
+            if block.size == 0:
+                return
+            yield records_to_structured(block, num_sensors, calibrated)
+            if len(block) < chunk_rows:
+                return
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    return dtype, f.tell()
+
+def load_session(path: str, mmap: bool = True) -> np.ndarray:
+    """Carrega uma sessão gravada (.npy, .arrow ou .csv) como array estruturado.
+    
+    Arquivos .npy são abertos por memória mapeada; a contagem de registros
+    vem do tamanho do arquivo, o que também cobre gravações interrompidas.
+    """
+    if path.endswith('.npy'):
+        with open(path, 'rb') as f:
+            dtype, offset = _read_npy_header(f)
+        count = (os.path.getsize(path) - offset) // dtype.itemsize
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        if mmap:
+            return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(count,))
+        return np.fromfile(path, dtype=dtype, count=count, offset=offset)
+    
+    if path.endswith('.arrow'):
+        if pa is None:
+            raise RuntimeError("pyarrow não está instalado")
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+            out = np.empty(table.num_rows, dtype=session_dtype(*session_layout(table.column_names)))
+            for name in out.dtype.names:
+                out[name] = table.column(name).to_numpy()
+        return out
+    
+    if path.endswith('.csv'):
+        chunks = list(read_csv_records(path))
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=session_dtype())
+    
+    raise ValueError(f"Formato de sessão não suportado: {path}")
+
+def convert_csv(csv_path: str, dest: Optional[str] = None, fmt: str = 'npy') -> str:
+    """Converte um CSV de sessão existente para o formato binário `fmt`"""
+    if dest is None:
+        dest = os.path.splitext(csv_path)[0] + STORAGE_BACKENDS[fmt][0]
+    
+    if fmt == 'npy':
+        with open(csv_path, encoding='utf-8') as f:
+            dtype = session_dtype(*session_layout(f.readline().strip().split(',')))
+        count = 0
+        with open(dest, 'wb') as out:
+            out.write(_npy_header(dtype, 0))
+            for chunk in read_csv_records(csv_path):
+                out.write(chunk.tobytes())
+                count += len(chunk)
+            out.seek(0)
+            out.write(_npy_header(dtype, count))
+        return dest
+    
+    if fmt == 'arrow':
+        if pa is None:
+            raise RuntimeError("pyarrow não está instalado")
+        data = load_session(csv_path)
+        table = pa.table({name: data[name] for name in data.dtype.names})
+        with pa.OSFile(dest, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return dest
+    
+    raise ValueError(f"Formato de destino não suportado: {fmt}")
+
+def recompute_intervals(path: str) -> Dict:
+    """Recalcula a coluna interval_ms de uma sessão gravada, em uma passada vetorizada.
+    
+    Arquivos .npy são atualizados no lugar (memória mapeada); .csv e .arrow
+    são reescritos em um arquivo temporário e substituídos ao final.
+    """
+    records = load_session(path, mmap=False)
+    intervals, zones = IntervalDetector.recompute(records['sLed'], records['timeStamp'])
+    
+    if path.endswith('.npy'):
+        if len(records):
+            with open(path, 'rb') as f:
+                dtype, offset = _read_npy_header(f)
+            mapped = np.memmap(path, dtype=dtype, mode='r+', offset=offset, shape=(len(records),))
+            mapped['interval_ms'] = intervals
+            mapped.flush()
+            del mapped
+    else:
+        records['interval_ms'] = intervals
+        tmp = path + '.tmp'
+        if path.endswith('.csv'):
+            with open(tmp, 'w', encoding='utf-8', newline='') as f:
+                # Mesmo terminador de linha do csv.writer usado na gravação
+                f.write(','.join(records.dtype.names) + '\r\n')
+                names = records.dtype.names
+                columns = np.column_stack([records[name].astype(np.float64) for name in names])
+                fmt = ['%.6g' if name.startswith('kgSensor') else '%d' for name in names]
+                np.savetxt(f, columns, fmt=fmt, delimiter=',', newline='\r\n')
+        elif path.endswith('.arrow'):
+            table = pa.table({name: records[name] for name in records.dtype.names})
+            with pa.OSFile(tmp, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+    
+    return {'records': len(records), 'zones': zones}
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List
+import numpy as np
+from services.ble_manager import SensorRecord
+from services.calibration import ModuleCalibration, kg_values
+
+class StreamSubscriber:
+    """Fila de amostras pendentes de um cliente do stream"""
+    
+    def __init__(self, max_pending: int):
+        self.pending: deque = deque(maxlen=max_pending)
+        self.dropped = 0
+        self.cleared = False
+
+class StreamHub:
+    """Distribui as amostras recebidas do BLE aos clientes SSE como deltas.
+    
+    Cada cliente recebe primeiro um snapshot do histórico recente e depois
+    apenas as amostras novas, agrupadas em frames a cada ``frame_interval``.
+    """
+    
+    def __init__(self, frame_interval: float = 0.05, history: int = 100,
+                 max_pending: int = 10_000, heartbeat: float = 15.0):
+        self.frame_interval = frame_interval
+        self.heartbeat = heartbeat
+        self.max_pending = max_pending
+        self.history: deque = deque(maxlen=history)
+        self.sequence = 0
+        self.subscribers: List[StreamSubscriber] = []
+        # Calibração do módulo conectado: os frames já levam os valores em kg
+        self.calibration = ModuleCalibration.default()
+        self._cond = threading.Condition()
+    
+    def set_history(self, history: int) -> None:
+        """Redimensiona o histórico enviado no snapshot inicial"""
+        with self._cond:
+            self.history = deque(self.history, maxlen=history)
+    
+    def publish(self, records: List[SensorRecord]) -> None:
+        """Callback de lote do BLEManager: enfileira as amostras para todos os clientes"""
+        with self._cond:
+            self.sequence += len(records)
+            self.history.extend(records)
+            for subscriber in self.subscribers:
+                free = subscriber.pending.maxlen - len(subscriber.pending)
+                if len(records) > free:
+                    subscriber.dropped += len(records) - free
+                subscriber.pending.extend(records)
+            self._cond.notify_all()
+    
+    def clear(self) -> None:
+        """Descarta o histórico e avisa os clientes para limparem o gráfico"""
+        with self._cond:
+            self.history.clear()
+            for subscriber in self.subscribers:
+                subscriber.pending.clear()
+                subscriber.cleared = True
+            self._cond.notify_all()
+    
+    def _frame(self, records: List[SensorRecord], sequence: int, dropped: int = 0) -> Dict:
+        """Monta um frame colunar a partir dos registros (sensores brutos e em kg)"""
+        columns = list(zip(*records)) if records else [()] * 7
+        sensors = [list(col) for col in columns[1:-2]]
+        sensors_kg = self.calibration.apply(np.array(sensors, dtype=np.int64)) if records else []
+        return {
+            'seq': sequence,
+            'timestamp': list(columns[-2]),
+            'led': list(columns[0]),
+            'sensors': sensors,
+            'sensors_kg': kg_values(sensors_kg),
+            'interval_ms': list(columns[-1]),
+            'dropped': dropped,
+        }
+    
+    @staticmethod
+    def _sse(event: str, payload: Dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+    
+    def stream(self) -> Iterator[str]:
+        """Gerador SSE: snapshot inicial seguido de frames com os deltas"""
+        subscriber = StreamSubscriber(self.max_pending)
+        with self._cond:
+            self.subscribers.append(subscriber)
+            snapshot = self._frame(list(self.history), self.sequence)
+            snapshot['window'] = self.history.maxlen
+        
+        try:
+            yield "retry: 2000\n\n"
+            yield self._sse('snapshot', snapshot)
+            last_frame = time.monotonic()
+            
+            while True:
+                with self._cond:
+                    if not subscriber.pending and not subscriber.cleared:
+                        self._cond.wait(self.heartbeat)
+                
+                # Coalesce as amostras que chegarem até completar o intervalo do frame
+                remaining = self.frame_interval - (time.monotonic() - last_frame)
+                if remaining > 0:
+                    time.sleep(remaining)
+                
+                with self._cond:
+                    records = list(subscriber.pending)
+                    subscriber.pending.clear()
+                    dropped, subscriber.dropped = subscriber.dropped, 0
+                    cleared, subscriber.cleared = subscriber.cleared, False
+                    sequence = self.sequence
+                
+                if cleared:
+                    yield self._sse('clear', {'seq': sequence})
+                if records:
+                    yield self._sse('samples', self._frame(records, sequence, dropped))
+                elif not cleared:
+                    yield ": keepalive\n\n"
+                last_frame = time.monotonic()
+        finally:
+            with self._cond:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
@@ -0,0 +1,267 @@
+import struct
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+class StreamValidator:
+    """Valida o stream bruto do firmware antes da decodificação.
+    
+    O firmware envia registros "<B4iI" colados em notificações de 180 bytes.
+    Se uma notificação se perde, o resto parcial guardado no buffer se junta
+    a bytes de outro registro e todos os seguintes ficam desalinhados. Cada
+    registro tem bits que precisam ser zero (sLed <= ``max_led``, sensores
+    de ``adc_bits`` bits), então o lote inteiro é conferido com um único AND
+    sobre o inteiro formado pelos bytes. Se a conferência falha, o validador
+    procura o próximo deslocamento em que ``confirm`` registros seguidos são
+    plausíveis, descarta os bytes anteriores (ressincronização) e continua.
+    
+    Depois da decodificação, a sequência de ``timeStamp`` (contador do loop do
+    firmware, +1 a cada 50 ms) é conferida: pausas (o botão de gravação solto;
+    o contador continua), lacunas com perda de registros, duplicatas e
+    reenvios (descartados) e, depois de uma ressincronização, registros que
+    quebram a sequência sem confirmação (implausíveis, descartados). Os
+    registros aceitos têm ``timeStamp`` estritamente crescente, o que a
+    leitura das sessões gravadas (searchsorted) pressupõe.
+    """
+    
+    def __init__(self, struct_format: str = "<B4iI", max_led: int = 7, adc_bits: int = 12,
+                 confirm: int = 3, max_jump: int = 1 << 24, small_batch: int = 64):
+        self.struct = struct.Struct(struct_format)
+        self.size = self.struct.size
+        self.num_sensors = (self.size - 5) // 4  # B + N inteiros + I
+        self.max_led = max_led
+        self.adc_bits = adc_bits
+        self.confirm = confirm
+        self.max_jump = max_jump  # na ressincronização, saltos maiores que isso (ticks) rejeitam o alinhamento
+        self.small_batch = small_batch
+        
+        # Bits que devem ser zero em um registro: sLed acima de max_led e
+        # sensores acima de adc_bits (valores negativos também falham)
+        led_mask = 0xFF & ~((1 << max(1, max_led.bit_length())) - 1)
+        sensor_mask = (0xFFFFFFFF & ~((1 << adc_bits) - 1)).to_bytes(4, 'little')
+        self._record_mask = bytes([led_mask]) + sensor_mask * self.num_sensors + bytes(4)
+        self._masks: Dict[int, int] = {}
+        self._dtype = np.dtype([('sLed', '<u1'), ('sensors', '<u4', (self.num_sensors,)), ('timeStamp', '<u4')])
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zera o relatório (nova conexão)"""
+        self.last_ts: Optional[int] = None
+        self._pending: Optional[Tuple[int, ...]] = None
+        self.first_ts: Optional[int] = None
+        self.records = 0
+        self.gaps = 0
+        self.missing_records = 0
+        self.largest_gap = 0
+        self.pauses = 0
+        self.paused_records = 0
+        self.longest_pause = 0
+        self.duplicates = 0
+        self.replayed = 0
+        self.implausible = 0
+        self.resyncs = 0
+        self.bytes_discarded = 0
+    
+    def _mask(self, n: int) -> int:
+        mask = self._masks.get(n)
+        if mask is None:
+            mask = self._masks[n] = int.from_bytes(self._record_mask * n, 'little')
+        return mask
+    
+    def _plausible(self, data, n: int) -> bool:
+        """Todos os n registros de data têm sLed e sensores dentro da faixa"""
+        if n <= self.small_batch:
+            return int.from_bytes(data, 'little') & self._mask(n) == 0
+        arr = np.frombuffer(data, dtype=self._dtype, count=n)
+        return bool((arr['sLed'] <= self.max_led).all() and (arr['sensors'] >> self.adc_bits == 0).all())
+    
+    def decode(self, buffer: bytearray) -> Tuple[List[Tuple[int, ...]], int]:
+        """Decodifica os registros completos do buffer.
+        
+        Retorna (registros, bytes consumidos); o chamador remove do buffer os
+        bytes consumidos e mantém o resto para a próxima notificação.
+        """
+        complete = len(buffer) - len(buffer) % self.size
+        if complete == 0:
+            return [], 0
+        
+        view = memoryview(buffer)
+        try:
+            chunk = view[:complete]
+            n = complete // self.size
+            try:
+                records = list(self.struct.iter_unpack(chunk))
+                # Caminho rápido (o caso normal): o lote continua a sequência. O
+                # alinhamento só pode mudar na emenda com o resto da notificação
+                # anterior, então primeiro e último timeStamp corretos garantem
+                # o lote inteiro alinhado, sem conferir registro a registro.
+                first, last = records[0][-1], self.last_ts
+                if (last is not None and self._pending is None and first == last + 1
+                        and records[-1][-1] - first == n - 1):
+                    self.last_ts += n
+                    self.records += n
+                    return records, complete
+                if self._plausible(chunk, n):
+                    return self.check_sequence(records), complete
+            finally:
+                chunk.release()
+            discarded = self.bytes_discarded
+            records, consumed = self._resync(view)
+        finally:
+            view.release()
+        return self.check_sequence(records, resynced=self.bytes_discarded > discarded), consumed
+    
+    def _resync(self, view: memoryview) -> Tuple[List[Tuple[int, ...]], int]:
+        """Caminho lento: decodifica registro a registro, pulando bytes desalinhados"""
+        size = self.size
+        length = len(view)
+        records = []
+        pos = 0
+        while length - pos >= size:
+            if self._plausible(view[pos:pos + size], 1):
+                records.append(self.struct.unpack_from(view, pos))
+                pos += size
+                continue
+            if length - pos < size * (self.confirm + 1):
+                # Poucos bytes para confirmar um novo alinhamento: espera a próxima notificação
+                break
+            
+            # Próximo deslocamento confirmado por `confirm` registros plausíveis
+            span = self.confirm * size
+            found = next((start for start in range(pos + 1, pos + size)
+                          if self._plausible(view[start:start + span], self.confirm)
+                          and self._plausible_ts(view, start)), None)
+            if found is None:
+                # Nenhum alinhamento confirmado: descarta o registro inteiro
+                found = pos + size
+            else:
+                self.resyncs += 1
+            self.bytes_discarded += found - pos
+            pos = found
+        return records, pos
+    
+    def _plausible_ts(self, view: memoryview, start: int) -> bool:
+        """Os registros de confirmação têm timeStamps consecutivos e próximos do último aceito"""
+        stamps = [self.struct.unpack_from(view, start + k * self.size)[-1] for k in range(self.confirm)]
+        if any(b != a + 1 for a, b in zip(stamps, stamps[1:])):
+            return False
+        return self.last_ts is None or abs(stamps[0] - self.last_ts) <= self.max_jump
+    
+    def check_sequence(self, records: List[Tuple[int, ...]], resynced: bool = False) -> List[Tuple[int, ...]]:
+        """Confere a sequência de timeStamp.
+        
+        Os registros já passaram pela conferência dos bytes (ou pelo CRC dos
+        frames v2), então um registro que não continua a sequência (+1) é
+        aceito: uma lacuna é uma pausa (botão de gravação solto, inclusive
+        gravações de um único tick) e é contada à parte das perdas. Com
+        ``resynced`` (bytes descartados no lote), a lacuna é de registros
+        perdidos e o registro só é aceito se o seguinte continuar a partir
+        dele, o que um alinhamento errado não faz; sem registro seguinte no
+        lote, ele aguarda a próxima notificação (ou o ``flush`` no fim da
+        conexão). Registros com ``timeStamp`` já visto são descartados: o
+        firmware reenvia o vetor inteiro (``vetorRecord`` não é limpo) a cada
+        ciclo com o botão de envio pressionado. Um reinício real do contador
+        só acontece com o reboot do ESP32, que derruba a conexão e zera o
+        validador. Também recebe os registros dos frames v2 (services.wire_format).
+        """
+        if not records:
+            return records
+        
+        # Caminho rápido: sequência contínua (o caso normal)
+        if self._pending is None:
+            expected = records[0][-1] if self.last_ts is None else self.last_ts + 1
+            for r in records:
+                if r[-1] != expected:
+                    break
+                expected += 1
+            else:
+                if self.first_ts is None:
+                    self.first_ts = records[0][-1]
+                self.last_ts = expected - 1
+                self.records += len(records)
+                return records
+            sequence = records
+        else:
+            # O registro retido veio de uma ressincronização
+            sequence = [self._pending] + records
+            self._pending = None
+            resynced = True
+        
+        accepted = []
+        last = self.last_ts
+        for i, r in enumerate(sequence):
+            ts = r[-1]
+            if last is not None and ts != last + 1:
+                if ts <= last:
+                    self._count_repeat(last, ts)
+                    continue
+                if resynced:
+                    if i + 1 == len(sequence):
+                        self._pending = r
+                        break
+                    if sequence[i + 1][-1] != ts + 1 or ts - last > self.max_jump:
+                        self.implausible += 1
+                        continue
+                self._count_break(last, ts, resynced)
+            accepted.append(r)
+            last = ts
+        self._accept(accepted, last)
+        return accepted
+    
+    def flush(self) -> List[Tuple[int, ...]]:
+        """Entrega o registro retido à espera de confirmação (fim da conexão)"""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            return []
+        if self.last_ts is not None:
+            if pending[-1] <= self.last_ts:
+                self._count_repeat(self.last_ts, pending[-1])
+                return []
+            self._count_break(self.last_ts, pending[-1], True)
+        self._accept([pending], pending[-1])
+        return [pending]
+    
+    def _count_repeat(self, last: int, ts: int) -> None:
+        """Conta um registro descartado por repetir um timeStamp já aceito"""
+        if ts == last:
+            self.duplicates += 1
+        else:
+            self.replayed += 1
+    
+    def _count_break(self, last: int, ts: int, lost: bool) -> None:
+        """Classifica um salto à frente aceito: lacuna com perda ou pausa"""
+        skipped = ts - last - 1
+        if lost:
+            self.gaps += 1
+            self.missing_records += skipped
+            self.largest_gap = max(self.largest_gap, skipped)
+        else:
+            self.pauses += 1
+            self.paused_records += skipped
+            self.longest_pause = max(self.longest_pause, skipped)
+    
+    def _accept(self, accepted: List[Tuple[int, ...]], last: Optional[int]) -> None:
+        if self.first_ts is None and accepted:
+            self.first_ts = accepted[0][-1]
+        self.last_ts = last
+        self.records += len(accepted)
+    
+    def get_report(self) -> Dict:
+        """Relatório de perdas da sessão"""
+        expected = self.records + self.missing_records
+        return {
+            'records': self.records,
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+            'gaps': self.gaps,
+            'missing_records': self.missing_records,
+            'largest_gap': self.largest_gap,
+            'pauses': self.pauses,
+            'paused_records': self.paused_records,
+            'longest_pause': self.longest_pause,
+            'duplicates': self.duplicates,
+            'replayed': self.replayed,
+            'implausible': self.implausible,
+            'resyncs': self.resyncs,
+            'bytes_discarded': self.bytes_discarded,
+            'loss_ratio': round(self.missing_records / expected, 6) if expected else 0.0,
+        }
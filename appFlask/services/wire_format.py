@@ -0,0 +1,254 @@
+import binascii
+import struct
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Formato v2 do firmware: lotes ("frames") de amostras com timeStamp consecutivo.
+#
+#   cabeçalho (10 bytes, little-endian)
+#     sync     u8   0xA5 (nunca é o 1º byte de um registro v1: sLed <= 7)
+#     version  u8   2
+#     flags    u8   bits 0-3: nº de sensores (4-6) | bit 4: delta
+#     count    u8   amostras no frame (1-255)
+#     baseTs   u32  timeStamp da 1ª amostra (as seguintes são +1, +2, ...)
+#     length   u16  bytes do corpo (sem cabeçalho e CRC)
+#   corpo
+#     sLed     ceil(count / 2) bytes, um nibble por amostra (baixo primeiro)
+#     sensores empacotados (flag delta = 0): count * N valores de 12 bits,
+#              dois a cada 3 bytes, em ordem amostra a amostra
+#           ou delta (flag delta = 1): N valores de 12 bits da 1ª amostra e
+#              (count - 1) * N diferenças int8 para a amostra anterior
+#   crc16      CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) de cabeçalho + corpo
+#
+# O firmware monta cada frame para caber em uma notificação de 180 bytes, então
+# uma notificação perdida custa um frame inteiro, sem desalinhar os seguintes.
+WIRE_SYNC = 0xA5
+WIRE_VERSION = 2
+FLAG_SENSORS = 0x0F
+FLAG_DELTA = 0x10
+MIN_SENSORS = 4
+MAX_SENSORS = 6
+MAX_COUNT = 255
+HEADER = struct.Struct("<BBBBIH")
+HEADER_SIZE = HEADER.size
+CRC_SIZE = 2
+_SYNC_BYTES = bytes([WIRE_SYNC, WIRE_VERSION])
+
+def crc16(data) -> int:
+    """CRC-16/CCITT-FALSE (o mesmo do firmware)"""
+    return binascii.crc_hqx(data, 0xFFFF)
+
+def packed_size(count: int, num_sensors: int) -> int:
+    """Bytes do corpo com sensores empacotados em 12 bits"""
+    return (count + 1) // 2 + (count * num_sensors * 3 + 1) // 2
+
+def delta_size(count: int, num_sensors: int) -> int:
+    """Bytes do corpo com a 1ª amostra em 12 bits e diferenças int8"""
+    return (count + 1) // 2 + (num_sensors * 3 + 1) // 2 + (count - 1) * num_sensors
+
+def _max_count(size_fn, num_sensors: int, mtu: int) -> int:
+    """Maior número de amostras cujo frame cabe em uma notificação"""
+    count = 0
+    while count < MAX_COUNT and HEADER_SIZE + size_fn(count + 1, num_sensors) + CRC_SIZE <= mtu:
+        count += 1
+    return count
+
+def _pack12(values: np.ndarray) -> bytes:
+    """Valores de 12 bits, dois a cada 3 bytes (o último ímpar ocupa 2)"""
+    v = values.astype(np.uint16)
+    odd = len(v) % 2
+    if odd:
+        v = np.append(v, 0)
+    a, b = v[0::2], v[1::2]
+    out = np.empty((len(a), 3), dtype=np.uint8)
+    out[:, 0] = a & 0xFF
+    out[:, 1] = (a >> 8) | ((b & 0x0F) << 4)
+    out[:, 2] = b >> 4
+    data = out.tobytes()
+    return data[:-1] if odd else data
+
+def _unpack12(data: bytes, n: int) -> List[int]:
+    """Inverso de _pack12: n valores de 12 bits"""
+    values = []
+    for x, y, z in zip(data[0::3], data[1::3], data[2::3]):
+        values += (x | (y & 0x0F) << 8, y >> 4 | z << 4)
+    if n % 2:
+        values.append(data[-2] | (data[-1] & 0x0F) << 8)
+    return values[:n]
+
+def _pack_leds(leds: np.ndarray) -> bytes:
+    v = leds.astype(np.uint8) & 0x0F
+    if len(v) % 2:
+        v = np.append(v, 0)
+    return (v[0::2] | (v[1::2] << 4)).astype(np.uint8).tobytes()
+
+def encode_frame(leds: np.ndarray, sensors: np.ndarray, base_ts: int, delta: bool) -> bytes:
+    """Um frame v2 com as amostras dadas (sensors: count x N, timeStamps consecutivos)"""
+    count, num_sensors = sensors.shape
+    if delta:
+        diffs = np.diff(sensors, axis=0).astype(np.int8)
+        body = _pack_leds(leds) + _pack12(sensors[0]) + diffs.tobytes()
+    else:
+        body = _pack_leds(leds) + _pack12(sensors.ravel())
+    flags = num_sensors | (FLAG_DELTA if delta else 0)
+    frame = HEADER.pack(WIRE_SYNC, WIRE_VERSION, flags, count, base_ts & 0xFFFFFFFF, len(body)) + body
+    return frame + crc16(frame).to_bytes(CRC_SIZE, 'little')
+
+def encode_frames(records: np.ndarray, mtu: int = 180, delta: bool = True) -> List[bytes]:
+    """Codifica registros no layout v1 (structured array) em frames v2.
+    
+    Mesmo algoritmo do firmware (montarFrameV2): cada frame cobre uma
+    sequência de timeStamps consecutivos e usa delta quando todas as
+    diferenças cabem em int8 e isso acomoda mais amostras que o
+    empacotamento de 12 bits.
+    """
+    names = [n for n in records.dtype.names if n.startswith('rSensor')]
+    num_sensors = len(names)
+    sensors = np.empty((len(records), num_sensors), dtype=np.int32)
+    for i, name in enumerate(names):
+        sensors[:, i] = records[name]
+    leds = records['sLed']
+    stamps = records['timeStamp'].astype(np.int64)
+    n = len(records)
+    max_packed = _max_count(packed_size, num_sensors, mtu)
+    max_delta = _max_count(delta_size, num_sensors, mtu) if delta else 0
+    
+    # Fim da sequência consecutiva e primeira diferença fora de int8 a partir de cada índice
+    breaks = np.flatnonzero(np.diff(stamps) != 1) + 1
+    diffs = np.diff(sensors, axis=0)
+    wide = np.flatnonzero(((diffs < -128) | (diffs > 127)).any(axis=1)) + 1
+    
+    frames = []
+    pos = 0
+    while pos < n:
+        run_end = breaks[np.searchsorted(breaks, pos, side='right')] if len(breaks) and breaks[-1] > pos else n
+        count = min(run_end - pos, max_packed)
+        use_delta = False
+        if max_delta:
+            k = np.searchsorted(wide, pos, side='right')
+            delta_end = wide[k] if k < len(wide) else n
+            delta_count = min(run_end, delta_end) - pos
+            delta_count = min(delta_count, max_delta)
+            if delta_count > count:
+                count, use_delta = delta_count, True
+        end = pos + count
+        frames.append(encode_frame(leds[pos:end], sensors[pos:end], int(stamps[pos]), use_delta))
+        pos = end
+    return frames
+
+def detect_version(data) -> int:
+    """Versão do stream pela primeira notificação: 2 se começa com um cabeçalho v2 válido"""
+    if len(data) < HEADER_SIZE or bytes(data[:2]) != _SYNC_BYTES:
+        return 1
+    _, _, flags, count, _, length = HEADER.unpack_from(data)
+    if _expected_length(flags, count) != length:
+        return 1
+    end = HEADER_SIZE + length
+    if len(data) >= end + CRC_SIZE and crc16(data[:end]) != int.from_bytes(data[end:end + CRC_SIZE], 'little'):
+        return 1
+    return 2
+
+def _expected_length(flags: int, count: int) -> Optional[int]:
+    num_sensors = flags & FLAG_SENSORS
+    if flags & ~(FLAG_SENSORS | FLAG_DELTA) or not MIN_SENSORS <= num_sensors <= MAX_SENSORS or count == 0:
+        return None
+    return (delta_size if flags & FLAG_DELTA else packed_size)(count, num_sensors)
+
+class FrameDecoder:
+    """Decodifica frames v2 do buffer em registros (sLed, rSensor1..N, timeStamp).
+    
+    Frames com CRC inválido são descartados e a busca continua no próximo
+    byte de sincronismo. ``num_sensors`` é a largura da sessão (4-6): frames
+    com menos sensores são decodificados nela, com 0 nas colunas que faltam;
+    frames com mais (firmware com 6 sensores e app com 4, por exemplo) são
+    descartados e contados, para não perder colunas.
+    """
+    
+    def __init__(self, num_sensors: int = 4):
+        self.num_sensors = num_sensors
+        self.reset()
+    
+    def reset(self) -> None:
+        """Zera os contadores (nova conexão)"""
+        self.frames = 0
+        self.delta_frames = 0
+        self.crc_errors = 0
+        self.sensor_mismatch = 0
+        self.padded_frames = 0
+        self.bytes_discarded = 0
+    
+    def decode(self, buffer: bytearray) -> Tuple[List[Tuple[int, ...]], int]:
+        """Decodifica os frames completos do buffer; retorna (registros, bytes consumidos)"""
+        records: List[Tuple[int, ...]] = []
+        length = len(buffer)
+        pos = 0
+        while length - pos >= HEADER_SIZE:
+            start = buffer.find(_SYNC_BYTES, pos)
+            if start < 0:
+                # Mantém o último byte: pode ser o início do próximo sincronismo
+                start = length - 1
+                self.bytes_discarded += start - pos
+                pos = start
+                break
+            self.bytes_discarded += start - pos
+            pos = start
+            if length - pos < HEADER_SIZE:
+                break
+            _, _, flags, count, base_ts, body_size = HEADER.unpack_from(buffer, pos)
+            if _expected_length(flags, count) != body_size:
+                # Falso sincronismo (bytes do corpo de outro frame)
+                self.bytes_discarded += 1
+                pos += 1
+                continue
+            end = pos + HEADER_SIZE + body_size
+            if length < end + CRC_SIZE:
+                break  # frame incompleto: espera a próxima notificação
+            if crc16(buffer[pos:end]) != int.from_bytes(buffer[end:end + CRC_SIZE], 'little'):
+                self.crc_errors += 1
+                self.bytes_discarded += 1
+                pos += 1
+                continue
+            num_sensors = flags & FLAG_SENSORS
+            if num_sensors > self.num_sensors:
+                self.sensor_mismatch += 1
+            else:
+                if num_sensors < self.num_sensors:
+                    self.padded_frames += 1
+                records.extend(self._decode_body(buffer[pos + HEADER_SIZE:end], flags, count, base_ts))
+            self.frames += 1
+            pos = end + CRC_SIZE
+        return records, pos
+    
+    def _decode_body(self, body: bytes, flags: int, count: int, base_ts: int) -> List[Tuple[int, ...]]:
+        """Amostras de um frame, sem NumPy: com ~30 amostras por frame o custo
+        fixo das operações vetoriais seria maior que o laço sobre os bytes.
+        """
+        n = flags & FLAG_SENSORS
+        led_bytes = (count + 1) // 2
+        leds = []
+        for b in body[:led_bytes]:
+            leds += (b & 0x0F, b >> 4)
+        if flags & FLAG_DELTA:
+            self.delta_frames += 1
+            first_size = (n * 3 + 1) // 2
+            first = _unpack12(body[led_bytes:led_bytes + first_size], n)
+            diffs = memoryview(body[led_bytes + first_size:]).cast('b')
+            columns = [accumulate(diffs[i::n], initial=first[i]) for i in range(n)]
+        else:
+            values = _unpack12(body[led_bytes:], count * n)
+            columns = [values[i::n] for i in range(n)]
+        if n < self.num_sensors:
+            columns += [[0] * count] * (self.num_sensors - n)
+        return list(zip(leds[:count], *columns, range(base_ts, base_ts + count)))
+    
+    def get_report(self) -> Dict:
+        """Contadores dos frames v2"""
+        return {
+            'frames': self.frames,
+            'delta_frames': self.delta_frames,
+            'crc_errors': self.crc_errors,
+            'sensor_mismatch': self.sensor_mismatch,
+            'padded_frames': self.padded_frames,
+            'frame_bytes_discarded': self.bytes_discarded,
+        }
@@ -0,0 +1,127 @@
+import heapq
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Optional
+
+# Estados de uma tarefa no pool
+_IDLE, _QUEUED, _RUNNING = range(3)
+
+class PoolTask(ABC):
+    """Trabalho serial executado pelo WorkerPool (estágio do pipeline, escritor).
+    
+    O pool nunca roda a mesma tarefa em duas threads ao mesmo tempo, então
+    a ordem dos lotes de cada tarefa é preservada sem lock próprio.
+    """
+    
+    _pool_state = _IDLE
+    _pool_again = False
+    
+    @abstractmethod
+    def run_pending(self) -> bool:
+        """Processa uma parte do trabalho pendente; True se ainda resta trabalho"""
+
+class WorkerPool:
+    """Threads compartilhadas por todas as sessões do processo.
+    
+    Estágios do pipeline e escritores de todas as sessões são tarefas
+    agendadas aqui, em vez de uma thread por estágio e por arquivo: com 8
+    MOBOs gravando em csv+npy são ``workers`` threads, não ~40. Cada
+    execução processa uma parte limitada do trabalho e a tarefa volta ao fim
+    da fila, para uma sessão com muito atraso não segurar as outras.
+    ``schedule_at`` agenda uma execução futura (flush por tempo da gravação).
+    """
+    
+    def __init__(self, workers: int = 4, name: str = "worker"):
+        self.workers = workers
+        self.name = name
+        self._cond = threading.Condition()
+        self._ready: deque = deque()
+        self._timers: List[tuple] = []   # heap de (instante, seq, tarefa)
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self.executed = 0
+        self.errors = 0
+    
+    def _ensure_threads(self) -> None:
+        """Cria as threads que faltam até ``workers`` (chamado sob _cond)"""
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < max(1, self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def _enqueue(self, task: PoolTask) -> None:
+        if task._pool_state == _IDLE:
+            task._pool_state = _QUEUED
+            self._ready.append(task)
+            self._cond.notify()
+        elif task._pool_state == _RUNNING:
+            # Rodando agora: executa de novo ao terminar
+            task._pool_again = True
+    
+    def schedule(self, task: PoolTask) -> None:
+        """Agenda a tarefa (sem efeito se ela já está na fila)"""
+        with self._cond:
+            self._ensure_threads()
+            self._enqueue(task)
+    
+    def schedule_at(self, task: PoolTask, when: float) -> None:
+        """Agenda a tarefa para o instante ``when`` (time.monotonic)"""
+        with self._cond:
+            self._ensure_threads()
+            heapq.heappush(self._timers, (when, next(self._seq), task))
+            self._cond.notify()
+    
+    def _next_task(self) -> PoolTask:
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    self._enqueue(heapq.heappop(self._timers)[2])
+                if self._ready:
+                    task = self._ready.popleft()
+                    task._pool_state = _RUNNING
+                    task._pool_again = False
+                    return task
+                self._cond.wait(self._timers[0][0] - now if self._timers else None)
+    
+    def _run(self) -> None:
+        while True:
+            task = self._next_task()
+            more = False
+            try:
+                more = task.run_pending()
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro na tarefa {task!r}: {e}")
+            with self._cond:
+                self.executed += 1
+                task._pool_state = _IDLE
+                if more or task._pool_again:
+                    self._enqueue(task)
+    
+    def get_stats(self) -> Dict:
+        """Threads, tarefas na fila e execuções"""
+        with self._cond:
+            return {
+                'workers': len(self._threads),
+                'ready_tasks': len(self._ready),
+                'timers': len(self._timers),
+                'executed': self.executed,
+                'errors': self.errors,
+            }
+
+# Pool compartilhado por todas as sessões do processo
+_shared_pool: Optional[WorkerPool] = None
+_shared_lock = threading.Lock()
+
+def shared_pool() -> WorkerPool:
+    """Retorna o pool de workers compartilhado do processo"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = WorkerPool()
+        return _shared_pool
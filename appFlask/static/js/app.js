@@ -119,68 +119,155 @@ function initChart() {
     Plotly.newPlot('sensor-chart', [trace1, trace2, trace3, trace4], layout, config);
 }
 
+// Polling incremental (fallback do stream): só as amostras após o cursor
 function updateChart() {
-    fetch('/api/chart_data')
+    const since = chartCursor === null ? -1 : chartCursor;
+    
+    fetch(`/api/chart_data?since=${since}`)
         .then(resp => resp.json())
-        .then(data => {
-            if (data.data && data.data.length > 0) {
-                const chartData = data.data;
-                
-                const timestamps = chartData.map(d => d.timestamp);
-                const sensor1Data = chartData.map(d => (d.sensors[0] / 4095 * 20).toFixed(2));
-                const sensor2Data = chartData.map(d => (d.sensors[1] / 4095 * 20).toFixed(2));
-                const sensor3Data = chartData.map(d => (d.sensors[2] / 4095 * 20).toFixed(2));
-                const sensor4Data = chartData.map(d => (d.sensors[3] / 4095 * 20).toFixed(2));
-
-                
-                const shapes = [];
-                const ledColors = {
-                    0: 'rgba(255, 107, 107, 0.4)',
-                    1: 'rgba(119, 138, 230, 0.4)',
-                    2: 'rgba(248, 248, 30, 0.4)',
-                    3: 'rgba(104, 246, 91, 0.4)'
-                };
-                
-                for (let i = 0; i < chartData.length - 1; i++) {
-                    shapes.push({
-                        type: 'rect', 
-                        xref: 'x', 
-                        yref: 'paper',
-                        x0: chartData[i].timestamp, 
-                        y0: 0,
-                        x1: chartData[i+1].timestamp, 
-                        y1: 1,
-                        fillcolor: ledColors[chartData[i].led] || 'rgba(200, 200, 200, 0.1)',
-                        layer: 'below', 
-                        line: {width: 0}
-                    });
-                }
-                
-                const update = {
-                    x: [timestamps, timestamps, timestamps, timestamps],
-                    y: [sensor1Data, sensor2Data, sensor3Data, sensor4Data]
-                };
-                
-                const layoutUpdate = {
-                    shapes: shapes
-                };
-                
-                Plotly.update('sensor-chart', update, layoutUpdate);
+        .then(delta => {
+            if (delta.reset) {
+                chartWindow = delta.window;
+                resetChart();
             }
+            chartCursor = delta.cursor;
+            extendChart(delta);
         })
         .catch(error => console.log('Erro ao atualizar gráfico:', error));
 }
 
+// Stream SSE (push): snapshot inicial + deltas com Plotly.extendTraces
+const LED_COLORS = {
+    0: 'rgba(255, 107, 107, 0.4)',
+    1: 'rgba(119, 138, 230, 0.4)',
+    2: 'rgba(248, 248, 30, 0.4)',
+    3: 'rgba(104, 246, 91, 0.4)'
+};
+
+let chartWindow = 100;
+let ledSegments = [];
+let pollTimer = null;
+let chartCursor = null;
+
+// Agrupa amostras consecutivas com o mesmo sLed em um único retângulo de fundo
+function appendLedSegments(timestamps, leds) {
+    mergeLedSegments(timestamps.map((t, i) => [leds[i], t, t]));
+}
+
+// Junta segmentos [led, x0, x1] (run-length) aos já desenhados
+function mergeLedSegments(segments) {
+    for (const [led, x0, x1] of segments) {
+        const last = ledSegments[ledSegments.length - 1];
+        if (last) {
+            last.x1 = x0;
+            if (last.led === led) {
+                last.x1 = x1;
+                continue;
+            }
+        }
+        ledSegments.push({led: led, x0: x0, x1: x1});
+    }
+    
+    // Descarta segmentos que já saíram da janela visível
+    const xData = document.getElementById('sensor-chart').data[0].x;
+    if (xData.length > 0) {
+        ledSegments = ledSegments.filter(seg => seg.x1 >= xData[0]);
+    }
+}
+
+function ledShapes() {
+    return ledSegments.map(seg => ({
+        type: 'rect',
+        xref: 'x',
+        yref: 'paper',
+        x0: seg.x0,
+        y0: 0,
+        x1: seg.x1,
+        y1: 1,
+        fillcolor: LED_COLORS[seg.led] || 'rgba(200, 200, 200, 0.1)',
+        layer: 'below',
+        line: {width: 0}
+    }));
+}
+
+function extendChart(frame) {
+    if (frame.timestamp.length === 0) return;
+    
+    const x = frame.timestamp;
+    Plotly.extendTraces(
+        'sensor-chart',
+        {x: frame.sensors_kg.map(() => x), y: frame.sensors_kg},
+        frame.sensors_kg.map((_, i) => i),
+        chartWindow
+    );
+    
+    if (frame.led_segments) {
+        mergeLedSegments(frame.led_segments);
+    } else {
+        appendLedSegments(x, frame.led);
+    }
+    Plotly.relayout('sensor-chart', {shapes: ledShapes()});
+    
+    const interval = frame.interval_ms[frame.interval_ms.length - 1];
+    document.getElementById('current-interval').textContent =
+        `Intervalo atual: ${interval}ms (${(interval/1000).toFixed(2)}s)`;
+}
+
+function resetChart() {
+    ledSegments = [];
+    chartCursor = null;
+    initChart();
+}
+
+function startPolling() {
+    if (pollTimer === null) {
+        pollTimer = setInterval(updateChart, 1000);
+    }
+}
+
+function startStream() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    const source = new EventSource('/api/stream');
+    
+    source.addEventListener('snapshot', event => {
+        const frame = JSON.parse(event.data);
+        chartWindow = frame.window;
+        resetChart();
+        extendChart(frame);
+    });
+    source.addEventListener('samples', event => extendChart(JSON.parse(event.data)));
+    source.addEventListener('clear', resetChart);
+    
+    source.onerror = () => {
+        // O EventSource reconecta sozinho; se o servidor recusar, volta ao polling
+        if (source.readyState === EventSource.CLOSED) {
+            console.log('Stream indisponível, usando polling');
+            startPolling();
+        }
+    };
+}
+
 // Funções de controle
-function scanDevices() {
+function scanDevices(attempt = 0) {
     document.getElementById('status').textContent = 'Escaneando...';
     
+    // O servidor responde na hora com o registro do scanner contínuo
     fetch('/api/scan')
         .then(resp => resp.json())
         .then(data => {
             const deviceList = document.getElementById('device-list');
             const devicesSection = document.getElementById('devices-section');
             
+            // Scanner acabou de iniciar: consulta de novo em vez de bloquear
+            if (data.devices.length === 0 && !data.error && attempt < 8) {
+                setTimeout(() => scanDevices(attempt + 1), 1000);
+                return;
+            }
+            
             deviceList.innerHTML = '';
             
             if (data.devices.length > 0) {
@@ -191,7 +278,7 @@ function scanDevices() {
                     deviceDiv.onclick = () => connectToDevice(device.address, device.name);
                     deviceDiv.innerHTML = `
                         <div class="device-name">${device.name}</div>
-                        <div class="device-address">${device.address}</div>
+                        <div class="device-address">${device.address}${device.rssi !== null ? ` · ${device.rssi} dBm` : ''}</div>
                     `;
                     deviceList.appendChild(deviceDiv);
                 });
@@ -255,7 +342,7 @@ function clearData() {
         .then(data => {
             alert(data.message);
             // Limpa o gráfico visualmente
-            initChart();
+            resetChart();
         })
         .catch(error => {
             console.error('Erro ao limpar dados:', error);
@@ -266,13 +353,13 @@ function clearData() {
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', function() {
-    // Atualiza status periodicamente
+    // Atualiza status periodicamente (o intervalo atual também chega pelo stream)
     setInterval(updateStatus, 2000);
-    setInterval(updateIntervalInfo, 1000);
+    setInterval(updateIntervalInfo, 5000);
     
-    // Inicializa e atualiza gráfico
+    // Inicializa o gráfico e recebe as amostras por push (SSE)
     initChart();
-    setInterval(updateChart, 1000);
+    startStream();
     
     // Primeira atualização
     updateStatus();
@@ -0,0 +1,37 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# Os módulos da aplicação são importados a partir de appFlask/ (from services.x import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def app_dir(tmp_path_factory):
+    """Pasta de trabalho temporária: a aplicação grava em ./data relativo a ela"""
+    path = tmp_path_factory.mktemp("app")
+    cwd = os.getcwd()
+    os.chdir(path)
+    yield path
+    os.chdir(cwd)
+
+@pytest.fixture(scope="session")
+def client(app_dir):
+    """Test client do Flask com o estado global apontando para a pasta temporária"""
+    from app import create_app
+    app = create_app()
+    app.config.update(TESTING=True)
+    return app.test_client()
+
+@pytest.fixture
+def session_file(app_dir):
+    """Grava uma sessão .npy sintética em data/ e retorna (id, registros)"""
+    from services.storage import records_to_structured
+    def make(session_id: str, n: int = 1000):
+        t = np.arange(n)
+        records = [(int(t[i] // 100 % 4), 100 + i % 50, 200, 300, 400 + (i % 97 == 0) * 3000, int(t[i]), 0)
+                   for i in range(n)]
+        data = records_to_structured(records)
+        np.save(os.path.join(app_dir, "data", session_id + ".npy"), data)
+        return session_id, data
+    return make
@@ -0,0 +1,24 @@
+import time
+from services.calibration import CalibrationStore, ModuleCalibration, SensorCurve
+from services.device_session import DeviceSession
+from services.simulator import SimulatedBLEManager
+
+def test_calibration_follows_resolved_address(tmp_path):
+    address = SimulatedBLEManager.SIMULATED_ADDRESS
+    store = CalibrationStore(str(tmp_path))
+    store.set(ModuleCalibration([SensorCurve('poly', coeffs=[0.01, 0.0]) for _ in range(4)], address))
+    session = DeviceSession(csv_folder=str(tmp_path), calibrations=store)
+    session.data_manager.storage_backends = ['npy']
+    session.set_source('simulator', speed=10.0, seed=1)
+    
+    assert session.data_manager.calibration.module == 'default'
+    session.connect()
+    try:
+        deadline = time.monotonic() + 5.0
+        while session.data_manager.calibration.module != address and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert session.data_manager.calibration.module == address
+        assert session.stream_hub.calibration.module == address
+    finally:
+        session.disconnect()
+        session.pipeline.stop()
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from services.downsampling import MIN_POINTS, downsample_indices, lttb_indices, minmax_indices
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    timestamps = np.arange(5000)
+    sensors = rng.integers(0, 4096, size=(4, 5000))
+    return timestamps, sensors
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [3, 4, 5, 9, 10, 11, 100, 999])
+def test_never_more_than_max_points(series, method, max_points):
+    timestamps, sensors = series
+    indices = downsample_indices(timestamps, sensors, max_points, method)
+    assert 0 < len(indices) <= max_points
+    assert indices[0] == 0 and indices[-1] == len(timestamps) - 1
+    assert np.all(np.diff(indices) > 0)
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [-5, 0, 1, 2])
+def test_rejects_max_points_below_minimum(series, method, max_points):
+    timestamps, sensors = series
+    with pytest.raises(ValueError):
+        downsample_indices(timestamps, sensors, max_points, method)
+
+def test_short_series_is_returned_whole(series):
+    timestamps, sensors = series
+    assert np.array_equal(downsample_indices(timestamps[:50], sensors[:, :50], 100), np.arange(50))
+
+def test_peaks_are_preserved(series):
+    timestamps, sensors = series
+    sensors = sensors.copy()
+    sensors[2, 1234] = 10_000
+    for method in ("lttb", "minmax"):
+        assert 1234 in downsample_indices(timestamps, sensors, 100, method)
+    assert 1234 in minmax_indices(sensors, MIN_POINTS)
+
+def test_lttb_rejects_small_n_out():
+    with pytest.raises(ValueError):
+        lttb_indices(np.arange(10), np.arange(10), 2)
+
+@pytest.mark.parametrize("max_points", [-1, 0, 1, 2])
+def test_range_endpoint_rejects_small_max_points(client, session_file, max_points):
+    session_id, _ = session_file("downsample_bounds")
+    response = client.get(f"/api/sessions/{session_id}/range?limit=10&max_points={max_points}")
+    assert response.status_code == 400
+
+def test_range_endpoint_respects_max_points(client, session_file):
+    session_id, _ = session_file("downsample_ok")
+    for method in ("lttb", "minmax"):
+        response = client.get(f"/api/sessions/{session_id}/range?max_points=3&method={method}")
+        assert response.status_code == 200
+        assert response.json["count"] <= 3
+
+@pytest.mark.parametrize("max_points", [0, 2])
+def test_chart_endpoint_rejects_small_max_points(client, max_points):
+    assert client.get(f"/api/chart_data?max_points={max_points}").status_code == 400
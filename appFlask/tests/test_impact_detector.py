@@ -0,0 +1,61 @@
+from dataclasses import asdict
+import numpy as np
+import pytest
+from services.impact_detector import ImpactDetector
+from services.storage import records_to_structured
+
+@pytest.fixture(scope="module")
+def session():
+    """Sessão sintética: linha de base que deriva, ruído e impactos em todos os sensores"""
+    rng = np.random.default_rng(42)
+    n = 5000
+    t = np.arange(n)
+    drift = 800 + 300 * np.sin(t / 700)
+    sensors = drift + rng.normal(0, 40, size=(4, n))
+    for s in range(4):
+        for start in rng.choice(n - 20, size=60, replace=False):
+            sensors[s, start:start + rng.integers(1, 12)] += rng.integers(300, 2500)
+    sensors = np.clip(sensors, 0, 4095).astype(np.int64)
+    records = [(int(t[i] // 200 % 4), *sensors[:, i].tolist(), int(t[i]), 0) for i in range(n)]
+    return records_to_structured(records)
+
+def run(records, chunk):
+    detector = ImpactDetector()
+    events = [asdict(e) for e in detector.process_session(records, chunk=chunk)]
+    return events, detector.get_summary()
+
+def assert_same_events(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert x.pop('energy') == pytest.approx(y.pop('energy'))
+        assert x.pop('baseline') == pytest.approx(y.pop('baseline'))
+        assert x.pop('amplitude') == pytest.approx(y.pop('amplitude'))
+        assert x == y
+
+@pytest.mark.parametrize("chunk", [1, 8, 37, 64, 1000])
+def test_events_do_not_depend_on_batch_size(session, chunk):
+    reference, summary = run(session, 65_536)
+    events, other = run(session, chunk)
+    assert reference
+    assert_same_events(events, reference)
+    assert other['per_sensor'] == summary['per_sensor']
+    assert other['baseline'] == pytest.approx(summary['baseline'])
+
+def test_live_batches_match_session_reprocessing(session):
+    """O callback de lote (tempo real) e process_session encontram os mesmos eventos"""
+    reference, _ = run(session, 65_536)
+    detector = ImpactDetector()
+    rows = session.tolist()
+    for i in range(0, len(rows), 9):
+        detector.process(rows[i:i + 9])
+    assert_same_events(detector.get_events(limit=len(reference) + 1), reference)
+
+def test_event_open_across_batches_is_closed_once():
+    detector = ImpactDetector(num_sensors=1)
+    quiet = [(0, 100, t, 0) for t in range(10)]
+    detector.process(quiet)
+    assert detector.process([(0, 2000, 10, 0), (0, 2100, 11, 0)]) == []
+    events = detector.process([(0, 1900, 12, 0), (0, 100, 13, 0)])
+    assert len(events) == 1
+    event = events[0]
+    assert (event.start_ts, event.end_ts, event.peak, event.peak_ts, event.samples) == (10, 12, 2100, 11, 3)
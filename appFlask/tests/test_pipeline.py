@@ -0,0 +1,55 @@
+import threading
+from services.pipeline import Pipeline, PipelineStage
+
+def batch(start, n=10):
+    return [(0, 1, 2, 3, 4, ts, 0) for ts in range(start, start + n)]
+
+def test_drop_oldest_keeps_counters_consistent():
+    gate = threading.Event()
+    seen = []
+    stage = PipelineStage('test', lambda records: (gate.wait(), seen.extend(records)),
+                          max_records=30, overflow='drop_oldest', max_coalesce=10)
+    try:
+        for i in range(20):
+            stage.put(batch(i * 10))
+        gate.set()
+        assert stage.flush(timeout=5.0)
+        
+        assert stage.queued_records == 0
+        assert stage.enqueued_records == 200
+        assert stage.processed_records + stage.dropped_records == 200
+        assert seen[-10:] == batch(190)
+    finally:
+        gate.set()
+        stage.stop()
+
+def test_drop_newest_keeps_queued_sequence():
+    gate = threading.Event()
+    seen = []
+    stage = PipelineStage('test', lambda records: (gate.wait(), seen.extend(records)),
+                          max_records=30, overflow='drop_newest', max_coalesce=10)
+    try:
+        accepted = sum(stage.put(batch(i * 10)) for i in range(20))
+        gate.set()
+        assert stage.flush(timeout=5.0)
+        
+        assert len(seen) == accepted * 10 == stage.processed_records
+        assert stage.dropped_records == 200 - len(seen)
+        assert [r[5] for r in seen] == list(range(len(seen)))
+    finally:
+        gate.set()
+        stage.stop()
+
+def test_flush_times_out_while_consumer_is_busy():
+    gate = threading.Event()
+    pipeline = Pipeline()
+    pipeline.add_stage('slow', lambda records: gate.wait())
+    try:
+        pipeline.publish(batch(0))
+        assert not pipeline.flush(timeout=0.05)
+        gate.set()
+        assert pipeline.flush(timeout=5.0)
+        assert pipeline.stages['slow'].processed_records == 10
+    finally:
+        gate.set()
+        pipeline.stop()
@@ -0,0 +1,32 @@
+import os
+import numpy as np
+from services.storage import csv_header, load_session, records_to_structured
+
+def write_session(folder, session_id, n=400):
+    """Sessão gravada em .npy e .csv com interval_ms zerado"""
+    records = [(i // 50 % 4, 100, 200, 300, 400, i, 0) for i in range(n)]
+    data = records_to_structured(records)
+    np.save(os.path.join(folder, session_id + ".npy"), data)
+    with open(os.path.join(folder, session_id + ".csv"), "w", newline="") as f:
+        f.write(",".join(csv_header()) + "\r\n")
+        f.writelines(",".join(map(str, row)) + "\r\n" for row in records)
+
+def test_rewrites_every_backend_and_refreshes_catalog(client, app_dir):
+    folder = os.path.join(app_dir, "data")
+    write_session(folder, "recompute_all")
+    response = client.post("/api/sessions/recompute_all/recompute_intervals")
+    assert response.status_code == 200
+    assert sorted(response.json["files"]) == ["recompute_all.csv", "recompute_all.npy"]
+    
+    npy = load_session(os.path.join(folder, "recompute_all.npy"))
+    csv = load_session(os.path.join(folder, "recompute_all.csv"))
+    assert np.any(npy["interval_ms"] != 0)
+    assert np.array_equal(npy["interval_ms"], csv["interval_ms"])
+    
+    entry = client.get("/api/sessions/recompute_all").json
+    assert entry["total_points"] == 400
+    assert entry["size_bytes"] == sum(os.path.getsize(os.path.join(folder, "recompute_all" + ext))
+                                      for ext in (".npy", ".csv"))
+
+def test_unknown_session(client):
+    assert client.post("/api/sessions/nao_existe/recompute_intervals").status_code == 404
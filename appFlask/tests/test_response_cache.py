@@ -0,0 +1,46 @@
+import itertools
+import pytest
+from routes.caching import cached_json
+
+@pytest.fixture
+def app(client):
+    return client.application
+
+def test_body_built_during_change_is_not_cached(app):
+    versions = itertools.count()
+    builds = []
+    def build():
+        builds.append(1)
+        return {'n': len(builds)}
+    
+    with app.test_request_context('/cache-race'):
+        response = cached_json(lambda: next(versions), build)
+    
+    # A versão mudou durante build(): sem ETag e fora do cache
+    assert response.get_etag() == (None, None)
+    assert response.headers['Cache-Control'] == 'no-store'
+    with app.test_request_context('/cache-race'):
+        assert cached_json(lambda: 'fixed', build).get_json() == {'n': 2}
+    assert len(builds) == 2
+
+def test_stable_version_is_cached_and_revalidated(app):
+    builds = []
+    def build():
+        builds.append(1)
+        return {'n': len(builds)}
+    
+    with app.test_request_context('/cache-stable'):
+        first = cached_json(lambda: 'v1', build)
+    etag, _ = first.get_etag()
+    with app.test_request_context('/cache-stable'):
+        assert cached_json(lambda: 'v1', build).get_json() == {'n': 1}
+    with app.test_request_context('/cache-stable', headers={'If-None-Match': f'"{etag}"'}):
+        assert cached_json(lambda: 'v1', build).status_code == 304
+    assert len(builds) == 1
+
+def test_delta_requests_bypass_cache(client):
+    from services.app_state import app_state
+    before = len(app_state.response_cache._entries)
+    for since in range(5):
+        assert client.get(f'/api/chart_data?since={since}').status_code == 200
+    assert len(app_state.response_cache._entries) == before
@@ -0,0 +1,20 @@
+import pytest
+
+@pytest.mark.parametrize("limit", [-5, 0])
+def test_rejects_non_positive_limit(client, session_file, limit):
+    session_id, _ = session_file("range_limit")
+    assert client.get(f"/api/sessions/{session_id}/range?limit={limit}").status_code == 400
+
+def test_limit_truncates_and_points_to_next_record(client, session_file):
+    session_id, data = session_file("range_pages", n=100)
+    response = client.get(f"/api/sessions/{session_id}/range?start=10&limit=5")
+    assert response.status_code == 200
+    payload = response.json
+    assert payload["count"] == 5 and payload["truncated"]
+    assert payload["data"]["timestamp"] == [10, 11, 12, 13, 14]
+    assert payload["next_start"] == 15
+
+def test_range_without_truncation(client, session_file):
+    session_id, data = session_file("range_all", n=50)
+    payload = client.get(f"/api/sessions/{session_id}/range?start=40&limit=100").json
+    assert payload["count"] == 10 and not payload["truncated"] and payload["next_start"] is None
@@ -0,0 +1,128 @@
+import os
+import struct
+import numpy as np
+import pytest
+from services.stream_validator import StreamValidator
+
+RECORD = struct.Struct("<B4iI")
+CAPTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "dados_ble.csv")
+
+def pack(stamps, led=1):
+    return b''.join(RECORD.pack(led, 100, 200, 300, 400, ts) for ts in stamps)
+
+def feed(validator, notifications):
+    """Passa as notificações pelo validador como o BLEManager (buffer com o resto parcial)"""
+    buffer = bytearray()
+    out = []
+    for data in notifications:
+        buffer.extend(data)
+        records, consumed = validator.decode(buffer)
+        del buffer[:consumed]
+        out += records
+    return out
+
+def split(data, mtu=180):
+    return [data[i:i + mtu] for i in range(0, len(data), mtu)]
+
+@pytest.fixture(scope="module")
+def capture():
+    """Captura real: o botão de gravação é solto três vezes (ts 249 é uma gravação de um tick)"""
+    rows = np.loadtxt(CAPTURE, delimiter=',', skiprows=1, dtype=np.int64)
+    return b''.join(RECORD.pack(*row[:6].tolist()) for row in rows), rows[:, 5]
+
+def test_clean_capture_has_pauses_but_no_loss(capture):
+    data, stamps = capture
+    validator = StreamValidator()
+    records = feed(validator, split(data))
+    report = validator.get_report()
+    
+    assert [r[-1] for r in records] == stamps.tolist()
+    assert 249 in (r[-1] for r in records)
+    assert report['pauses'] == 3
+    assert report['paused_records'] == 167 + 65 + 733
+    assert report['longest_pause'] == 733
+    assert report['gaps'] == report['missing_records'] == 0
+    assert report['implausible'] == report['resyncs'] == 0
+    assert report['loss_ratio'] == 0.0
+
+def test_single_tick_break_is_accepted():
+    validator = StreamValidator()
+    records = validator.check_sequence([(0, 1, 2, 3, 4, ts) for ts in (10, 11, 50, 90, 91)])
+    
+    assert [r[-1] for r in records] == [10, 11, 50, 90, 91]
+    assert validator.pauses == 2
+    assert validator.implausible == 0
+
+def test_lost_notification_counts_as_loss():
+    data = pack(range(200))
+    notifications = split(data)
+    del notifications[3]
+    validator = StreamValidator()
+    records = feed(validator, notifications)
+    report = validator.get_report()
+    
+    stamps = [r[-1] for r in records]
+    assert stamps == sorted(stamps)
+    assert report['resyncs'] >= 1
+    assert report['gaps'] == 1
+    assert report['missing_records'] == 200 - len(records)
+    assert report['pauses'] == 0
+    assert report['loss_ratio'] > 0
+
+def test_unconfirmed_break_after_resync_waits_and_is_flushed():
+    validator = StreamValidator()
+    validator.check_sequence([(0, 1, 2, 3, 4, ts) for ts in range(5)])
+    
+    assert validator.check_sequence([(0, 1, 2, 3, 4, 40)], resynced=True) == []
+    assert validator.flush() == [(0, 1, 2, 3, 4, 40)]
+    assert validator.flush() == []
+    assert validator.last_ts == 40
+    assert validator.records == 6
+    assert validator.missing_records == 35
+
+def test_pending_record_is_confirmed_by_next_batch():
+    validator = StreamValidator()
+    validator.check_sequence([(0, 1, 2, 3, 4, ts) for ts in range(5)])
+    validator.check_sequence([(0, 1, 2, 3, 4, 40)], resynced=True)
+    records = validator.check_sequence([(0, 1, 2, 3, 4, 41)])
+    
+    assert [r[-1] for r in records] == [40, 41]
+    assert validator.gaps == 1
+
+def test_unconfirmed_break_after_resync_is_implausible():
+    validator = StreamValidator()
+    records = validator.check_sequence([(0, 1, 2, 3, 4, ts) for ts in (0, 1, 7000, 2, 3)], resynced=True)
+    
+    assert [r[-1] for r in records] == [0, 1, 2, 3]
+    assert validator.implausible == 1
+
+def test_duplicates_are_dropped():
+    validator = StreamValidator()
+    records = feed(validator, split(pack([0, 1, 1, 2, 3])))
+    
+    assert [r[-1] for r in records] == [0, 1, 2, 3]
+    assert validator.duplicates == 1
+
+def test_replayed_dump_is_dropped():
+    # Com o botão de envio pressionado, o firmware reenvia o vetor inteiro a cada ciclo
+    first = pack(range(50))
+    second = pack(list(range(50)) + list(range(120, 150)))
+    validator = StreamValidator()
+    records = feed(validator, split(first) + split(first) + split(second) + split(second))
+    report = validator.get_report()
+    
+    stamps = [r[-1] for r in records]
+    assert stamps == list(range(50)) + list(range(120, 150))
+    assert report['records'] == 80
+    assert report['replayed'] + report['duplicates'] == 50 + 50 + 80
+    assert report['pauses'] == 1
+    assert report['loss_ratio'] == 0.0
+
+def test_accepted_stamps_are_strictly_increasing():
+    validator = StreamValidator()
+    batches = [[(0, 1, 2, 3, 4, ts) for ts in chunk] for chunk in ([5, 6, 7], [3, 4, 8], [8, 2, 9, 10])]
+    stamps = [r[-1] for batch in batches for r in validator.check_sequence(batch)]
+    
+    assert stamps == [5, 6, 7, 8, 9, 10]
+    assert validator.replayed == 3
+    assert validator.duplicates == 1
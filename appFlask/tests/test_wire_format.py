@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from services.simulator import wire_dtype
+from services.wire_format import FrameDecoder, delta_size, detect_version, encode_frames, packed_size
+
+def make_records(num_sensors=4, n=500, step=5, seed=0):
+    """Registros no layout v1, com pausas no timeStamp e saltos que forçam frames empacotados"""
+    rng = np.random.default_rng(seed)
+    records = np.empty(n, dtype=wire_dtype(num_sensors))
+    records['sLed'] = np.arange(n) // 40 % 4
+    for i in range(1, num_sensors + 1):
+        walk = 2000 + np.cumsum(rng.integers(-step, step + 1, n))
+        walk[rng.choice(n, 10, replace=False)] = rng.integers(0, 4096, 10)
+        records[f'rSensor{i}'] = np.clip(walk, 0, 4095)
+    stamps = np.arange(n, dtype=np.int64)
+    stamps[n // 3:] += 100
+    stamps[2 * n // 3:] += 7
+    records['timeStamp'] = stamps
+    return records
+
+def as_tuples(records):
+    return [tuple(int(v) for v in row) for row in records.tolist()]
+
+def decode_all(decoder, frames):
+    buffer = bytearray(b''.join(frames))
+    records, consumed = decoder.decode(buffer)
+    assert consumed == len(buffer)
+    return records
+
+@pytest.mark.parametrize("num_sensors", [4, 5, 6])
+@pytest.mark.parametrize("delta", [False, True])
+def test_round_trip(num_sensors, delta):
+    records = make_records(num_sensors)
+    frames = encode_frames(records, mtu=180, delta=delta)
+    decoder = FrameDecoder(num_sensors)
+    
+    assert all(len(frame) <= 180 for frame in frames)
+    assert decode_all(decoder, frames) == as_tuples(records)
+    assert decoder.frames == len(frames)
+    assert (decoder.delta_frames > 0) == delta
+    assert decoder.crc_errors == decoder.sensor_mismatch == decoder.padded_frames == 0
+
+def test_round_trip_across_notification_boundaries():
+    records = make_records()
+    data = b''.join(encode_frames(records))
+    decoder = FrameDecoder()
+    buffer = bytearray()
+    out = []
+    for i in range(0, len(data), 37):
+        buffer.extend(data[i:i + 37])
+        decoded, consumed = decoder.decode(buffer)
+        del buffer[:consumed]
+        out += decoded
+    
+    assert out == as_tuples(records)
+    assert decoder.bytes_discarded == 0
+
+def test_narrower_frames_are_padded_into_session():
+    records = make_records(5)
+    decoder = FrameDecoder(6)
+    decoded = decode_all(decoder, encode_frames(records))
+    
+    assert decoded == [row[:6] + (0,) + row[6:] for row in as_tuples(records)]
+    assert decoder.padded_frames == decoder.frames
+
+def test_wider_frames_are_dropped():
+    decoder = FrameDecoder(4)
+    
+    assert decode_all(decoder, encode_frames(make_records(6))) == []
+    assert decoder.sensor_mismatch == decoder.frames > 0
+
+def test_corrupted_frame_is_skipped():
+    records = make_records()
+    frames = encode_frames(records)
+    bad = bytearray(frames[1])
+    bad[-5] ^= 0xFF
+    frames[1] = bytes(bad)
+    decoder = FrameDecoder()
+    buffer = bytearray(b''.join(frames))
+    decoded, _ = decoder.decode(buffer)
+    
+    expected = as_tuples(records)
+    first = len(decode_all(FrameDecoder(), frames[:1]))
+    lost = len(decode_all(FrameDecoder(), [encode_frames(records)[1]]))
+    assert decoded == expected[:first] + expected[first + lost:]
+    assert decoder.crc_errors == 1
+
+def test_detect_version():
+    records = make_records()
+    
+    assert detect_version(encode_frames(records)[0]) == 2
+    assert detect_version(records.tobytes()[:180]) == 1
+
+def test_v2_payload_is_denser_than_v1():
+    records = make_records(step=2)
+    v2 = sum(len(frame) for frame in encode_frames(records))
+    
+    assert records.nbytes >= 2 * v2
+    assert delta_size(30, 4) < packed_size(30, 4)
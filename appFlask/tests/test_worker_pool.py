@@ -0,0 +1,60 @@
+import threading
+import time
+import numpy as np
+from services.storage import NpyRecordWriter, load_session
+from services.worker_pool import PoolTask, WorkerPool
+
+class Counter(PoolTask):
+    """Tarefa que conta execuções e detecta execução concorrente"""
+    
+    def __init__(self, rounds=1):
+        self.rounds = rounds
+        self.runs = 0
+        self.active = 0
+        self.overlaps = 0
+        self.done = threading.Event()
+    
+    def run_pending(self):
+        self.active += 1
+        if self.active > 1:
+            self.overlaps += 1
+        time.sleep(0.001)
+        self.runs += 1
+        self.active -= 1
+        if self.runs >= self.rounds:
+            self.done.set()
+            return False
+        return True
+
+def test_task_runs_serially_until_done():
+    pool = WorkerPool(workers=4)
+    task = Counter(rounds=20)
+    for _ in range(50):
+        pool.schedule(task)
+    
+    assert task.done.wait(5.0)
+    assert task.overlaps == 0
+    assert len(pool._threads) == 4
+
+def test_schedule_at_runs_later():
+    pool = WorkerPool(workers=1)
+    task = Counter()
+    start = time.monotonic()
+    pool.schedule_at(task, start + 0.05)
+    
+    assert task.done.wait(5.0)
+    assert time.monotonic() - start >= 0.05
+
+def test_many_writers_share_the_pool(tmp_path):
+    pool = WorkerPool(workers=2)
+    writers = [NpyRecordWriter(str(tmp_path / f"s{i}.npy"), flush_rows=50, flush_interval=0.01, pool=pool)
+               for i in range(8)]
+    for start in range(0, 1000, 100):
+        for writer in writers:
+            writer.submit([(1, 10, 20, 30, 40, ts, 0) for ts in range(start, start + 100)])
+    
+    assert all(writer.close(timeout=5.0) for writer in writers)
+    assert len(pool._threads) == 2
+    for writer in writers:
+        data = load_session(writer.filename)
+        assert np.array_equal(data['timeStamp'], np.arange(1000))
@@ -0,0 +1,53 @@
+"""Análise em lote das sessões gravadas (impactos, picos em kg, médias por GH, intervalos).
+
+Uso (a partir de appFlask/):
+    python tools/analyze_sessions.py                      # todas as sessões de data/
+    python tools/analyze_sessions.py data/sessao_*.npy --workers 8 --output analise.json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.session_analytics import DEFAULT_PARAMS, SessionAnalytics
+from services.session_reader import SessionLibrary
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", help="Arquivos de sessão (padrão: todas as sessões da pasta)")
+    parser.add_argument("--folder", default="data", help="Pasta de dados (sessões e cache analytics.db)")
+    parser.add_argument("--workers", type=int, default=None, help="Processos do pool (padrão: nº de CPUs)")
+    parser.add_argument("--force", action="store_true", help="Ignora o cache e recalcula tudo")
+    parser.add_argument("--output", help="Grava o resultado completo em JSON")
+    for name, default in DEFAULT_PARAMS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+    args = parser.parse_args()
+    
+    if args.files:
+        sessions = [(os.path.splitext(os.path.basename(path))[0], path) for path in args.files]
+    else:
+        library = SessionLibrary(args.folder)
+        sessions = [(session_id, library.find(session_id)) for session_id in library.list_sessions()]
+    
+    analytics = SessionAnalytics(args.folder, workers=args.workers,
+                                 **{name: getattr(args, name) for name in DEFAULT_PARAMS})
+    report = analytics.analyze(sessions, force=args.force)
+    
+    for session_id, result in report['sessions'].items():
+        impacts = sum(s['impacts'] for s in result['sensors'].values())
+        peaks = [s['peak_max_kg'] for s in result['sensors'].values() if s['peak_max_kg'] is not None]
+        print(f"{session_id}: {result['samples']} amostras, {result['duration_s']:.0f}s, {impacts} impactos, "
+              f"pico {max(peaks) if peaks else 0:.2f} kg{' (cache)' if result['cached'] else ''}")
+    for session_id, error in report['errors'].items():
+        print(f"{session_id}: erro: {error}", file=sys.stderr)
+    print(f"{len(report['sessions'])} sessões ({report['computed']} processadas em {report['workers']} processos, "
+          f"{report['cached']} do cache) em {report['elapsed_s']:.2f}s")
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Converte CSVs de sessão existentes para o armazenamento binário colunar.
+
+Uso (a partir de appFlask/):
+    python tools/convert_csv.py data/dados_ble.csv
+    python tools/convert_csv.py data/*.csv --format arrow
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.storage import available_backends, convert_csv, load_session
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv_files", nargs="+", help="CSVs de sessão a converter")
+    parser.add_argument("--format", default="npy", choices=[b for b in available_backends() if b != 'csv'])
+    args = parser.parse_args()
+    
+    for csv_path in args.csv_files:
+        start = time.perf_counter()
+        dest = convert_csv(csv_path, fmt=args.format)
+        elapsed = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        records = load_session(dest)
+        load_ms = (time.perf_counter() - start) * 1000
+        
+        print(f"{csv_path} -> {dest}: {len(records)} registros, "
+              f"{os.path.getsize(csv_path) / 1e6:.2f} MB -> {os.path.getsize(dest) / 1e6:.2f} MB, "
+              f"conversão {elapsed:.2f}s, carga {load_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,32 @@ struct __attribute__((packed)) PL_EXPANDIDO {
 };
 */
 
+// -------------------- Formato do envio BLE --------------------
+// WIRE_FORMAT 1: vetor de PL cru (21 bytes por amostra, em chunks de 180 bytes)
+// WIRE_FORMAT 2: frames compactos, um por notificação (~6-7 bytes por amostra):
+//   cabeçalho (sync 0xA5, versão 2, flags, nº de amostras, timeStamp base,
+//   tamanho do corpo), sLed em nibbles, sensores em 12 bits ou deltas int8
+//   e CRC-16/CCITT. O Flask reconhece o formato sozinho (wire_format.py).
+#define WIRE_FORMAT 2
+
+const size_t MTU_BLE = 180;       // MTU prático para BLE
+const int NUM_SENSORES = 4;       // vai no cabeçalho v2 (4-6)
+const uint8_t V2_SYNC = 0xA5;
+const uint8_t V2_VERSION = 2;
+const uint8_t V2_FLAG_DELTA = 0x10;
+const size_t V2_HEADER = 10;
+const size_t V2_CRC = 2;
+const size_t V2_MAX_COUNT = 255;
+
+struct __attribute__((packed)) FrameHeaderV2 {
+  uint8_t sync;      // 0xA5 (nunca é o 1º byte de um PL: sLed <= 7)
+  uint8_t version;   // 2
+  uint8_t flags;     // bits 0-3: nº de sensores | bit 4: corpo em delta
+  uint8_t count;     // amostras no frame
+  uint32_t baseTs;   // timeStamp da 1ª amostra (as demais são consecutivas)
+  uint16_t length;   // bytes do corpo (sem cabeçalho e CRC)
+};
+
 // -------------------- Definições --------------------
 const int sensores[] = {34, 35, 36, 39};
 // TODO: Para expansão de sensores, adicionar pinos 33 e 32:
@@ -157,22 +183,153 @@ void gravarPayload() {
                 sizeof(PL) * vetorRecord.size(), vetorRecord.size());
 }
 
+// CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), o mesmo do binascii.crc_hqx no Flask
+uint16_t crc16_ccitt(const uint8_t *data, size_t len) {
+  uint16_t crc = 0xFFFF;
+  for (size_t i = 0; i < len; i++) {
+    crc ^= (uint16_t)data[i] << 8;
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Tamanho do corpo v2 para n amostras: sensores empacotados em 12 bits ou
+// 1ª amostra em 12 bits + diferenças int8
+size_t tamanhoEmpacotado(size_t n) { return (n + 1) / 2 + (n * NUM_SENSORES * 3 + 1) / 2; }
+size_t tamanhoDelta(size_t n) { return (n + 1) / 2 + (NUM_SENSORES * 3 + 1) / 2 + (n - 1) * NUM_SENSORES; }
+
+// Escreve valores de 12 bits, dois a cada 3 bytes (o último ímpar ocupa 2)
+struct Empacotador12 {
+  uint8_t *out;
+  size_t pos;
+  bool meio;
+
+  void add(uint16_t v) {
+    v &= 0x0FFF;
+    if (!meio) {
+      out[pos] = v & 0xFF;
+      out[pos + 1] = v >> 8;
+      pos += 1;
+    } else {
+      out[pos] |= (v & 0x0F) << 4;
+      out[pos + 1] = v >> 4;
+      pos += 2;
+    }
+    meio = !meio;
+  }
+
+  size_t tamanho() const { return meio ? pos + 1 : pos; }
+};
+
+// As diferenças da amostra i para a anterior cabem em int8
+bool deltaCabe(size_t i) {
+  for (int s = 0; s < NUM_SENSORES; s++) {
+    int d = vetorRecord[i].rSensor[s] - vetorRecord[i - 1].rSensor[s];
+    if (d < -128 || d > 127) return false;
+  }
+  return true;
+}
+
+// Monta em `out` um frame v2 a partir de vetorRecord[inicio]; retorna o
+// tamanho em bytes e em `amostras` quantas amostras ele cobre
+size_t montarFrameV2(size_t inicio, uint8_t *out, size_t *amostras) {
+  const size_t total = vetorRecord.size();
+
+  // Só timeStamps consecutivos (o botão de gravação pode ter sido solto)
+  size_t seq = 1;
+  while (inicio + seq < total && seq < V2_MAX_COUNT &&
+         vetorRecord[inicio + seq].timeStamp == vetorRecord[inicio + seq - 1].timeStamp + 1) {
+    seq++;
+  }
+
+  // Empacotado cabe sempre; delta só enquanto as diferenças cabem em int8
+  size_t nEmp = 0;
+  while (nEmp < seq && V2_HEADER + tamanhoEmpacotado(nEmp + 1) + V2_CRC <= MTU_BLE) nEmp++;
+  size_t nDelta = 0;
+  while (nDelta < seq && V2_HEADER + tamanhoDelta(nDelta + 1) + V2_CRC <= MTU_BLE) {
+    if (nDelta > 0 && !deltaCabe(inicio + nDelta)) break;
+    nDelta++;
+  }
+  const bool usarDelta = nDelta > nEmp;
+  const size_t n = usarDelta ? nDelta : nEmp;
+
+  uint8_t *corpo = out + V2_HEADER;
+  size_t pos = 0;
+
+  // sLed: um nibble por amostra (nibble baixo primeiro)
+  for (size_t i = 0; i < n; i += 2) {
+    uint8_t b = vetorRecord[inicio + i].sLed & 0x0F;
+    if (i + 1 < n) b |= (vetorRecord[inicio + i + 1].sLed & 0x0F) << 4;
+    corpo[pos++] = b;
+  }
+
+  Empacotador12 emp = {corpo + pos, 0, false};
+  if (usarDelta) {
+    for (int s = 0; s < NUM_SENSORES; s++) emp.add(vetorRecord[inicio].rSensor[s]);
+    pos += emp.tamanho();
+    for (size_t i = 1; i < n; i++) {
+      for (int s = 0; s < NUM_SENSORES; s++) {
+        corpo[pos++] = (uint8_t)(int8_t)(vetorRecord[inicio + i].rSensor[s] - vetorRecord[inicio + i - 1].rSensor[s]);
+      }
+    }
+  } else {
+    for (size_t i = 0; i < n; i++) {
+      for (int s = 0; s < NUM_SENSORES; s++) emp.add(vetorRecord[inicio + i].rSensor[s]);
+    }
+    pos += emp.tamanho();
+  }
+
+  FrameHeaderV2 header;
+  header.sync = V2_SYNC;
+  header.version = V2_VERSION;
+  header.flags = NUM_SENSORES | (usarDelta ? V2_FLAG_DELTA : 0);
+  header.count = n;
+  header.baseTs = vetorRecord[inicio].timeStamp;
+  header.length = pos;
+  memcpy(out, &header, V2_HEADER);
+
+  uint16_t crc = crc16_ccitt(out, V2_HEADER + pos);
+  out[V2_HEADER + pos] = crc & 0xFF;
+  out[V2_HEADER + pos + 1] = crc >> 8;
+
+  *amostras = n;
+  return V2_HEADER + pos + V2_CRC;
+}
+
 void enviarPayloadsBLE() {
   if (!deviceConnected) return;
-
+  if (vetorRecord.empty()) return;
+
+#if WIRE_FORMAT == 2
+  // Frames compactos: cada notify() leva ~25-36 amostras (contra ~8,5 no formato 1)
+  uint8_t frame[MTU_BLE];
+  size_t enviadas = 0;
+  size_t notificacoes = 0;
+  while (enviadas < vetorRecord.size()) {
+    size_t amostras = 0;
+    size_t tamanho = montarFrameV2(enviadas, frame, &amostras);
+    pCharacteristic->setValue(frame, tamanho);
+    pCharacteristic->notify();
+    delay(20); // Delay para garantir envio
+    enviadas += amostras;
+    notificacoes++;
+  }
+  Serial.printf("Vetor enviado via BLE (v2): %u amostras em %u notificações\n",
+                (unsigned)enviadas, (unsigned)notificacoes);
+#else
   size_t totalSize = vetorRecord.size() * sizeof(PL);
-  if (totalSize == 0) return;
-
   const uint8_t *dataPtr = reinterpret_cast<const uint8_t *>(vetorRecord.data());
-  const size_t mtu = 180;  // MTU prático para BLE
-  for (size_t offset = 0; offset < totalSize; offset += mtu) {
-    size_t chunkSize = min(mtu, totalSize - offset);
+  for (size_t offset = 0; offset < totalSize; offset += MTU_BLE) {
+    size_t chunkSize = min(MTU_BLE, totalSize - offset);
     pCharacteristic->setValue((uint8_t *)(dataPtr + offset), chunkSize);
     pCharacteristic->notify();
     delay(20); // Delay para garantir envio
   }
 
   Serial.println("Vetor enviado via BLE!");
+#endif
   
   // OPCIONAL: Limpa vetor após envio para economizar memória
   // vetorRecord.clear();